@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import UserProfile
+from .models import UserProfile, OutboxEmail, AlertState, SlowQuery
 
 # Inline admin pour afficher le profil utilisateur dans l'admin User
 class UserProfileInline(admin.StackedInline):
@@ -25,3 +25,32 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'phone_number')
     list_filter = ('created_at',)
     readonly_fields = ('created_at', 'updated_at')
+
+
+# Suivi des emails de l'outbox
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'to_email', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    search_fields = ('to_email', 'subject', 'provider_message_id')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'sent_at', 'locked_at', 'provider_message_id', 'last_error')
+
+
+# États des alertes (solde bas, budgets)
+@admin.register(AlertState)
+class AlertStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'key', 'level', 'sent_level', 'last_sent_at', 'updated_at')
+    search_fields = ('user__username', 'key')
+    list_filter = ('level',)
+
+
+# Requêtes SQL lentes (voir monnkap/slow_queries.py)
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('fingerprint', 'count', 'total_ms', 'max_ms', 'view', 'last_seen')
+    search_fields = ('fingerprint', 'sql', 'view', 'location')
+    list_filter = ('view',)
+    readonly_fields = (
+        'fingerprint', 'sql', 'count', 'total_ms', 'max_ms', 'view', 'location',
+        'explain', 'explained_at', 'first_seen', 'last_seen',
+    )
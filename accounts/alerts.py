@@ -0,0 +1,187 @@
+"""
+Alertes de solde bas et de dépassement de budget.
+
+Les alertes sont évaluées après chaque mouvement du portefeuille, à partir des
+soldes que `Wallet.update_balances()` vient de calculer. Chaque alerte a un
+état par utilisateur (AlertState) :
+
+- elle part une seule fois quand la condition apparaît ou s'aggrave
+  (solde bas ; budget au seuil d'alerte puis dépassé) ;
+- elle se réarme quand la condition disparaît (avec une marge pour le solde,
+  afin qu'un solde qui oscille autour du seuil ne déclenche pas d'alertes en
+  rafale) ;
+- après un réarmement, elle ne peut repartir qu'une fois le délai de
+  carence écoulé.
+
+Les emails passent par l'outbox : ils sont envoyés par le worker
+`send_outbox_emails`, jamais pendant la requête.
+"""
+import calendar
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import AlertState, UserProfile
+
+logger = logging.getLogger(__name__)
+
+
+ALERT_COOLDOWNS = {
+    'low_balance': 24 * 3600,
+    'budget': 24 * 3600,
+    **getattr(settings, 'ALERT_COOLDOWNS', {}),
+}
+# Le solde doit remonter au-dessus de seuil × (1 + marge) pour réarmer l'alerte
+ALERT_LOW_BALANCE_REARM_MARGIN = Decimal(str(getattr(settings, 'ALERT_LOW_BALANCE_REARM_MARGIN', 0.1)))
+
+LEVEL_RANKS = {'': 0, 'low': 1, 'warning': 1, 'exceeded': 2}
+
+
+# ==================== ÉTATS ====================
+
+def _lock_states(user_id, keys):
+    """Charge et verrouille les états d'alertes d'un utilisateur (une requête)."""
+    return {
+        state.key: state
+        for state in AlertState.objects.select_for_update().filter(user_id=user_id, key__in=keys)
+    }
+
+
+def _get_or_create_state(user_id, key):
+    try:
+        with transaction.atomic():
+            return AlertState.objects.create(user_id=user_id, key=key)
+    except IntegrityError:
+        # Créé entre-temps par une requête concurrente
+        return AlertState.objects.select_for_update().get(user_id=user_id, key=key)
+
+
+def apply_transition(state, user_id, key, level, cooldown, now=None):
+    """
+    Enregistre le nouveau niveau d'une alerte.
+
+    Returns:
+        True si l'alerte doit être envoyée
+    """
+    now = now or timezone.now()
+    current = state.level if state else ''
+    if level == current:
+        return False
+
+    if state is None:
+        state = _get_or_create_state(user_id, key)
+
+    # Aggravation pendant un même épisode (budget au seuil puis dépassé) :
+    # envoyée sans attendre si ce niveau n'a pas encore été notifié
+    escalated = bool(current) and LEVEL_RANKS[level] > LEVEL_RANKS[state.sent_level]
+    should_send = LEVEL_RANKS[level] > LEVEL_RANKS[current] and (
+        state.last_sent_at is None
+        or escalated
+        or now - state.last_sent_at >= timedelta(seconds=cooldown)
+    )
+    # Un niveau vide réarme l'alerte ; le délai de carence court toujours
+    state.level = level
+    update_fields = ['level', 'updated_at']
+    if should_send:
+        state.sent_level = level
+        state.last_sent_at = now
+        update_fields += ['sent_level', 'last_sent_at']
+    state.save(update_fields=update_fields)
+    return should_send
+
+
+# ==================== CONDITIONS ====================
+
+def low_balance_level(available_balance, threshold, current_level=''):
+    """Niveau de l'alerte de solde bas ('low' ou '')."""
+    if not threshold:
+        return ''
+    if available_balance < threshold:
+        return 'low'
+    if current_level and available_balance < threshold * (1 + ALERT_LOW_BALANCE_REARM_MARGIN):
+        return current_level
+    return ''
+
+
+def budget_level(budget, spent):
+    """Niveau de l'alerte d'un budget ('exceeded', 'warning' ou ''), comme Budget.get_status()."""
+    if spent > budget.amount:
+        return 'exceeded'
+    if budget.amount and spent / budget.amount * 100 >= budget.alert_threshold:
+        return 'warning'
+    return ''
+
+
+def _month_budgets(user_id, day, category_id):
+    """Budgets du mois concernés par une dépense et montants dépensés (deux requêtes au plus)."""
+    from expenses.models import Budget, Expense
+
+    budgets = list(
+        Budget.objects.filter(user_id=user_id, year=day.year, month=day.month).filter(
+            Q(category__isnull=True) | Q(category_id=category_id)
+        ).select_related('category')
+    )
+    if not budgets:
+        return []
+
+    start = date(day.year, day.month, 1)
+    end = date(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+    totals = Expense.objects.filter(user_id=user_id, date__range=(start, end)).aggregate(
+        total=Sum('amount'),
+        category=Sum('amount', filter=Q(category_id=category_id)),
+    )
+    return [
+        (budget, (totals['category'] if budget.category_id else totals['total']) or Decimal('0.00'))
+        for budget in budgets
+    ]
+
+
+# ==================== ÉVALUATION ====================
+
+def check_wallet_alerts(wallet, wallet_transaction=None):
+    """
+    Évalue les alertes après un mouvement du portefeuille.
+
+    À appeler après `wallet.update_balances()`. Les emails sont mis en file
+    dans la transaction en cours.
+
+    Args:
+        wallet: Portefeuille dont les soldes viennent d'être recalculés
+        wallet_transaction: Transaction à l'origine du mouvement (les budgets
+            ne sont évalués que pour une sortie)
+    """
+    from .emails import send_budget_alert, send_low_balance_alert
+
+    user_id = wallet.user_id
+    budgets = []
+    if wallet_transaction is not None and wallet_transaction.transaction_type == 'expense':
+        budgets = _month_budgets(user_id, wallet_transaction.date, wallet_transaction.category_id)
+
+    threshold = UserProfile.objects.filter(user_id=user_id).values_list(
+        'low_balance_threshold', flat=True
+    ).first()
+    if threshold is None:
+        threshold = Decimal(str(getattr(settings, 'ALERT_LOW_BALANCE_DEFAULT_THRESHOLD', 50000)))
+
+    keys = ['low_balance'] + [f'budget:{budget.pk}' for budget, spent in budgets]
+    now = timezone.now()
+    with transaction.atomic():
+        states = _lock_states(user_id, keys)
+
+        state = states.get('low_balance')
+        level = low_balance_level(wallet.available_balance, threshold, state.level if state else '')
+        if apply_transition(state, user_id, 'low_balance', level, ALERT_COOLDOWNS['low_balance'], now):
+            send_low_balance_alert(wallet.user, wallet)
+            logger.info(f"Alerte solde bas pour l'utilisateur {user_id} ({wallet.available_balance} FCFA)")
+
+        for budget, spent in budgets:
+            key = f'budget:{budget.pk}'
+            level = budget_level(budget, spent)
+            if apply_transition(states.get(key), user_id, key, level, ALERT_COOLDOWNS['budget'], now):
+                send_budget_alert(wallet.user, budget, spent, level)
+                logger.info(f"Alerte budget {budget.pk} ({level}) pour l'utilisateur {user_id}")
@@ -0,0 +1,184 @@
+"""
+Stockage et miniatures des photos de profil.
+
+- Stockage adressé par contenu : un avatar est enregistré sous
+  avatars/<sha256[:2]>/<sha256>.<ext>. Deux envois identiques partagent le
+  même fichier, et un nom de fichier ne change jamais de contenu : il peut
+  être servi avec « Cache-Control: immutable » (voir serve_avatar_view).
+- Miniatures carrées de taille fixe (AVATAR_THUMBNAIL_SIZES), en WebP et en
+  JPEG, sous avatars/thumbs/<sha256>-<taille>.<webp|jpg>. Elles sont générées
+  hors de la requête (thread en arrière-plan après le commit) ; la commande
+  `process_avatars` rattrape les avatars existants ou oubliés.
+
+Les anciens fichiers ne sont pas supprimés au remplacement d'un avatar : un
+même fichier peut être partagé par plusieurs profils.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.db import connections, transaction
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+
+AVATAR_THUMBNAIL_SIZES = getattr(settings, 'AVATAR_THUMBNAIL_SIZES', (64, 256))
+AVATAR_WEBP_QUALITY = getattr(settings, 'AVATAR_WEBP_QUALITY', 80)
+AVATAR_JPEG_QUALITY = getattr(settings, 'AVATAR_JPEG_QUALITY', 82)
+
+THUMBNAIL_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+# Noms produits par ContentAddressedStorage et generate_thumbnails()
+AVATAR_NAME_RE = re.compile(
+    r'^avatars/(?:[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.(?:jpg|jpeg|png|gif|webp)'
+    r'|thumbs/(?P<thumb_digest>[0-9a-f]{64})-\d+\.(?:webp|jpg))$'
+)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatars')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stockage fichier où le nom est l'empreinte SHA-256 du contenu.
+    Un fichier déjà présent n'est pas réécrit.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = ContentFile(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        return self.save_as(f'{os.path.dirname(name) or "avatars"}/{digest[:2]}/{digest}{ext}', content)
+
+    def save_as(self, name, content):
+        """Enregistre `content` sous `name` exactement (sans effet si le fichier existe)."""
+        validate_file_name(name, allow_relative_path=True)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Écriture dans un fichier temporaire puis renommage atomique : deux
+        # écritures simultanées du même contenu ne se gênent pas
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temporary:
+            for chunk in content.chunks():
+                temporary.write(chunk)
+        os.chmod(temporary.name, self.file_permissions_mode or 0o644)
+        os.replace(temporary.name, full_path)
+        return name
+
+
+def avatar_storage():
+    return ContentAddressedStorage()
+
+
+def avatar_digest(name):
+    """Empreinte d'un avatar adressé par contenu, ou None (ancien nom de fichier)."""
+    match = AVATAR_NAME_RE.match(name or '')
+    return match.group('digest') if match else None
+
+
+def thumbnail_name(digest, size, ext):
+    return f'avatars/thumbs/{digest}-{size}.{ext}'
+
+
+def _render_thumbnail(image, size, image_format):
+    from PIL import Image, ImageOps
+
+    thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if image_format == 'JPEG' and thumbnail.mode != 'RGB':
+        # Pas de transparence en JPEG : fond blanc
+        background = Image.new('RGB', thumbnail.size, (255, 255, 255))
+        background.paste(thumbnail, mask=thumbnail.getchannel('A') if 'A' in thumbnail.getbands() else None)
+        thumbnail = background
+    buffer = BytesIO()
+    if image_format == 'WEBP':
+        thumbnail.save(buffer, 'WEBP', quality=AVATAR_WEBP_QUALITY, method=4)
+    else:
+        thumbnail.save(buffer, 'JPEG', quality=AVATAR_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(name):
+    """
+    Génère les miniatures manquantes de l'avatar `name` (adressé par contenu)
+    puis marque les profils concernés. Idempotent.
+
+    Returns:
+        Nombre de miniatures écrites
+    """
+    from PIL import Image, ImageOps
+
+    from .models import UserProfile
+
+    digest = avatar_digest(name)
+    if digest is None:
+        return 0
+    storage = avatar_storage()
+    missing = [
+        (size, ext, image_format)
+        for size in AVATAR_THUMBNAIL_SIZES
+        for ext, image_format in THUMBNAIL_FORMATS
+        if not storage.exists(thumbnail_name(digest, size, ext))
+    ]
+    if missing:
+        with storage.open(name) as source, Image.open(source) as image:
+            # JPEG : décodage directement à une résolution réduite
+            image.draft('RGB', (max(AVATAR_THUMBNAIL_SIZES) * 2,) * 2)
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+            for size, ext, image_format in missing:
+                path = thumbnail_name(digest, size, ext)
+                storage.save_as(path, ContentFile(_render_thumbnail(image, size, image_format)))
+    UserProfile.objects.filter(avatar=name, avatar_thumbnails=False).update(avatar_thumbnails=True)
+    return len(missing)
+
+
+def _generate_in_background(name):
+    try:
+        generate_thumbnails(name)
+    except Exception:
+        logger.exception(f"Échec de la génération des miniatures de l'avatar {name}")
+    finally:
+        # Connexions ouvertes par ce thread
+        connections.close_all()
+
+
+def schedule_thumbnails(name):
+    """Génère les miniatures en arrière-plan, après le commit de la transaction en cours."""
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, name))
+
+
+def avatar_urls(profile, size):
+    """
+    URLs de la miniature d'au moins `size` pixels : {'webp': ..., 'src': ...}
+    (src en JPEG), ou l'original seul ({'src': ...}) tant que les miniatures
+    ne sont pas prêtes.
+    """
+    if not profile or not profile.avatar:
+        return None
+    digest = avatar_digest(profile.avatar.name)
+    if digest is None or not profile.avatar_thumbnails:
+        return {'src': profile.avatar.url}
+    size = min((s for s in AVATAR_THUMBNAIL_SIZES if s >= size), default=max(AVATAR_THUMBNAIL_SIZES))
+    storage = profile.avatar.storage
+    return {
+        'webp': storage.url(thumbnail_name(digest, size, 'webp')),
+        'src': storage.url(thumbnail_name(digest, size, 'jpg')),
+    }
@@ -1,12 +1,9 @@
+from .user_context import get_theme
+
+
 def theme_preference(request):
     """
     Context processor pour rendre la préférence de thème disponible dans tous les templates.
+    Le thème est mémorisé dans la session (voir accounts/user_context.py).
     """
-    if request.user.is_authenticated:
-        try:
-            return {
-                'user_theme': request.user.profile.theme_preference
-            }
-        except:
-            return {'user_theme': 'auto'}
-    return {'user_theme': 'auto'}
+    return {'user_theme': get_theme(request)}
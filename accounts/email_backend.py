@@ -1,74 +1,387 @@
 """
 Backend email personnalisé utilisant Resend API (contourne le blocage SMTP de Render)
+
+L'API est appelée directement en HTTP via une session `requests` persistante
+(connexions réutilisées entre les envois et partagées entre les threads) :
+- plusieurs messages sont regroupés sur l'endpoint /emails/batch (100 max) ;
+- les messages non regroupables (pièces jointes) et les lots sont envoyés
+  avec une concurrence bornée ;
+- les erreurs temporaires (429, 5xx, réseau) sont retentées avec gigue, en
+  respectant Retry-After et les en-têtes de quota de l'API ;
+- chaque envoi porte un en-tête Idempotency-Key, identique d'une tentative à
+  l'autre : un lot accepté dont la réponse s'est perdue n'est pas renvoyé.
+  La clé vient de `message.idempotency_key` (outbox, rapports périodiques),
+  combinée pour un lot ; à défaut, elle est tirée au hasard pour l'envoi ;
+- chaque appel à send_messages journalise ses métriques de temps.
+
+RESEND_API_URL permet de viser un serveur local (voir accounts/resend_stub.py).
 """
+import base64
+import hashlib
 import os
 import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail import EmailMultiAlternatives
 
 logger = logging.getLogger(__name__)
 
 
+RESEND_BATCH_SIZE = 100  # Limite de l'endpoint /emails/batch
+
+
+class ResendAPIError(Exception):
+    """Erreur renvoyée par l'API Resend."""
+
+    def __init__(self, message, status_code=None, retryable=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class _RateLimiter:
+    """
+    Limiteur de débit partagé par le processus.
+    Espace les requêtes (RESEND_REQUESTS_PER_SECOND) et suspend les envois
+    quand l'API signale un quota épuisé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+
+    def wait(self, requests_per_second):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + (1.0 / requests_per_second if requests_per_second else 0)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def block_for(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+_session = None
+_session_lock = threading.Lock()
+_rate_limiter = _RateLimiter()
+
+
+def get_http_session(pool_size):
+    """Session HTTP persistante partagée par le processus (pool de connexions)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def idempotency_key(messages):
+    """Clé d'idempotence d'un envoi (un message ou un lot), stable entre les tentatives."""
+    keys = [getattr(message, 'idempotency_key', None) for message in messages]
+    if not all(keys):
+        return str(uuid.uuid4())
+    if len(keys) == 1:
+        return keys[0]
+    digest = hashlib.sha256('\n'.join(keys).encode()).hexdigest()
+    return f'batch-{digest}'
+
+
+def _retry_after(response):
+    """Délai demandé par l'API (Retry-After ou ratelimit-reset), en secondes."""
+    for header in ('retry-after', 'ratelimit-reset'):
+        value = response.headers.get(header)
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
 class ResendEmailBackend(BaseEmailBackend):
     """
     Backend email utilisant l'API Resend au lieu de SMTP.
     Fonctionne sur Render où SMTP est bloqué.
+
+    Les statuts par message sont exposés sur les messages eux-mêmes :
+    `provider_message_id` en cas de succès, `send_error` en cas d'échec.
     """
-    
+    reports_message_status = True
+
+    def __init__(self, fail_silently=False, api_key=None, api_url=None, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.api_key = api_key or getattr(settings, 'RESEND_API_KEY', None) or os.environ.get('RESEND_API_KEY')
+        self.api_url = (api_url or getattr(settings, 'RESEND_API_URL', 'https://api.resend.com')).rstrip('/')
+        self.max_concurrency = getattr(settings, 'RESEND_MAX_CONCURRENCY', 4)
+        self.max_retries = getattr(settings, 'RESEND_MAX_RETRIES', 3)
+        self.retry_base_delay = getattr(settings, 'RESEND_RETRY_BASE_DELAY', 0.5)
+        self.requests_per_second = getattr(settings, 'RESEND_REQUESTS_PER_SECOND', 2)
+        self.timeout = getattr(settings, 'RESEND_TIMEOUT', 10)
+        self.metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._metrics_lock:
+            self.metrics[name] = self.metrics.get(name, 0) + value
+
+    # ==================== HTTP ====================
+
+    def _post(self, path, payload, idempotency_key=None):
+        """
+        POST JSON avec nouvelles tentatives sur les erreurs temporaires, sous
+        la même clé d'idempotence.
+        """
+        import requests
+
+        session = get_http_session(self.max_concurrency)
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        attempt = 0
+        while True:
+            waited = _rate_limiter.wait(self.requests_per_second)
+            if waited > 0:
+                self._count('throttled_seconds', waited)
+            self._count('requests')
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f'{self.api_url}{path}', json=payload, headers=headers, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                error = ResendAPIError(f"Erreur réseau Resend: {e}", retryable=True)
+                retry_delay = None
+            else:
+                self._count('http_seconds', time.perf_counter() - start)
+                if response.headers.get('ratelimit-remaining') == '0':
+                    reset = _retry_after(response)
+                    if reset:
+                        _rate_limiter.block_for(reset)
+                if response.status_code < 300:
+                    return response.json() if response.content else {}
+
+                try:
+                    detail = response.json().get('message', response.text)
+                except ValueError:
+                    detail = response.text
+                retryable = response.status_code == 429 or response.status_code >= 500
+                error = ResendAPIError(
+                    f"Resend {response.status_code}: {detail}",
+                    status_code=response.status_code,
+                    retryable=retryable
+                )
+                retry_delay = _retry_after(response)
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                    _rate_limiter.block_for(retry_delay or 1.0)
+
+            if not error.retryable or attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            self._count('retries')
+            # Attente exponentielle avec gigue complète (ou délai imposé par l'API)
+            delay = retry_delay if retry_delay is not None else random.uniform(
+                0, self.retry_base_delay * 2 ** attempt
+            )
+            time.sleep(delay + random.uniform(0, 0.1))
+
+    # ==================== MESSAGES ====================
+
+    def _build_params(self, message):
+        """Convertit un EmailMessage Django au format de l'API Resend."""
+        params = {
+            "from": message.from_email,
+            "to": message.to,
+            "subject": message.subject,
+        }
+        if message.cc:
+            params["cc"] = message.cc
+        if message.bcc:
+            params["bcc"] = message.bcc
+        if message.reply_to:
+            params["reply_to"] = message.reply_to
+
+        # Ajouter le contenu
+        if isinstance(message, EmailMultiAlternatives) and message.alternatives:
+            # Email HTML
+            for content, mimetype in message.alternatives:
+                if mimetype == 'text/html':
+                    params["html"] = content
+                    break
+            # Fallback texte
+            if message.body:
+                params["text"] = message.body
+        else:
+            # Email texte simple
+            params["text"] = message.body
+
+        if message.attachments:
+            params["attachments"] = [
+                {
+                    "filename": filename,
+                    "content": base64.b64encode(
+                        content.encode() if isinstance(content, str) else content
+                    ).decode(),
+                }
+                for filename, content, mimetype in (
+                    attachment for attachment in message.attachments if isinstance(attachment, tuple)
+                )
+            ]
+        return params
+
+    def _send_single(self, message, params):
+        try:
+            response = self._post('/emails', params, idempotency_key([message]))
+        except Exception as e:
+            return self._fail([message], e)
+        if not response.get('id'):
+            return self._fail([message], ResendAPIError("Resend : aucun identifiant renvoyé"))
+        message.provider_message_id = response['id']
+        return 1
+
+    def _send_batch(self, messages, params_list):
+        try:
+            response = self._post('/emails/batch', params_list, idempotency_key(messages))
+        except ResendAPIError as e:
+            if e.status_code in (400, 422):
+                # Lot refusé (ex. une adresse invalide) : envoi message par message
+                logger.warning(f"Lot Resend refusé ({e}), envoi individuel de {len(messages)} messages")
+                return sum(
+                    self._send_single(message, params)
+                    for message, params in zip(messages, params_list)
+                )
+            return self._fail(messages, e)
+        except Exception as e:
+            return self._fail(messages, e)
+
+        results = response.get('data') or []
+        sent = 0
+        missing = []
+        for index, message in enumerate(messages):
+            result = results[index] if index < len(results) else None
+            if isinstance(result, dict) and result.get('id'):
+                message.provider_message_id = result['id']
+                sent += 1
+            else:
+                missing.append(message)
+        if missing:
+            # Réponse incomplète : messages sans identifiant comptés en échec
+            self._fail(missing, ResendAPIError(
+                f"Resend : {len(missing)} message(s) du lot sans identifiant renvoyé"
+            ))
+        return sent
+
+    def _fail(self, messages, error):
+        logger.error(f"Erreur lors de l'envoi via Resend: {error}")
+        self._count('failed', len(messages))
+        for message in messages:
+            message.send_error = error
+        return 0
+
     def send_messages(self, email_messages):
         """
         Envoie les emails via l'API Resend
         """
+        email_messages = [message for message in email_messages if message.recipients()]
         if not email_messages:
             return 0
-        
-        try:
-            import resend
-        except ImportError:
-            logger.error("Le package 'resend' n'est pas installé. Installez-le avec: pip install resend")
-            return 0
-        
-        # Configuration de l'API key
-        api_key = os.environ.get('RESEND_API_KEY')
-        if not api_key:
+
+        if not self.api_key:
             logger.error("RESEND_API_KEY n'est pas définie dans les variables d'environnement")
-            return 0
-        
-        resend.api_key = api_key
+            if self.fail_silently:
+                return 0
+            raise ResendAPIError("RESEND_API_KEY n'est pas définie")
+
+        start = time.perf_counter()
+        self.metrics = {}
+
+        batchable, single = [], []
+        for message in email_messages:
+            message.send_error = None
+            params = self._build_params(message)
+            (single if 'attachments' in params else batchable).append((message, params))
+
+        tasks = []
+        if len(batchable) == 1:
+            single.extend(batchable)
+        else:
+            for index in range(0, len(batchable), RESEND_BATCH_SIZE):
+                chunk = batchable[index:index + RESEND_BATCH_SIZE]
+                tasks.append((self._send_batch, [m for m, p in chunk], [p for m, p in chunk]))
+        tasks.extend((self._send_single, message, params) for message, params in single)
+
+        if len(tasks) == 1:
+            func, *args = tasks[0]
+            sent_count = func(*args)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(tasks))) as executor:
+                sent_count = sum(executor.map(lambda task: task[0](*task[1:]), tasks))
+
+        elapsed = time.perf_counter() - start
+        self.metrics.update({'messages': len(email_messages), 'sent': sent_count, 'seconds': elapsed})
+        logger.info(
+            f"Resend: {sent_count}/{len(email_messages)} emails envoyés en {elapsed:.2f}s "
+            f"({self.metrics.get('requests', 0)} requêtes, {self.metrics.get('retries', 0)} nouvelles "
+            f"tentatives, {self.metrics.get('rate_limited', 0)} limitations de débit)"
+        )
+
+        if sent_count < len(email_messages) and not self.fail_silently:
+            errors = [message.send_error for message in email_messages if message.send_error]
+            if errors:
+                raise errors[0]
+        return sent_count
+
+
+class FakeEmailBackend(BaseEmailBackend):
+    """
+    Transport factice pour tester l'outbox hors ligne.
+
+    Les messages sont conservés en mémoire dans `FakeEmailBackend.sent`.
+    Réglages optionnels pour simuler le fournisseur :
+    - FAKE_EMAIL_LATENCY : latence par envoi (secondes)
+    - FAKE_EMAIL_FAILURE_RATE : proportion d'envois en échec (0 à 1)
+    """
+    sent = []
+    _lock = threading.Lock()
+
+    def send_messages(self, email_messages):
+        from django.conf import settings
+
+        latency = getattr(settings, 'FAKE_EMAIL_LATENCY', 0)
+        failure_rate = getattr(settings, 'FAKE_EMAIL_FAILURE_RATE', 0)
         sent_count = 0
-        
         for message in email_messages:
-            try:
-                # Préparer les données
-                params = {
-                    "from": message.from_email,
-                    "to": message.to,
-                    "subject": message.subject,
-                }
-                
-                # Ajouter le contenu
-                if isinstance(message, EmailMultiAlternatives) and message.alternatives:
-                    # Email HTML
-                    for content, mimetype in message.alternatives:
-                        if mimetype == 'text/html':
-                            params["html"] = content
-                            break
-                    # Fallback texte
-                    if message.body:
-                        params["text"] = message.body
-                else:
-                    # Email texte simple
-                    params["text"] = message.body
-                
-                # Envoyer via Resend
-                response = resend.Emails.send(params)
-                logger.info(f"Email envoyé via Resend: {response}")
-                sent_count += 1
-                
-            except Exception as e:
-                logger.error(f"Erreur lors de l'envoi via Resend: {e}", exc_info=True)
+            if latency:
+                time.sleep(latency)
+            if failure_rate and random.random() < failure_rate:
                 if self.fail_silently:
                     continue
-                raise
-        
+                raise ConnectionError("Échec simulé du transport factice")
+            message.provider_message_id = f'fake-{uuid.uuid4().hex}'
+            with self._lock:
+                self.sent.append(message)
+            sent_count += 1
         return sent_count
@@ -1,109 +1,114 @@
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+"""
+Emails transactionnels.
+
+Ces fonctions ne contactent pas le fournisseur d'email : elles placent l'email
+dans l'outbox (voir accounts/outbox.py), dans la transaction en cours.
+L'envoi est assuré par la commande `python manage.py send_outbox_emails`.
+"""
 from django.conf import settings
-from django.contrib.auth.models import User
-from decimal import Decimal
+
+from .outbox import queue_email
 
 
 def send_welcome_email(user):
-    """Envoie un email de bienvenue après inscription"""
-    subject = 'Bienvenue sur MonNkap !'
-    message = render_to_string('emails/welcome_email.html', {
-        'user': user,
-    })
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=message,
-        fail_silently=True,
+    """Met en file l'email de bienvenue après inscription"""
+    return queue_email(
+        'welcome',
+        user.email,
+        'Bienvenue sur MonNkap !',
+        'emails/welcome_email.html',
+        {'user': user},
+        user=user,
     )
 
 
 def send_goal_achieved_email(user, goal):
-    """Envoie un email quand un objectif est atteint"""
-    subject = f'🎉 Objectif atteint : {goal.title}'
-    message = render_to_string('emails/goal_achieved.html', {
-        'user': user,
-        'goal': goal,
-    })
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=message,
-        fail_silently=True,
+    """Met en file l'email envoyé quand un objectif est atteint"""
+    return queue_email(
+        'goal_achieved',
+        user.email,
+        f'🎉 Objectif atteint : {goal.title}',
+        'emails/goal_achieved.html',
+        {'user': user, 'goal': goal},
+        user=user,
     )
 
 
 def send_monthly_report_email(user, stats):
-    """Envoie un rapport mensuel des finances"""
-    subject = f'📊 Votre rapport financier - {stats["month"]}'
-    message = render_to_string('emails/monthly_report.html', {
-        'user': user,
-        'stats': stats,
-    })
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=message,
-        fail_silently=True,
+    """Met en file le rapport mensuel des finances"""
+    return queue_email(
+        'monthly_report',
+        user.email,
+        f'📊 Votre rapport financier - {stats["month"]}',
+        'emails/monthly_report.html',
+        {'user': user, 'stats': stats},
+        user=user,
     )
 
 
 def send_group_invitation_email(invited_by, recipient_email, group, invite_code):
-    """Envoie une invitation à rejoindre un groupe"""
-    subject = f'{invited_by.username} vous invite à rejoindre {group.name} sur MonNkap'
-    message = render_to_string('emails/group_invitation.html', {
-        'invited_by': invited_by,
-        'recipient_email': recipient_email,
-        'group': group,
-        'invite_code': invite_code,
-        'invite_url': f'{settings.SITE_URL}/groups/join/{invite_code}/',
-    })
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [recipient_email],
-        html_message=message,
-        fail_silently=True,
+    """Met en file une invitation à rejoindre un groupe"""
+    return queue_email(
+        'group_invitation',
+        recipient_email,
+        f'{invited_by.username} vous invite à rejoindre {group.name} sur MonNkap',
+        'emails/group_invitation.html',
+        {
+            'invited_by': invited_by,
+            'recipient_email': recipient_email,
+            'group': group,
+            'invite_code': invite_code,
+            'invite_url': f'{settings.SITE_URL}/groups/join/{invite_code}/',
+        },
+        user=invited_by,
     )
 
 
 def send_low_balance_alert(user, wallet):
-    """Alerte quand le solde disponible est bas"""
-    subject = '⚠️ Alerte : Solde disponible faible'
-    message = render_to_string('emails/low_balance_alert.html', {
-        'user': user,
-        'wallet': wallet,
-    })
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=message,
-        fail_silently=True,
+    """Met en file l'alerte de solde disponible bas"""
+    return queue_email(
+        'low_balance_alert',
+        user.email,
+        '⚠️ Alerte : Solde disponible faible',
+        'emails/low_balance_alert.html',
+        {'user': user, 'wallet': wallet},
+        user=user,
     )
 
 
 def send_weekly_summary_email(user, summary_data):
-    """Envoie un résumé hebdomadaire des activités"""
-    subject = '📈 Votre résumé hebdomadaire MonNkap'
-    message = render_to_string('emails/weekly_summary.html', {
-        'user': user,
-        'data': summary_data,
-    })
-    send_mail(
+    """Met en file le résumé hebdomadaire des activités"""
+    return queue_email(
+        'weekly_summary',
+        user.email,
+        '📈 Votre résumé hebdomadaire MonNkap',
+        'emails/weekly_summary.html',
+        {'user': user, 'data': summary_data},
+        user=user,
+    )
+
+
+def send_budget_alert(user, budget, spent, level):
+    """Met en file l'alerte de budget (seuil d'alerte atteint ou budget dépassé)"""
+    category = budget.category.name if budget.category else 'Global'
+    if level == 'exceeded':
+        subject = f'🚨 Budget dépassé : {category}'
+    else:
+        subject = f'⚠️ Budget bientôt atteint : {category}'
+    return queue_email(
+        'budget_alert',
+        user.email,
         subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=message,
-        fail_silently=True,
+        'emails/budget_alert.html',
+        {
+            'user': user,
+            'budget': budget,
+            'category_name': category,
+            'spent': spent,
+            'remaining': budget.amount - spent,
+            'percentage': int(spent / budget.amount * 100) if budget.amount else 100,
+            'level': level,
+            'budgets_url': f'{settings.SITE_URL}/expenses/budgets/',
+        },
+        user=user,
     )
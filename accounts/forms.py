@@ -69,6 +69,8 @@ class UserRegistrationForm(UserCreationForm):
         user.email = self.cleaned_data['email']
         if commit:
             user.save()
+            # Le profil est créé avec le compte (plus de signal sur User)
+            UserProfile.objects.create(user=user)
         return user
 
 
@@ -109,7 +111,10 @@ class ProfileUpdateForm(forms.ModelForm):
     """
     class Meta:
         model = UserProfile
-        fields = ('phone_number', 'date_of_birth', 'avatar', 'theme_preference')
+        fields = ('phone_number', 'date_of_birth', 'avatar', 'theme_preference', 'low_balance_threshold')
+        # FileField plutôt que ImageField : pas de décodage complet de l'image
+        # dans la requête, validate_image_file ne lit que l'en-tête
+        field_classes = {'avatar': forms.FileField}
         widgets = {
             'phone_number': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -120,9 +125,15 @@ class ProfileUpdateForm(forms.ModelForm):
                 'type': 'date'
             }),
             'avatar': forms.FileInput(attrs={
-                'class': 'form-control'
+                'class': 'form-control',
+                'accept': 'image/jpeg,image/png,image/gif,image/webp'
             }),
             'theme_preference': forms.Select(attrs={
                 'class': 'form-select'
+            }),
+            'low_balance_threshold': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '1000'
             })
         }
@@ -0,0 +1,22 @@
+"""
+Hachage des mots de passe.
+
+Argon2id avec les paramètres recommandés par l'OWASP (19 Mio, 2 passes,
+1 fil) : même niveau de résistance que PBKDF2 à 600 000 itérations, pour
+une vérification plus rapide et une mémoire bornée sur de petites
+instances. Les paramètres par défaut de Django (100 Mio, 8 fils) sont
+dimensionnés pour des serveurs plus gros.
+
+Les mots de passe existants (PBKDF2) sont rehachés en Argon2 à la connexion
+suivante, par Django (check_password), sans action de l'utilisateur.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id aux paramètres réglables (PASSWORD_ARGON2_* dans les settings)."""
+
+    time_cost = getattr(settings, 'PASSWORD_ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', 19456)  # Kio
+    parallelism = getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', 1)
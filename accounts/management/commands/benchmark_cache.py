@@ -0,0 +1,156 @@
+"""
+Commande pour comparer deux caches configurés sur une charge réaliste :
+lectures de clés « chaudes » (distribution de Zipf), écritures et compteurs
+(limites de débit), puis un test d'avalanche (N threads demandent la même
+clé froide en même temps) pour le cache à deux niveaux.
+
+Exemple (production) :
+    python manage.py benchmark_cache --baseline shared --candidate default
+"""
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+BENCH_PREFIX = 'bench:'
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Compare la latence de deux caches (ex. DatabaseCache seul et cache à deux niveaux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baseline',
+            default='shared',
+            help='Alias du cache de référence (défaut : shared)',
+        )
+        parser.add_argument(
+            '--candidate',
+            default='default',
+            help='Alias du cache comparé (défaut : default)',
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=5000,
+            help='Nombre d\'opérations par cache',
+        )
+        parser.add_argument(
+            '--keys',
+            type=int,
+            default=200,
+            help='Nombre de clés distinctes',
+        )
+        parser.add_argument(
+            '--stampede-threads',
+            type=int,
+            default=20,
+            help='Threads simultanés pour le test d\'avalanche (0 pour l\'ignorer)',
+        )
+
+    def handle(self, *args, **options):
+        for alias in (options['baseline'], options['candidate']):
+            if alias not in settings.CACHES:
+                raise CommandError(f'Cache « {alias} » absent de CACHES')
+
+        keys = [f'{BENCH_PREFIX}{index}' for index in range(options['keys'])]
+        # Quelques clés très demandées, beaucoup de clés rares
+        weights = [1 / (rank + 1) for rank in range(len(keys))]
+        rng = random.Random(42)
+        plan = [
+            (rng.choices(('get', 'set', 'incr'), (90, 5, 5))[0], rng.choices(keys, weights)[0])
+            for _ in range(options['operations'])
+        ]
+
+        results = {}
+        for alias in (options['baseline'], options['candidate']):
+            cache = caches[alias]
+            self.stdout.write(f'\n🔍 Cache « {alias} » ({cache.__class__.__name__})')
+            results[alias] = self._run(cache, keys, plan)
+            if hasattr(cache, 'metrics'):
+                self.stdout.write(f'  → Métriques : {cache.metrics()}')
+
+        baseline, candidate = results[options['baseline']], results[options['candidate']]
+        self.stdout.write(
+            f'\n📊 Lectures p50 : {baseline["get_p50"]:.3f} ms → {candidate["get_p50"]:.3f} ms, '
+            f'débit : {baseline["ops_per_second"]:.0f} → {candidate["ops_per_second"]:.0f} op/s'
+        )
+
+        if options['stampede_threads'] and hasattr(caches[options['candidate']], 'get_or_compute'):
+            self._stampede(caches[options['candidate']], options['stampede_threads'])
+
+        self.stdout.write(self.style.SUCCESS('✅ Mesure terminée'))
+
+    def _run(self, cache, keys, plan):
+        cache.set_many({key: {'key': key, 'payload': 'x' * 200} for key in keys}, 300)
+        for key in keys[:20]:
+            cache.set(f'{key}:count', 0, 300)
+        if hasattr(cache, 'reset_metrics'):
+            cache.reset_metrics()
+
+        durations = {'get': [], 'set': [], 'incr': []}
+        started = time.perf_counter()
+        for operation, key in plan:
+            op_started = time.perf_counter()
+            if operation == 'get':
+                cache.get(key)
+            elif operation == 'set':
+                cache.set(key, {'key': key, 'payload': 'y' * 200}, 300)
+            else:
+                cache.add(f'{key}:count', 0, 300)
+                cache.incr(f'{key}:count')
+            durations[operation].append((time.perf_counter() - op_started) * 1000)
+        elapsed = time.perf_counter() - started
+
+        cache.delete_many(keys + [f'{key}:count' for key in keys])
+
+        result = {'ops_per_second': len(plan) / elapsed}
+        for operation, values in durations.items():
+            if values:
+                result[f'{operation}_p50'] = _percentile(values, 50)
+                result[f'{operation}_p95'] = _percentile(values, 95)
+                self.stdout.write(
+                    f'  → {operation:<4} : {len(values)} op, p50 {result[f"{operation}_p50"]:.3f} ms, '
+                    f'p95 {result[f"{operation}_p95"]:.3f} ms, moyenne {statistics.mean(values):.3f} ms'
+                )
+        self.stdout.write(f'  → Débit : {result["ops_per_second"]:.0f} op/s')
+        return result
+
+    def _stampede(self, cache, threads):
+        key = f'{BENCH_PREFIX}stampede:{time.time_ns()}'
+        computations = []
+
+        def compute():
+            computations.append(1)
+            time.sleep(0.2)
+            return 'valeur'
+
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            barrier.wait()
+            cache.get_or_compute(key, compute, timeout=60)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = (time.perf_counter() - started) * 1000
+        cache.delete(key)
+        self.stdout.write(
+            f'\n🔍 Avalanche : {threads} threads sur une clé froide → '
+            f'{len(computations)} calcul(s) en {elapsed:.0f} ms'
+        )
@@ -0,0 +1,177 @@
+"""
+Commande pour mesurer le coût du parcours de connexion : requêtes SQL,
+écritures (INSERT/UPDATE/DELETE) par table, vérifications de mot de passe,
+latence et débit (connexions par seconde, avec --concurrency threads).
+Mesure aussi le temps de vérification de chaque algorithme de hachage.
+
+Exemples :
+    python manage.py benchmark_login --logins 50
+    python manage.py benchmark_login --logins 100 --concurrency 4
+"""
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, get_hashers, identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+BENCH_USERNAME = 'bench_login'
+BENCH_PASSWORD = 'bench-Login-2024!'
+
+WRITE_RE = re.compile(r'^\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Mesure les requêtes, écritures et la latence d\'une connexion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Nombre de connexions mesurées',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Connexions simultanées pour la mesure de débit (1 : pas de mesure de débit)',
+        )
+        parser.add_argument(
+            '--reset-hash',
+            action='store_true',
+            help='Réinitialiser le mot de passe de test en PBKDF2 (mesure du rehachage à la connexion)',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Supprimer l\'utilisateur de test puis quitter',
+        )
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username=BENCH_USERNAME).delete()
+            self.stdout.write(self.style.SUCCESS(f'✅ {deleted} objet(s) supprimé(s)'))
+            return
+
+        self._benchmark_hashers()
+
+        user = User.objects.filter(username=BENCH_USERNAME).first()
+        if user is None:
+            user = User.objects.create_user(BENCH_USERNAME, 'bench_login@example.com', BENCH_PASSWORD)
+            self.stdout.write(f'→ Utilisateur de test {BENCH_USERNAME} créé')
+        if options['reset_hash']:
+            user.password = make_password(BENCH_PASSWORD, hasher='pbkdf2_sha256')
+            user.save(update_fields=['password'])
+        algorithm_before = identify_hasher(user.password).algorithm
+
+        verifications = self._count_verifications()
+        login_url = reverse('accounts:login')
+        durations = []
+        queries = []
+        writes = Counter()
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for index in range(options['logins']):
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    response = self._login(login_url, index)
+                durations.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 302:
+                    self.stdout.write(self.style.ERROR(f'❌ Connexion refusée (HTTP {response.status_code})'))
+                    return
+                queries.append(len(captured))
+                for query in captured.captured_queries:
+                    match = WRITE_RE.match(query['sql'])
+                    if match:
+                        writes[(match.group(1).split()[0].upper(), match.group(2))] += 1
+
+            logins = len(durations)
+            algorithm_after = identify_hasher(User.objects.get(pk=user.pk).password).algorithm
+            self.stdout.write(f'\n🔍 {logins} connexion(s) de {BENCH_USERNAME}')
+            self.stdout.write(f'  → Hachage du mot de passe : {algorithm_before} → {algorithm_after}')
+            self.stdout.write(f'  → Vérifications du mot de passe par connexion : {sum(verifications) / logins:.1f}')
+            self.stdout.write(f'  → Requêtes par connexion : {statistics.mean(queries):.1f}')
+            self.stdout.write(f'  → Écritures par connexion : {sum(writes.values()) / logins:.1f}')
+            for (kind, table), count in sorted(writes.items(), key=lambda item: item[0][1]):
+                self.stdout.write(f'      {kind:<7} {table:<35} {count / logins:.1f}')
+            self.stdout.write(
+                f'  → Latence : p50 {_percentile(durations, 50):.1f} ms, p95 {_percentile(durations, 95):.1f} ms'
+            )
+
+            if options['concurrency'] > 1:
+                self._throughput(login_url, options['logins'], options['concurrency'])
+
+        self.stdout.write(self.style.SUCCESS('✅ Mesure terminée'))
+
+    def _login(self, login_url, index):
+        # Une adresse par connexion : la limite de 5 connexions / 5 min par IP ne s'applique pas
+        client = Client(REMOTE_ADDR=f'10.{99 + index // 62500}.{index // 250 % 250}.{index % 250 + 1}')
+        return client.post(login_url, {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+
+    def _count_verifications(self):
+        """Compte les appels à verify() des algorithmes de hachage configurés."""
+        calls = []
+        for hasher in get_hashers():
+            original = hasher.verify
+
+            def verify(password, encoded, original=original):
+                calls.append(1)
+                return original(password, encoded)
+
+            hasher.verify = verify
+        return calls
+
+    def _benchmark_hashers(self, rounds=5):
+        self.stdout.write(f'🔍 Vérification d\'un mot de passe (moyenne sur {rounds}) :')
+        preferred = get_hasher().algorithm
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode(BENCH_PASSWORD, hasher.salt())
+            except (ValueError, ImportError):
+                # Bibliothèque optionnelle absente (bcrypt, argon2...)
+                continue
+            started = time.perf_counter()
+            for _ in range(rounds):
+                hasher.verify(BENCH_PASSWORD, encoded)
+            duration = (time.perf_counter() - started) / rounds * 1000
+            marker = ' (utilisé)' if hasher.algorithm == preferred else ''
+            self.stdout.write(f'  → {hasher.algorithm:<20} {duration:7.1f} ms{marker}')
+
+    def _throughput(self, login_url, logins, concurrency):
+        counter = iter(range(100000, 100000 + logins))
+        lock = threading.Lock()
+
+        def run(_):
+            with lock:
+                index = next(counter)
+            try:
+                return self._login(login_url, index).status_code
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(run, range(logins)))
+        elapsed = time.perf_counter() - started
+        succeeded = statuses.count(302)
+        self.stdout.write(
+            f'  → Débit avec {concurrency} connexions simultanées : '
+            f'{succeeded / elapsed:.1f} connexions/s ({succeeded}/{logins} réussies)'
+        )
@@ -0,0 +1,29 @@
+"""
+Construit les bundles CSS et JavaScript minifiés (voir monnkap/assets.py).
+
+À lancer avant collectstatic (build.sh) :
+    python manage.py build_assets
+"""
+from django.core.management.base import BaseCommand
+
+from monnkap.assets import BUNDLES, build_bundle
+
+
+class Command(BaseCommand):
+    help = 'Concatène et minifie les CSS et JavaScript de la mise en page dans static/dist/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            help='Dossier de sortie (défaut : premier dossier de STATICFILES_DIRS)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔧 Construction des bundles...')
+        for name in BUNDLES:
+            output, source_size, size = build_bundle(name, options['output_dir'])
+            self.stdout.write(
+                f'  → {output.name} : {source_size / 1024:.1f} Ko → {size / 1024:.1f} Ko '
+                f'({len(BUNDLES[name])} fichier(s))'
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Bundles construits'))
@@ -0,0 +1,38 @@
+"""
+Écrit le manifeste de précache du service worker (voir monnkap/pwa.py).
+
+À lancer après collectstatic (build.sh), pour lister les URL empreintées :
+    python manage.py build_precache_manifest
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monnkap.pwa import PRECACHE_MANIFEST_NAME, build_precache_manifest
+
+
+class Command(BaseCommand):
+    help = 'Écrit le manifeste de précache du service worker dans STATIC_ROOT'
+
+    def handle(self, *args, **options):
+        if not settings.STATIC_ROOT:
+            raise CommandError('STATIC_ROOT non défini')
+
+        try:
+            manifest = build_precache_manifest()
+        except (FileNotFoundError, ValueError) as e:
+            # ValueError : fichier absent du manifeste de collectstatic
+            raise CommandError(f'Manifeste de précache impossible : {e}')
+
+        path = os.path.join(settings.STATIC_ROOT, PRECACHE_MANIFEST_NAME)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+            f.write('\n')
+
+        for entry in manifest['entries']:
+            self.stdout.write(f'  → {entry["url"]}' + (f' ({entry["revision"]})' if entry['revision'] else ''))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(manifest["entries"])} ressource(s) précachée(s), version {manifest["version"]} → {path}'
+        ))
@@ -0,0 +1,58 @@
+"""
+Commande de rattrapage des avatars : range les anciens fichiers
+(avatars/<nom d'origine>) dans le stockage adressé par contenu et génère les
+miniatures manquantes (normalement générées en arrière-plan à l'envoi).
+
+Exemples :
+    python manage.py process_avatars
+    python manage.py process_avatars --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import avatar_digest, generate_thumbnails
+from accounts.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Adresse les avatars par contenu et génère leurs miniatures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher les avatars à traiter sans rien modifier',
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+            .filter(avatar_thumbnails=False)
+            .select_related('user')
+        )
+        self.stdout.write(f'🔍 {profiles.count()} avatar(s) sans miniatures')
+
+        migrated = thumbnails = failed = 0
+        for profile in profiles.iterator():
+            name = profile.avatar.name
+            self.stdout.write(f'  → {profile.user.username} : {name}')
+            if options['dry_run']:
+                continue
+            try:
+                if avatar_digest(name) is None:
+                    with profile.avatar.storage.open(name, 'rb') as source:
+                        new_name = profile.avatar.storage.save(name, source)
+                    UserProfile.objects.filter(pk=profile.pk).update(avatar=new_name)
+                    migrated += 1
+                    name = new_name
+                thumbnails += generate_thumbnails(name)
+            except (OSError, SyntaxError) as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'  ⚠️ {profile.user.username} : {e}'))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('⚠️ Mode simulation : aucune modification'))
+            return
+        self.stdout.write(
+            f'\n📊 {migrated} avatar(s) déplacé(s), {thumbnails} miniature(s) générée(s), {failed} échec(s)'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Traitement terminé'))
@@ -0,0 +1,21 @@
+"""
+Purge le journal de synchronisation de la PWA (voir monnkap/sync.py) :
+suppressions et clés d'idempotence plus anciennes que SYNC_RETENTION_DAYS.
+
+À lancer chaque jour (cron) :
+    python manage.py prune_sync_changes
+"""
+from django.core.management.base import BaseCommand
+
+from monnkap.sync import SYNC_RETENTION_DAYS, prune_sync_log
+
+
+class Command(BaseCommand):
+    help = 'Purge les suppressions et clés d\'idempotence anciennes du journal de synchronisation'
+
+    def handle(self, *args, **options):
+        changes, operations = prune_sync_log()
+        self.stdout.write(self.style.SUCCESS(
+            f'🧹 {changes} suppression(s) et {operations} clé(s) d\'idempotence '
+            f'de plus de {SYNC_RETENTION_DAYS} jours purgée(s)'
+        ))
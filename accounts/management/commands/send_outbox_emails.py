@@ -0,0 +1,80 @@
+"""
+Commande d'envoi des emails de l'outbox (worker).
+
+Exemples :
+    python manage.py send_outbox_emails            # tourne en continu
+    python manage.py send_outbox_emails --once     # vide l'outbox puis s'arrête
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.outbox import claim_batch, deliver_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Envoie les emails en attente dans l\'outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Envoyer les emails dus puis quitter',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Nombre d\'emails réservés par lot',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Nombre d\'envois simultanés',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Attente (secondes) quand l\'outbox est vide',
+        )
+        parser.add_argument(
+            '--backend',
+            default=None,
+            help='Backend email à utiliser (ex: accounts.email_backend.FakeEmailBackend)',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = 0
+        total_failed = 0
+
+        self.stdout.write('📬 Envoi des emails de l\'outbox...')
+        try:
+            while True:
+                close_old_connections()
+                emails = claim_batch(options['batch_size'])
+                if not emails:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                sent, failed = deliver_batch(
+                    emails,
+                    concurrency=options['concurrency'],
+                    backend=options['backend']
+                )
+                total_sent += sent
+                total_failed += failed
+                self.stdout.write(f'  → Lot de {len(emails)} : {sent} envoyé(s), {failed} en échec')
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⚠️  Arrêt demandé'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total_sent} email(s) envoyé(s), {total_failed} échec(s)'
+        ))
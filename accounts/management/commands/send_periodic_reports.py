@@ -0,0 +1,270 @@
+"""
+Commande d'envoi des rapports périodiques (mensuel ou hebdomadaire) à tous les utilisateurs.
+
+Les utilisateurs sont découpés en lots par plage d'identifiants. Chaque lot
+est traité par un processus du pool : chiffres calculés par requêtes
+groupées (accounts/reports.py), messages mis en forme puis remis au backend
+email par sous-lots (regroupés par ResendEmailBackend). L'avancement est
+enregistré dans ReportRun/ReportChunk : relancer la commande reprend là où
+elle s'était arrêtée et réessaie les destinataires en échec.
+
+Exemples :
+    python manage.py send_periodic_reports monthly
+    python manage.py send_periodic_reports weekly --date 2026-10-12 --workers 4
+"""
+import multiprocessing
+import os
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import ReportChunk, ReportRun
+from accounts.reports import REPORTS, render_report_messages
+
+
+def _report_users():
+    return User.objects.filter(is_active=True).exclude(email='')
+
+
+def _init_worker():
+    # Chaque processus ouvre ses propres connexions (celles du parent ne
+    # doivent pas être partagées après le fork)
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _send(connection, messages):
+    """Remet un sous-lot au backend ; retourne le succès de chaque message."""
+    if getattr(connection, 'reports_message_status', False):
+        # Le backend regroupe lui-même et indique le résultat de chaque message
+        connection.send_messages(messages)
+        return [bool(getattr(message, 'provider_message_id', None)) for message in messages]
+    # Sinon, le nombre renvoyé ne dit pas quels messages sont partis :
+    # un message à la fois sur la même connexion
+    return [bool(connection.send_messages([message])) for message in messages]
+
+
+def process_chunk(task):
+    """
+    Traite un lot d'utilisateurs (exécuté dans un processus du pool).
+
+    Les destinataires en échec d'une exécution précédente sont réessayés en
+    premier ; le point de reprise ne passe sur un échec qu'après l'avoir
+    enregistré dans `failed_user_ids`.
+
+    Returns:
+        (first_user_id, envoyés, en échec)
+    """
+    first_user_id = task['first_user_id']
+    retry_user_ids = task['retry_user_ids']
+    in_range = Q(
+        pk__gte=first_user_id,
+        pk__lt=first_user_id + task['chunk_size'],
+        pk__gt=task['resume_after'] or 0,
+    )
+    users = _report_users().filter(in_range | Q(pk__in=retry_user_ids))
+    users = list(users.order_by('pk').values_list('pk', 'username', 'email'))
+
+    chunk = None
+    if task['run_id'] is not None:
+        chunk, created = ReportChunk.objects.get_or_create(
+            run_id=task['run_id'], first_user_id=first_user_id
+        )
+
+    messages = render_report_messages(
+        task['kind'], users, task['period_start'], task['period_end'], task['label']
+    ) if users else []
+
+    # Échecs précédents de destinataires qui ne reçoivent plus de rapport : abandonnés
+    failed_user_ids = set(retry_user_ids) & {user_id for user_id, username, email in users}
+    last_user_id = task['resume_after']
+    sent_total = 0
+    connection = None if task['dry_run'] else get_connection(task['backend'], fail_silently=True)
+    try:
+        batch_size = task['send_batch_size']
+        for index in range(0, len(messages), batch_size):
+            batch = messages[index:index + batch_size]
+            if connection is None:
+                results = [True] * len(batch)
+            else:
+                results = _send(connection, [message for user_id, message in batch])
+            for (user_id, message), ok in zip(batch, results):
+                if ok:
+                    failed_user_ids.discard(user_id)
+                else:
+                    failed_user_ids.add(user_id)
+            sent = sum(results)
+            sent_total += sent
+            last_user_id = max(last_user_id or 0, batch[-1][0])
+            if chunk is not None:
+                # Point de reprise après chaque sous-lot remis au backend
+                ReportChunk.objects.filter(pk=chunk.pk).update(
+                    last_user_id=last_user_id,
+                    failed_user_ids=sorted(failed_user_ids),
+                    sent_count=F('sent_count') + sent,
+                    failed_count=len(failed_user_ids),
+                )
+    finally:
+        if connection is not None:
+            connection.close()
+
+    if chunk is not None:
+        ReportChunk.objects.filter(pk=chunk.pk).update(
+            failed_user_ids=sorted(failed_user_ids),
+            failed_count=len(failed_user_ids),
+            is_done=not failed_user_ids,
+        )
+    return first_user_id, sent_total, len(failed_user_ids)
+
+
+class Command(BaseCommand):
+    help = 'Envoie le rapport mensuel ou le résumé hebdomadaire à tous les utilisateurs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind',
+            choices=sorted(REPORTS),
+            help='Type de rapport',
+        )
+        parser.add_argument(
+            '--date',
+            help='Date comprise dans la période (AAAA-MM-JJ) ; défaut : période précédente',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Plage d\'identifiants d\'utilisateurs par lot',
+        )
+        parser.add_argument(
+            '--send-batch-size',
+            type=int,
+            default=100,
+            help='Nombre de messages remis au backend à la fois',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Nombre de processus',
+        )
+        parser.add_argument(
+            '--backend',
+            default=None,
+            help='Backend email à utiliser (défaut : EMAIL_BACKEND)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignorer l\'avancement enregistré et tout renvoyer',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calculer et mettre en forme sans envoyer ni enregistrer d\'avancement',
+        )
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        report = REPORTS[kind]
+        if options['date']:
+            try:
+                reference = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Date invalide, format attendu : AAAA-MM-JJ')
+            period_start, period_end, label = report['period'](reference)
+        else:
+            period_start, period_end, label = report['previous_period']()
+
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        run = None
+        done = set()
+        resume = {}
+        if not dry_run:
+            run, created = ReportRun.objects.get_or_create(
+                kind=kind,
+                period_start=period_start,
+                defaults={'period_end': period_end, 'chunk_size': chunk_size}
+            )
+            if options['restart']:
+                run.chunks.all().delete()
+                run.finished_at = None
+            # Les lots enregistrés imposent la taille d'origine pour reprendre
+            chunk_size = run.chunk_size if run.chunks.exists() else chunk_size
+            run.chunk_size = chunk_size
+            run.save(update_fields=['chunk_size', 'finished_at'])
+            for first_user_id, last_user_id, failed_user_ids, is_done in run.chunks.values_list(
+                'first_user_id', 'last_user_id', 'failed_user_ids', 'is_done'
+            ):
+                if is_done:
+                    done.add(first_user_id)
+                else:
+                    resume[first_user_id] = (last_user_id, failed_user_ids)
+
+        buckets = sorted({
+            user_id // chunk_size * chunk_size
+            for user_id in _report_users().values_list('pk', flat=True).iterator()
+        } | set(resume))
+        tasks = [
+            {
+                'run_id': run.pk if run else None,
+                'kind': kind,
+                'period_start': period_start,
+                'period_end': period_end,
+                'label': label,
+                'first_user_id': first_user_id,
+                'chunk_size': chunk_size,
+                'resume_after': resume.get(first_user_id, (None, []))[0],
+                'retry_user_ids': resume.get(first_user_id, (None, []))[1],
+                'send_batch_size': options['send_batch_size'],
+                'backend': options['backend'],
+                'dry_run': dry_run,
+            }
+            for first_user_id in buckets if first_user_id not in done
+        ]
+
+        self.stdout.write(
+            f'📨 {label} : {len(tasks)} lot(s) à traiter'
+            f'{f" ({len(done)} déjà terminé(s))" if done else ""}'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  MODE DRY-RUN - Aucun email envoyé'))
+
+        sent_total = failed_total = 0
+        workers = max(1, options['workers'])
+        if workers > 1 and len(tasks) > 1:
+            connections.close_all()
+            with multiprocessing.Pool(min(workers, len(tasks)), initializer=_init_worker) as pool:
+                results = pool.imap_unordered(process_chunk, tasks)
+                for first_user_id, sent, failed in results:
+                    sent_total += sent
+                    failed_total += failed
+                    self.stdout.write(f'  → Lot {first_user_id} : {sent} envoyé(s), {failed} échec(s)')
+        else:
+            for task in tasks:
+                first_user_id, sent, failed = process_chunk(task)
+                sent_total += sent
+                failed_total += failed
+                self.stdout.write(f'  → Lot {first_user_id} : {sent} envoyé(s), {failed} échec(s)')
+
+        if run is not None:
+            totals = run.chunks.values_list('sent_count', 'failed_count')
+            run.sent_count = sum(sent for sent, failed in totals)
+            run.failed_count = sum(failed for sent, failed in totals)
+            run.finished_at = timezone.now()
+            run.save(update_fields=['sent_count', 'failed_count', 'finished_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {sent_total} rapport(s) envoyé(s), {failed_total} échec(s)'
+        ))
+        if failed_total and run is not None:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  Relancer la même commande pour réessayer les destinataires en échec'
+            ))
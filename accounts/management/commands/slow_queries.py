@@ -0,0 +1,100 @@
+"""
+Requêtes SQL lentes les plus coûteuses (voir monnkap/slow_queries.py).
+
+Exemples :
+    python manage.py slow_queries                    # top 20 par durée cumulée
+    python manage.py slow_queries --order max --limit 5 --explain
+    python manage.py slow_queries --capture-plans    # plans en attente (cron)
+    python manage.py slow_queries --reset            # vide le journal
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from accounts.models import SlowQuery
+from monnkap.slow_queries import capture_pending_plans
+
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'count': '-count',
+    'mean': '-mean',
+}
+
+
+class Command(BaseCommand):
+    help = 'Affiche les requêtes SQL lentes les plus coûteuses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Nombre de requêtes affichées',
+        )
+        parser.add_argument(
+            '--order',
+            choices=sorted(ORDERINGS),
+            default='total',
+            help='Tri : durée cumulée, maximale, moyenne ou nombre d\'occurrences',
+        )
+        parser.add_argument(
+            '--view',
+            help='Seulement les requêtes de cette vue (ex: dashboard:home)',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Afficher le plan d\'exécution capturé',
+        )
+        parser.add_argument(
+            '--capture-plans',
+            action='store_true',
+            help='Capturer les plans des requêtes notées pendant les requêtes HTTP (--limit au plus)',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Supprimer toutes les requêtes enregistrées',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'🧹 {deleted} requête(s) lente(s) supprimée(s)'))
+            return
+
+        if options['capture_plans']:
+            captured, failed = capture_pending_plans(limit=options['limit'])
+            self.stdout.write(self.style.SUCCESS(f'📊 {captured} plan(s) capturé(s)'))
+            if failed:
+                self.stdout.write(self.style.WARNING(f'⚠️ {failed} plan(s) indisponible(s)'))
+            return
+
+        queries = SlowQuery.objects.annotate(
+            mean=ExpressionWrapper(F('total_ms') / F('count'), output_field=FloatField())
+        )
+        if options['view']:
+            queries = queries.filter(view=options['view'])
+        queries = list(queries.order_by(ORDERINGS[options['order']])[:options['limit']])
+
+        if not queries:
+            self.stdout.write('✅ Aucune requête lente enregistrée')
+            return
+
+        self.stdout.write(f'🔍 {len(queries)} requête(s) lente(s), tri : {options["order"]}\n')
+        for rank, query in enumerate(queries, 1):
+            self.stdout.write(self.style.WARNING(
+                f'{rank:>2}. ×{query.count}  total {query.total_ms:.0f} ms  '
+                f'max {query.max_ms:.0f} ms  moyenne {query.mean_ms:.0f} ms  [{query.fingerprint[:12]}]'
+            ))
+            self.stdout.write(f'    → {query.view or "?"} : {query.location or "?"}')
+            self.stdout.write(f'    {query.sql[:500]}')
+            if options['explain']:
+                if query.explain:
+                    self.stdout.write(f'    📊 Plan ({query.explained_at:%Y-%m-%d %H:%M}) :')
+                    for line in query.explain.splitlines():
+                        self.stdout.write(f'      {line}')
+                else:
+                    self.stdout.write('    📊 Pas de plan capturé')
+            self.stdout.write('')
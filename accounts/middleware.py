@@ -0,0 +1,48 @@
+"""
+Middlewares de l'application accounts.
+"""
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .user_context import get_user
+
+
+def _get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+class UserContextMiddleware(AuthenticationMiddleware):
+    """
+    Remplace AuthenticationMiddleware : `request.user` reste paresseux, mais
+    son chargement joint le profil et le portefeuille (voir accounts/user_context.py).
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _get_cached_user(request))
+
+
+class SessionWriteCoalescingMiddleware(SessionMiddleware):
+    """
+    Remplace SessionMiddleware (avec SESSION_SAVE_EVERY_REQUEST = False) :
+    la session est enregistrée si elle a été modifiée, ou si son expiration
+    glissante doit être repoussée (voir accounts/session_backend.py).
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if (
+            session is not None
+            and not session.modified
+            and session.session_key is not None
+            and hasattr(session, 'needs_refresh')
+        ):
+            accessed = session.accessed
+            if session.needs_refresh():
+                session.modified = True
+            # La vérification ne doit pas ajouter « Vary: Cookie » à elle seule
+            session.accessed = accessed
+        return super().process_response(request, response)
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('monthly', 'Rapport mensuel'), ('weekly', 'Résumé hebdomadaire')], max_length=10, verbose_name='Type')),
+                ('period_start', models.DateField(verbose_name='Début de période')),
+                ('period_end', models.DateField(verbose_name='Fin de période')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Taille des lots')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Emails envoyés')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Emails en échec')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Démarré le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+            ],
+            options={
+                'verbose_name': 'Envoi de rapports',
+                'verbose_name_plural': 'Envois de rapports',
+                'ordering': ['-started_at'],
+                'unique_together': {('kind', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_user_id', models.PositiveBigIntegerField(verbose_name='Premier utilisateur')),
+                ('last_user_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Dernier utilisateur traité')),
+                ('is_done', models.BooleanField(default=False, verbose_name='Terminé')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Emails envoyés')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Emails en échec')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='accounts.reportrun', verbose_name='Envoi')),
+            ],
+            options={
+                'verbose_name': 'Lot de rapports',
+                'verbose_name_plural': 'Lots de rapports',
+                'unique_together': {('run', 'first_user_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:42
+
+from decimal import Decimal
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0008_reportrun_reportchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='low_balance_threshold',
+            field=models.DecimalField(decimal_places=2, default=Decimal('50000.00'), help_text='Alerte par email quand le solde disponible passe sous ce montant (0 pour désactiver).', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name="Seuil d'alerte de solde bas"),
+        ),
+        migrations.CreateModel(
+            name='AlertState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, verbose_name='Alerte')),
+                ('level', models.CharField(blank=True, default='', max_length=20, verbose_name='Niveau actuel')),
+                ('sent_level', models.CharField(blank=True, default='', max_length=20, verbose_name='Dernier niveau notifié')),
+                ('last_sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernier envoi')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_states', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "État d'alerte",
+                'verbose_name_plural': "États d'alertes",
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:53
+
+import accounts.avatars
+import accounts.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_alertstate_low_balance_threshold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_thumbnails',
+            field=models.BooleanField(default=False, editable=False, verbose_name="Miniatures de l'avatar générées"),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, help_text='Formats acceptés: JPG, PNG, GIF, WebP. Taille max: 5 MB.', null=True, storage=accounts.avatars.avatar_storage, upload_to='avatars/', validators=[accounts.validators.validate_image_file], verbose_name='Photo de profil'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True, verbose_name='Empreinte')),
+                ('sql', models.TextField(verbose_name='Requête normalisée')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Occurrences')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Durée cumulée (ms)')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Durée maximale (ms)')),
+                ('view', models.CharField(blank=True, default='', max_length=200, verbose_name='Vue')),
+                ('location', models.CharField(blank=True, default='', max_length=500, verbose_name='Origine')),
+                ('explain', models.TextField(blank=True, default='', verbose_name="Plan d'exécution")),
+                ('explained_at', models.DateTimeField(blank=True, null=True, verbose_name='Plan capturé le')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Vue la première fois')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Vue la dernière fois')),
+            ],
+            options={
+                'verbose_name': 'Requête lente',
+                'verbose_name_plural': 'Requêtes lentes',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
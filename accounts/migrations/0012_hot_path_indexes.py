@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0011_slowquery'),
+    ]
+
+    operations = [
+        # Index composites créés avant de supprimer les index des clés
+        # étrangères qu'ils remplacent
+        migrations.AddIndex(
+            model_name='emailverificationcode',
+            index=models.Index(fields=['user', 'is_used', 'expires_at'], name='accounts_code_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'transaction_type'], name='accounts_wallettx_type_idx'),
+        ),
+        migrations.AlterField(
+            model_name='emailverificationcode',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='verification_codes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='wallet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='accounts.wallet', verbose_name='Portefeuille'),
+        ),
+    ]
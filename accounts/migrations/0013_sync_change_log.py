@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, verbose_name="Clé d'idempotence")),
+                ('kind', models.CharField(max_length=20, verbose_name='Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Objet créé')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Opération synchronisée',
+                'verbose_name_plural': 'Opérations synchronisées',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('expense', 'Dépense'), ('transaction', 'Transaction'), ('goal', 'Objectif'), ('category', 'Catégorie')], max_length=20, verbose_name='Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Objet')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Supprimé')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Modifié le')),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Changement synchronisé',
+                'verbose_name_plural': 'Changements synchronisés',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='accounts_syncchange_user_idx'), models.Index(fields=['kind', 'object_id'], name='accounts_syncchange_obj_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated manually on 2026-10-19
+"""
+Migration de données : une ligne SyncChange par objet existant (catégories,
+objectifs, transactions, dépenses), pour qu'une première synchronisation
+depuis le curseur 0 renvoie toutes les données.
+"""
+
+from django.db import migrations
+
+
+SOURCES = (
+    # (type, application, modèle, champ utilisateur)
+    ('category', 'expenses', 'Category', None),
+    ('goal', 'goals', 'Goal', 'user_id'),
+    ('transaction', 'accounts', 'WalletTransaction', 'wallet__user_id'),
+    ('expense', 'expenses', 'Expense', 'user_id'),
+)
+
+
+def backfill_sync_changes(apps, schema_editor):
+    SyncChange = apps.get_model('accounts', 'SyncChange')
+
+    entries = []
+    for kind, app_label, model_name, user_field in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        if user_field is None:
+            rows = ((pk, None) for pk in model.objects.order_by('pk').values_list('pk', flat=True).iterator())
+        else:
+            rows = model.objects.order_by('pk').values_list('pk', user_field).iterator()
+        for object_id, user_id in rows:
+            entries.append(SyncChange(kind=kind, object_id=object_id, user_id=user_id))
+            if len(entries) >= 1000:
+                SyncChange.objects.bulk_create(entries)
+                entries = []
+    if entries:
+        SyncChange.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_sync_change_log'),
+        ('expenses', '0003_hot_path_indexes'),
+        ('goals', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sync_changes, migrations.RunPython.noop),
+    ]
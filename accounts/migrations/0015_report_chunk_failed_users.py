@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_backfill_sync_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportchunk',
+            name='failed_user_ids',
+            field=models.JSONField(blank=True, default=list, verbose_name='Utilisateurs en échec'),
+        ),
+    ]
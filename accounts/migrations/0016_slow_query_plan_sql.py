@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_report_chunk_failed_users'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slowquery',
+            name='plan_sql',
+            field=models.TextField(blank=True, default='', verbose_name='Requête en attente de plan (paramètres liés)'),
+        ),
+    ]
@@ -1,18 +1,26 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from decimal import Decimal
 import random
 import string
 from .validators import validate_image_file
+from .avatars import avatar_storage, schedule_thumbnails
 
 class UserProfile(models.Model):
     """
     Extension du modèle User de Django pour ajouter des informations supplémentaires.
-    Un profil est automatiquement créé lors de la création d'un utilisateur.
+    Le profil est créé à l'inscription (UserRegistrationForm.save) ; pour les
+    comptes créés autrement (admin, createsuperuser), il est créé au premier
+    accès par accounts.user_context.get_user_profile().
+
+    save() n'écrit que les champs modifiés depuis le chargement, et rien du
+    tout si aucun champ n'a changé. Un nouvel avatar déclenche la génération
+    de ses miniatures en arrière-plan (voir accounts/avatars.py).
     """
     THEME_CHOICES = [
         ('auto', 'Automatique (système)'),
@@ -39,18 +47,32 @@ class UserProfile(models.Model):
     )
     avatar = models.ImageField(
         upload_to='avatars/',
+        storage=avatar_storage,
         blank=True,
         null=True,
         verbose_name='Photo de profil',
         validators=[validate_image_file],
         help_text='Formats acceptés: JPG, PNG, GIF, WebP. Taille max: 5 MB.'
     )
+    avatar_thumbnails = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Miniatures de l\'avatar générées'
+    )
     theme_preference = models.CharField(
         max_length=10,
         choices=THEME_CHOICES,
         default='auto',
         verbose_name='Thème préféré'
     )
+    low_balance_threshold = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('50000.00'),
+        validators=[MinValueValidator(Decimal('0.00'))],
+        verbose_name='Seuil d\'alerte de solde bas',
+        help_text='Alerte par email quand le solde disponible passe sous ce montant (0 pour désactiver).'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Date de création'
@@ -74,19 +96,130 @@ class UserProfile(models.Model):
             return f"{self.user.first_name} {self.user.last_name}"
         return self.user.username
 
+    # ==================== SUIVI DES MODIFICATIONS ====================
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def _snapshot(self):
+        self._loaded_values = {
+            field.attname: self._tracked_value(field)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(field, models.FileField):
+            return value.name if value else None
+        return value
+
+    def get_dirty_fields(self):
+        """
+        Champs modifiés depuis le chargement depuis la base.
+
+        Returns:
+            Liste de noms de champs, ou None si l'état d'origine est inconnu
+            (profil pas encore enregistré)
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return None
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.attname not in loaded or field.attname not in self.__dict__:
+                continue
+            value = getattr(self, field.attname)
+            if isinstance(field, models.FileField):
+                # Nouveau fichier pas encore stocké, ou fichier remplacé/retiré
+                if (value and not value._committed) or (value.name or None) != (loaded[field.attname] or None):
+                    dirty.append(field.name)
+            elif value != loaded[field.attname]:
+                dirty.append(field.name)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        """Enregistre uniquement les champs modifiés (aucune requête si rien n'a changé)."""
+        dirty = self.get_dirty_fields()
+        avatar_changed = bool(self.avatar) and (dirty is None or 'avatar' in dirty)
+        if dirty and 'avatar' in dirty:
+            self.avatar_thumbnails = False
+            dirty.append('avatar_thumbnails')
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            if dirty is not None:
+                if not dirty:
+                    return
+                kwargs['update_fields'] = dirty + ['updated_at']
+        super().save(*args, **kwargs)
+        self._snapshot()
+        if avatar_changed and not self.avatar_thumbnails:
+            schedule_thumbnails(self.avatar.name)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_user_theme(sender, instance, **kwargs):
+    """Invalide le thème mémorisé dans les sessions de l'utilisateur."""
+    from .user_context import bump_profile_version
+    bump_profile_version(instance.user_id)
 
-# Signal pour créer automatiquement un profil lors de la création d'un utilisateur
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Crée un profil utilisateur automatiquement lors de la création d'un User."""
-    if created:
-        UserProfile.objects.create(user=instance)
+
+@receiver(post_save, sender=UserProfile)
+def bump_profile_data_version(sender, instance, **kwargs):
+    """
+    Change la version des pages de l'utilisateur et de ses groupes (nom et
+    avatar affichés dans les listes de membres), voir monnkap/conditional.py.
+    """
+    from groups.models import Membership
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_user_version(instance.user_id)
+    bump_group_version(*Membership.objects.filter(user_id=instance.user_id).values_list('group_id', flat=True))
+
+
+# Champs de User affichés sur les pages (salutation, listes de membres) ;
+# comprend les champs de l'index de recherche (groups.search.SEARCH_FIELDS)
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+@receiver(pre_save, sender=User)
+def snapshot_user_display_fields(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Mémorise les champs affichés enregistrés (`_saved_display_fields`, None
+    si inconnus) et s'ils changent (voir bump_user_data_version et
+    groups.models.update_user_search_index).
+    """
+    instance._display_fields_changed = False
+    instance._saved_display_fields = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(USER_DISPLAY_FIELDS):
+        # Ex. mise à jour de last_login à la connexion
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*USER_DISPLAY_FIELDS).first()
+    instance._saved_display_fields = previous
+    instance._display_fields_changed = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in USER_DISPLAY_FIELDS
+    )
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Sauvegarde le profil utilisateur lors de la sauvegarde du User."""
-    instance.profile.save()
+def bump_user_data_version(sender, instance, created, **kwargs):
+    """
+    Change la version des pages de l'utilisateur et de ses groupes (noms des
+    membres) quand son nom ou son email change, voir monnkap/conditional.py.
+    """
+    if created or not getattr(instance, '_display_fields_changed', False):
+        return
+    from groups.models import Membership
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_user_version(instance.pk)
+    bump_group_version(*Membership.objects.filter(user_id=instance.pk).values_list('group_id', flat=True))
 
 
 # ==================== IMPORT DES MODÈLES WALLET ====================
@@ -100,7 +233,8 @@ class EmailVerificationCode(models.Model):
     """
     Code de vérification d'email à 6 chiffres
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='verification_codes')
+    # Index couvert par accounts_code_lookup_idx (voir Meta.indexes)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='verification_codes', db_index=False)
     code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
@@ -108,6 +242,10 @@ class EmailVerificationCode(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Codes encore valides d'un utilisateur
+            models.Index(fields=['user', 'is_used', 'expires_at'], name='accounts_code_lookup_idx'),
+        ]
     
     def __str__(self):
         return f"Code {self.code} pour {self.user.username}"
@@ -137,3 +275,229 @@ class EmailVerificationCode(models.Model):
         """Marque le code comme utilisé"""
         self.is_used = True
         self.save()
+
+
+class OutboxEmail(models.Model):
+    """
+    Email transactionnel en attente d'envoi (outbox).
+    Écrit dans la même transaction que l'action qui le déclenche, puis
+    envoyé par la commande `send_outbox_emails` (voir accounts/outbox.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sending', 'En cours d\'envoi'),
+        ('sent', 'Envoyé'),
+        ('failed', 'Échec'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbox_emails',
+        verbose_name='Utilisateur'
+    )
+    kind = models.CharField(max_length=50, verbose_name='Type')
+    to_email = models.EmailField(verbose_name='Destinataire')
+    subject = models.CharField(max_length=255, verbose_name='Sujet')
+    template_name = models.CharField(max_length=255, verbose_name='Template')
+    context = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name='Contexte')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='Statut'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Prochaine tentative')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Réservé le')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Envoyé le')
+    provider_message_id = models.CharField(max_length=255, blank=True, default='', verbose_name='Identifiant fournisseur')
+    last_error = models.TextField(blank=True, default='', verbose_name='Dernière erreur')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date de création')
+
+    class Meta:
+        verbose_name = 'Email en attente'
+        verbose_name_plural = 'Emails en attente'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} → {self.to_email} ({self.get_status_display()})"
+
+
+class ReportRun(models.Model):
+    """
+    Exécution d'un envoi de rapports périodiques (une par type et période).
+    Sert de point de reprise à la commande `send_periodic_reports`.
+    """
+    KIND_CHOICES = [
+        ('monthly', 'Rapport mensuel'),
+        ('weekly', 'Résumé hebdomadaire'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Type')
+    period_start = models.DateField(verbose_name='Début de période')
+    period_end = models.DateField(verbose_name='Fin de période')
+    chunk_size = models.PositiveIntegerField(verbose_name='Taille des lots')
+    sent_count = models.PositiveIntegerField(default=0, verbose_name='Emails envoyés')
+    failed_count = models.PositiveIntegerField(default=0, verbose_name='Emails en échec')
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='Démarré le')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminé le')
+
+    class Meta:
+        verbose_name = 'Envoi de rapports'
+        verbose_name_plural = 'Envois de rapports'
+        ordering = ['-started_at']
+        unique_together = ('kind', 'period_start')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} du {self.period_start}"
+
+
+class ReportChunk(models.Model):
+    """
+    Lot d'utilisateurs d'un envoi de rapports : [first_user_id, first_user_id + taille).
+    `last_user_id` avance après chaque sous-lot envoyé pour reprendre sans doublon ;
+    les destinataires en échec restent dans `failed_user_ids` et sont réessayés
+    à la reprise. Le lot n'est terminé qu'une fois la liste vide.
+    """
+    run = models.ForeignKey(ReportRun, on_delete=models.CASCADE, related_name='chunks', verbose_name='Envoi')
+    first_user_id = models.PositiveBigIntegerField(verbose_name='Premier utilisateur')
+    last_user_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='Dernier utilisateur traité')
+    failed_user_ids = models.JSONField(default=list, blank=True, verbose_name='Utilisateurs en échec')
+    is_done = models.BooleanField(default=False, verbose_name='Terminé')
+    sent_count = models.PositiveIntegerField(default=0, verbose_name='Emails envoyés')
+    failed_count = models.PositiveIntegerField(default=0, verbose_name='Emails en échec')
+
+    class Meta:
+        verbose_name = 'Lot de rapports'
+        verbose_name_plural = 'Lots de rapports'
+        unique_together = ('run', 'first_user_id')
+
+    def __str__(self):
+        return f"{self.run} - lot {self.first_user_id}"
+
+
+class AlertState(models.Model):
+    """
+    État d'une alerte pour un utilisateur (solde bas, seuil d'un budget).
+    Une alerte part une seule fois quand la condition apparaît ou s'aggrave,
+    puis se réarme quand la condition disparaît (voir accounts/alerts.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alert_states', verbose_name='Utilisateur')
+    key = models.CharField(max_length=50, verbose_name='Alerte')
+    level = models.CharField(max_length=20, blank=True, default='', verbose_name='Niveau actuel')
+    sent_level = models.CharField(max_length=20, blank=True, default='', verbose_name='Dernier niveau notifié')
+    last_sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Dernier envoi')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Dernière modification')
+
+    class Meta:
+        verbose_name = 'État d\'alerte'
+        verbose_name_plural = 'États d\'alertes'
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key} ({self.level or 'armée'})"
+
+
+class SlowQuery(models.Model):
+    """
+    Requêtes SQL lentes regroupées par empreinte (forme normalisée de la
+    requête), alimentées par monnkap/slow_queries.py. Le plan d'exécution
+    est celui de l'exécution la plus lente (rafraîchi périodiquement) : la
+    requête est notée dans `plan_sql` pendant la requête HTTP, son plan est
+    capturé plus tard par `manage.py slow_queries --capture-plans`.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True, verbose_name='Empreinte')
+    sql = models.TextField(verbose_name='Requête normalisée')
+    count = models.PositiveIntegerField(default=0, verbose_name='Occurrences')
+    total_ms = models.FloatField(default=0, verbose_name='Durée cumulée (ms)')
+    max_ms = models.FloatField(default=0, verbose_name='Durée maximale (ms)')
+    view = models.CharField(max_length=200, blank=True, default='', verbose_name='Vue')
+    location = models.CharField(max_length=500, blank=True, default='', verbose_name='Origine')
+    explain = models.TextField(blank=True, default='', verbose_name='Plan d\'exécution')
+    plan_sql = models.TextField(blank=True, default='', verbose_name='Requête en attente de plan (paramètres liés)')
+    explained_at = models.DateTimeField(null=True, blank=True, verbose_name='Plan capturé le')
+    first_seen = models.DateTimeField(auto_now_add=True, verbose_name='Vue la première fois')
+    last_seen = models.DateTimeField(default=timezone.now, verbose_name='Vue la dernière fois')
+
+    class Meta:
+        verbose_name = 'Requête lente'
+        verbose_name_plural = 'Requêtes lentes'
+        ordering = ['-total_ms']
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ×{self.count} ({self.max_ms:.0f} ms max)"
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+
+class SyncChange(models.Model):
+    """
+    Journal des changements pour la synchronisation de la PWA (voir
+    monnkap/sync.py). Une seule ligne par objet, remplacée à chaque
+    modification : l'identifiant, croissant, sert de curseur.
+    Catégories (partagées) : utilisateur vide.
+    """
+    KIND_CHOICES = [
+        ('expense', 'Dépense'),
+        ('transaction', 'Transaction'),
+        ('goal', 'Objectif'),
+        ('category', 'Catégorie'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Utilisateur',
+        # Index couvert par accounts_syncchange_user_idx (voir Meta.indexes)
+        db_index=False,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Type')
+    object_id = models.PositiveBigIntegerField(verbose_name='Objet')
+    deleted = models.BooleanField(default=False, verbose_name='Supprimé')
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name='Modifié le')
+
+    class Meta:
+        verbose_name = 'Changement synchronisé'
+        verbose_name_plural = 'Changements synchronisés'
+        ordering = ['id']
+        indexes = [
+            # Changements d'un utilisateur après un curseur (API de synchronisation)
+            models.Index(fields=['user', 'id'], name='accounts_syncchange_user_idx'),
+            # Ligne précédente d'un objet, remplacée à chaque changement
+            models.Index(fields=['kind', 'object_id'], name='accounts_syncchange_obj_idx'),
+        ]
+
+    def __str__(self):
+        action = 'suppression' if self.deleted else 'modification'
+        return f"#{self.pk} {self.kind} {self.object_id} ({action})"
+
+
+class SyncOperation(models.Model):
+    """
+    Opération envoyée par la PWA (création hors ligne), enregistrée avec sa
+    clé d'idempotence : un lot renvoyé après une coupure n'est pas rejoué.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Utilisateur')
+    key = models.CharField(max_length=64, verbose_name='Clé d\'idempotence')
+    kind = models.CharField(max_length=20, verbose_name='Type')
+    object_id = models.PositiveBigIntegerField(verbose_name='Objet créé')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date de création')
+
+    class Meta:
+        verbose_name = 'Opération synchronisée'
+        verbose_name_plural = 'Opérations synchronisées'
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user_id} {self.key} → {self.kind} {self.object_id}"
@@ -0,0 +1,276 @@
+"""
+Outbox des emails transactionnels.
+
+Les vues n'appellent plus le fournisseur d'email : elles enregistrent un
+OutboxEmail dans la même transaction que l'action (inscription, contribution,
+transaction). La commande `send_outbox_emails` réserve ensuite les emails dus
+par lots (SELECT ... FOR UPDATE SKIP LOCKED sous PostgreSQL, ce qui permet
+plusieurs workers), les met en forme et les envoie en parallèle, avec
+nouvelles tentatives espacées en cas d'échec.
+
+Le contexte des templates est stocké en JSON : les instances de modèles y
+sont remplacées par une référence {'__model__': 'app.model', 'pk': ...} et
+rechargées au moment de l'envoi.
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, models, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from monnkap.metrics import record_email_result, record_email_send
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+OUTBOX_RETRY_BASE_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_DELAY', 30)  # secondes
+OUTBOX_RETRY_MAX_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_DELAY', 3600)
+# Au-delà, un email resté 'sending' est considéré abandonné (worker arrêté)
+OUTBOX_SENDING_TIMEOUT = getattr(settings, 'EMAIL_OUTBOX_SENDING_TIMEOUT', 600)
+
+
+class MissingReference(Exception):
+    """Un objet référencé dans le contexte a été supprimé avant l'envoi."""
+
+
+# ==================== CONTEXTE ====================
+
+def serialize_context(value):
+    """Remplace les instances de modèles par des références JSON."""
+    if isinstance(value, models.Model):
+        return {'__model__': value._meta.label_lower, 'pk': value.pk}
+    if isinstance(value, dict):
+        return {key: serialize_context(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize_context(item) for item in value]
+    return value
+
+
+def _collect_references(value, references):
+    if isinstance(value, dict):
+        if '__model__' in value:
+            references.setdefault(value['__model__'], set()).add(value['pk'])
+        else:
+            for item in value.values():
+                _collect_references(item, references)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_references(item, references)
+
+
+def _resolve(value, objects):
+    if isinstance(value, dict):
+        if '__model__' in value:
+            obj = objects.get(value['__model__'], {}).get(value['pk'])
+            if obj is None:
+                raise MissingReference(f"{value['__model__']} #{value['pk']}")
+            return obj
+        return {key: _resolve(item, objects) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, objects) for item in value]
+    return value
+
+
+def load_contexts(emails):
+    """Recharge les objets référencés par un lot d'emails (une requête par modèle)."""
+    references = {}
+    for email in emails:
+        _collect_references(email.context, references)
+    objects = {
+        label: apps.get_model(label).objects.in_bulk(list(pks))
+        for label, pks in references.items()
+    }
+    return objects
+
+
+# ==================== ÉCRITURE ====================
+
+def queue_email(kind, to_email, subject, template_name, context, user=None):
+    """
+    Enregistre un email dans l'outbox.
+
+    À appeler dans la transaction de l'action déclenchante : si celle-ci est
+    annulée, l'email ne part pas.
+
+    Args:
+        kind: Type d'email ('welcome', 'goal_achieved'...)
+        to_email: Adresse du destinataire (ignoré si vide)
+        subject: Sujet de l'email
+        template_name: Template HTML
+        context: Contexte du template (instances de modèles acceptées)
+        user: Utilisateur concerné
+    """
+    if not to_email:
+        return None
+    return OutboxEmail.objects.create(
+        user=user,
+        kind=kind,
+        to_email=to_email,
+        subject=subject,
+        template_name=template_name,
+        context=serialize_context(context),
+    )
+
+
+# ==================== ENVOI ====================
+
+def claim_batch(batch_size):
+    """
+    Réserve un lot d'emails dus et les passe au statut 'sending'.
+    Les lignes déjà réservées par un autre worker sont ignorées (SKIP LOCKED).
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=OUTBOX_SENDING_TIMEOUT)
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                models.Q(status='pending', next_attempt_at__lte=now) |
+                models.Q(status='sending', locked_at__lt=stale)
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if emails:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status='sending',
+                locked_at=now,
+                attempts=models.F('attempts') + 1
+            )
+            for email in emails:
+                email.attempts += 1
+    return emails
+
+
+def retry_delay(attempts):
+    """Délai avant la prochaine tentative (exponentiel, avec gigue)."""
+    delay = min(OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _build_message(email, objects):
+    html = render_to_string(email.template_name, _resolve(email.context, objects))
+    message = EmailMultiAlternatives(
+        email.subject,
+        strip_tags(html),
+        settings.DEFAULT_FROM_EMAIL,
+        [email.to_email],
+    )
+    message.attach_alternative(html, 'text/html')
+    # Même clé à chaque tentative : pas de doublon si un envoi accepté est retenté
+    message.idempotency_key = f'outbox-{email.pk}'
+    return message
+
+
+def _send(message, backend):
+    """Envoie un message (exécuté dans un thread du pool)."""
+    started = time.perf_counter()
+    try:
+        connection = get_connection(backend, fail_silently=False)
+        if not connection.send_messages([message]):
+            raise RuntimeError("Le backend n'a envoyé aucun message")
+        return getattr(message, 'provider_message_id', '') or ''
+    finally:
+        record_email_send('single', time.perf_counter() - started)
+        close_old_connections()
+
+
+def _mark_failed(email, error):
+    email.last_error = str(error)[:2000]
+    email.locked_at = None
+    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        record_email_result('failed')
+        logger.error(f"Email {email.pk} ({email.kind}) abandonné après {email.attempts} tentatives: {error}")
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        record_email_result('retry')
+        logger.warning(f"Email {email.pk} ({email.kind}) en échec, nouvelle tentative prévue: {error}")
+    email.save(update_fields=['status', 'last_error', 'locked_at', 'next_attempt_at'])
+
+
+def deliver_batch(emails, concurrency=4, backend=None):
+    """
+    Met en forme puis envoie un lot d'emails réservés.
+
+    La mise en forme (templates, accès à la base) reste dans le thread
+    courant ; seuls les appels au fournisseur sont parallélisés. Un backend
+    qui indique le statut de chaque message (`reports_message_status`,
+    ex. ResendEmailBackend) reçoit tout le lot en un appel.
+
+    Returns:
+        (nombre envoyés, nombre en échec)
+    """
+    backend = backend or getattr(settings, 'EMAIL_OUTBOX_BACKEND', None)
+    objects = load_contexts(emails)
+
+    ready = []
+    failed = 0
+    for email in emails:
+        try:
+            ready.append((email, _build_message(email, objects)))
+        except MissingReference as e:
+            # Objet supprimé : inutile de réessayer
+            email.attempts = OUTBOX_MAX_ATTEMPTS
+            _mark_failed(email, f"Référence supprimée: {e}")
+            failed += 1
+        except Exception as e:
+            _mark_failed(email, e)
+            failed += 1
+
+    connection = get_connection(backend, fail_silently=True)
+    if getattr(connection, 'reports_message_status', False):
+        # Le backend envoie le lot lui-même (regroupement, concurrence) et
+        # indique le résultat de chaque message
+        return _deliver_with_status(connection, ready, failed)
+
+    sent = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [(email, executor.submit(_send, message, backend)) for email, message in ready]
+        for email, future in futures:
+            try:
+                provider_message_id = future.result()
+            except Exception as e:
+                _mark_failed(email, e)
+                failed += 1
+                continue
+            _mark_sent(email, provider_message_id)
+            sent += 1
+
+    return sent, failed
+
+
+def _deliver_with_status(connection, ready, failed):
+    started = time.perf_counter()
+    connection.send_messages([message for email, message in ready])
+    record_email_send('batch', time.perf_counter() - started)
+
+    sent = 0
+    for email, message in ready:
+        error = getattr(message, 'send_error', None)
+        if error is not None or not getattr(message, 'provider_message_id', None):
+            _mark_failed(email, error or "Aucun identifiant renvoyé par le fournisseur")
+            failed += 1
+        else:
+            _mark_sent(email, message.provider_message_id)
+            sent += 1
+    return sent, failed
+
+
+def _mark_sent(email, provider_message_id):
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.locked_at = None
+    email.last_error = ''
+    email.provider_message_id = str(provider_message_id)[:255]
+    record_email_result('sent')
+    email.save(update_fields=['status', 'sent_at', 'locked_at', 'last_error', 'provider_message_id'])
@@ -0,0 +1,303 @@
+"""
+Rapports périodiques (mensuel et hebdomadaire) calculés par lots d'utilisateurs.
+
+Chaque fonction `build_*` reçoit une liste d'identifiants d'utilisateurs et
+calcule les chiffres de tous ces utilisateurs avec quelques requêtes groupées
+(une par indicateur), au lieu de rejouer les requêtes du tableau de bord pour
+chaque utilisateur. Le nombre de requêtes ne dépend donc pas de la taille du
+lot. Utilisé par la commande `send_periodic_reports`.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from expenses.models import Expense
+from goals.models import Contribution, Goal
+from groups.models import GroupContribution, GroupExpense, Membership
+from .motivation_messages import GENERAL_TIPS
+from .wallet_models import WalletTransaction
+
+
+MONTH_NAMES = [
+    '', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet',
+    'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre',
+]
+
+TOP_CATEGORIES_COUNT = 3
+RECENT_TRANSACTIONS_COUNT = 5
+NEARLY_ACHIEVED_PERCENTAGE = 80
+
+
+# ==================== PÉRIODES ====================
+
+def month_period(reference):
+    """Retourne (début, fin incluse, libellé) du mois contenant `reference`."""
+    start = reference.replace(day=1)
+    end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start, end, f'{MONTH_NAMES[start.month]} {start.year}'
+
+
+def previous_month(today=None):
+    today = today or date.today()
+    return month_period(today.replace(day=1) - timedelta(days=1))
+
+
+def week_period(reference):
+    """Retourne (lundi, dimanche, libellé) de la semaine contenant `reference`."""
+    start = reference - timedelta(days=reference.weekday())
+    end = start + timedelta(days=6)
+    return start, end, f'Du {start:%d/%m/%Y} au {end:%d/%m/%Y}'
+
+
+def previous_week(today=None):
+    today = today or date.today()
+    return week_period(today - timedelta(days=7))
+
+
+# ==================== AGRÉGATS GROUPÉS ====================
+
+def _sum_by_user(queryset, user_field, amount_field='amount'):
+    """{user_id: somme} en une requête GROUP BY."""
+    rows = queryset.values(user_field).annotate(total=Sum(amount_field)).values_list(user_field, 'total')
+    return {user_id: total or Decimal('0.00') for user_id, total in rows}
+
+
+def _count_by_user(queryset, user_field):
+    rows = queryset.values(user_field).annotate(total=Count('pk')).values_list(user_field, 'total')
+    return dict(rows)
+
+
+def _top_categories(user_ids, start, end):
+    """Top des catégories de dépenses par utilisateur (une requête)."""
+    rows = Expense.objects.filter(
+        user_id__in=user_ids, date__range=(start, end)
+    ).values('user_id', 'category__name').annotate(
+        amount=Sum('amount')
+    ).order_by('user_id', '-amount')
+
+    top = {}
+    for row in rows:
+        categories = top.setdefault(row['user_id'], [])
+        if len(categories) < TOP_CATEGORIES_COUNT:
+            categories.append({'name': row['category__name'] or 'Autre', 'amount': row['amount']})
+    return top
+
+
+def _active_group_counts(user_ids):
+    return _count_by_user(
+        Membership.objects.filter(user_id__in=user_ids, group__status='active'),
+        'user_id'
+    )
+
+
+def _group_transaction_counts(user_ids, start, end):
+    contributions = _count_by_user(
+        GroupContribution.objects.filter(user_id__in=user_ids, date__range=(start, end)),
+        'user_id'
+    )
+    expenses = _count_by_user(
+        GroupExpense.objects.filter(paid_by_id__in=user_ids, date__range=(start, end)),
+        'paid_by_id'
+    )
+    return {
+        user_id: contributions.get(user_id, 0) + expenses.get(user_id, 0)
+        for user_id in set(contributions) | set(expenses)
+    }
+
+
+# ==================== RAPPORT MENSUEL ====================
+
+def build_monthly_stats(user_ids, start, end, label):
+    """
+    Calcule le contexte `stats` de emails/monthly_report.html pour un lot.
+
+    Returns:
+        {user_id: stats}
+    """
+    income = _sum_by_user(
+        WalletTransaction.objects.filter(
+            wallet__user_id__in=user_ids, transaction_type='income', date__range=(start, end)
+        ),
+        'wallet__user_id'
+    )
+    expenses = _sum_by_user(
+        Expense.objects.filter(user_id__in=user_ids, date__range=(start, end)),
+        'user_id'
+    )
+    saved = _sum_by_user(
+        Contribution.objects.filter(goal__user_id__in=user_ids, date__range=(start, end)),
+        'goal__user_id'
+    )
+    goal_rows = Goal.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        active=Count('pk', filter=Q(status='active')),
+        achieved=Count('pk', filter=Q(status='completed', updated_at__date__range=(start, end))),
+    ).values_list('user_id', 'active', 'achieved')
+    goals = {user_id: (active, achieved) for user_id, active, achieved in goal_rows}
+    top_categories = _top_categories(user_ids, start, end)
+    active_groups = _active_group_counts(user_ids)
+    group_transactions = _group_transaction_counts(user_ids, start, end)
+
+    stats = {}
+    for user_id in user_ids:
+        total_income = income.get(user_id, Decimal('0.00'))
+        total_expenses = expenses.get(user_id, Decimal('0.00'))
+        active_goals, achieved_goals = goals.get(user_id, (0, 0))
+        stats[user_id] = {
+            'month': label,
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'net_balance': total_income - total_expenses,
+            'active_goals': active_goals,
+            'achieved_goals': achieved_goals,
+            'total_saved': saved.get(user_id, Decimal('0.00')),
+            'top_categories': top_categories.get(user_id, []),
+            'active_groups': active_groups.get(user_id, 0),
+            'group_transactions': group_transactions.get(user_id, 0),
+        }
+    return stats
+
+
+# ==================== RÉSUMÉ HEBDOMADAIRE ====================
+
+def _recent_transactions(user_ids, start, end):
+    """Dernières transactions de chaque utilisateur (fenêtre ROW_NUMBER, une requête)."""
+    rows = WalletTransaction.objects.filter(
+        wallet__user_id__in=user_ids, date__range=(start, end)
+    ).annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('wallet__user_id')],
+            order_by=[F('date').desc(), F('created_at').desc()]
+        )
+    ).filter(
+        position__lte=RECENT_TRANSACTIONS_COUNT
+    ).values('wallet__user_id', 'category__name', 'description', 'amount', 'date', 'position')
+
+    recent = {}
+    for row in sorted(rows, key=lambda row: (row['wallet__user_id'], row['position'])):
+        recent.setdefault(row['wallet__user_id'], []).append({
+            'category': row['category__name'] or row['description'],
+            'amount': row['amount'],
+            'date': row['date'],
+        })
+    return recent
+
+
+def _goals_progress(user_ids):
+    progress = {}
+    for user_id, title, current, target in Goal.objects.filter(
+        user_id__in=user_ids, status='active'
+    ).values_list('user_id', 'title', 'current_amount', 'target_amount').order_by('user_id', 'deadline'):
+        percentage = min(int(current / target * 100), 100) if target > 0 else 0
+        progress.setdefault(user_id, []).append({
+            'title': title,
+            'progress': percentage,
+            'nearly_achieved': percentage >= NEARLY_ACHIEVED_PERCENTAGE,
+        })
+    return progress
+
+
+def build_weekly_summaries(user_ids, start, end, label):
+    """
+    Calcule le contexte `data` de emails/weekly_summary.html pour un lot.
+
+    Returns:
+        {user_id: data}
+    """
+    transaction_rows = WalletTransaction.objects.filter(
+        wallet__user_id__in=user_ids, date__range=(start, end)
+    ).values('wallet__user_id').annotate(
+        count=Count('pk'),
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expenses=Sum('amount', filter=Q(transaction_type='expense')),
+    ).values_list('wallet__user_id', 'count', 'income', 'expenses')
+    transactions = {row[0]: row[1:] for row in transaction_rows}
+    recent = _recent_transactions(user_ids, start, end)
+    goals_progress = _goals_progress(user_ids)
+    active_groups = _active_group_counts(user_ids)
+    group_expenses = _sum_by_user(
+        GroupExpense.objects.filter(paid_by_id__in=user_ids, date__range=(start, end)),
+        'paid_by_id'
+    )
+
+    summaries = {}
+    for user_id in user_ids:
+        count, income, spent = transactions.get(user_id, (0, None, None))
+        income = income or Decimal('0.00')
+        spent = spent or Decimal('0.00')
+        tip = GENERAL_TIPS[user_id % len(GENERAL_TIPS)]
+        summaries[user_id] = {
+            'week_range': label,
+            'transactions_count': count,
+            'week_income': income,
+            'week_expenses': spent,
+            'balance_change': income - spent,
+            'recent_transactions': recent.get(user_id, []),
+            'goals_progress': goals_progress.get(user_id, []),
+            'group_activity': user_id in active_groups or user_id in group_expenses,
+            'active_groups_count': active_groups.get(user_id, 0),
+            'group_expenses': group_expenses.get(user_id, Decimal('0.00')),
+            'weekly_tip': f"{tip['icon']} {tip['message']}",
+        }
+    return summaries
+
+
+# ==================== MESSAGES ====================
+
+REPORTS = {
+    'monthly': {
+        'build': build_monthly_stats,
+        'previous_period': previous_month,
+        'period': month_period,
+        'template': 'emails/monthly_report.html',
+        'context_name': 'stats',
+        'subject': lambda label: f'📊 Votre rapport financier - {label}',
+    },
+    'weekly': {
+        'build': build_weekly_summaries,
+        'previous_period': previous_week,
+        'period': week_period,
+        'template': 'emails/weekly_summary.html',
+        'context_name': 'data',
+        'subject': lambda label: '📈 Votre résumé hebdomadaire MonNkap',
+    },
+}
+
+
+def render_report_messages(kind, users, start, end, label):
+    """
+    Calcule et met en forme les rapports d'un lot d'utilisateurs.
+
+    Args:
+        users: Liste de tuples (id, username, email)
+
+    Returns:
+        Liste de (user_id, EmailMultiAlternatives)
+    """
+    report = REPORTS[kind]
+    site = urlsplit(getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'))
+    data = report['build']([user_id for user_id, username, email in users], start, end, label)
+    subject = report['subject'](label)
+
+    messages = []
+    for user_id, username, email in users:
+        html = render_to_string(report['template'], {
+            'user': {'username': username, 'email': email},
+            report['context_name']: data[user_id],
+            'protocol': site.scheme,
+            'domain': site.netloc,
+        })
+        message = EmailMultiAlternatives(subject, strip_tags(html), settings.DEFAULT_FROM_EMAIL, [email])
+        message.attach_alternative(html, 'text/html')
+        # Un rapport par utilisateur et par période, même après une reprise
+        message.idempotency_key = f'report-{kind}-{start:%Y%m%d}-{user_id}'
+        messages.append((user_id, message))
+    return messages
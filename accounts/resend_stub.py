@@ -0,0 +1,207 @@
+"""
+Serveur HTTP local imitant l'API Resend (/emails et /emails/batch).
+
+Permet de tester ResendEmailBackend hors ligne, avec latence, limitation de
+débit (429 + en-têtes ratelimit-*), erreurs serveur et réponses perdues
+simulées. Comme l'API, une requête rejouée avec le même en-tête
+Idempotency-Key reçoit la réponse d'origine sans nouvel envoi :
+
+    python -m accounts.resend_stub --port 8025 --latency 0.2 --rate 10
+
+puis RESEND_API_URL = 'http://127.0.0.1:8025' et RESEND_API_KEY = 'test'.
+
+Utilisable aussi dans un script ou un test :
+
+    with ResendStubServer(latency=0.1) as stub:
+        backend = ResendEmailBackend(api_key='test', api_url=stub.url)
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'null')
+
+        if self.headers.get('Authorization', '') != f'Bearer {stub.api_key}':
+            return self._reply(401, {'statusCode': 401, 'message': 'API key is invalid'})
+
+        allowed, remaining, reset = stub.take_token()
+        rate_headers = {
+            'ratelimit-limit': str(stub.rate),
+            'ratelimit-remaining': str(remaining),
+            'ratelimit-reset': str(reset),
+        }
+        if not allowed:
+            rate_headers['retry-after'] = str(reset)
+            stub.record('rate_limited')
+            return self._reply(429, {'statusCode': 429, 'message': 'Too many requests'}, rate_headers)
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.take_failure():
+            stub.record('server_errors')
+            return self._reply(500, {'statusCode': 500, 'message': 'Simulated failure'}, rate_headers)
+
+        key = self.headers.get('Idempotency-Key')
+        replayed = stub.idempotent_response(key)
+        if replayed is not None:
+            stub.record('replays')
+            return self._reply(200, replayed, rate_headers)
+
+        if self.path == '/emails':
+            response = {'id': str(uuid.uuid4())}
+            stub.store([body])
+        elif self.path == '/emails/batch':
+            if not isinstance(body, list) or len(body) > 100:
+                return self._reply(422, {'statusCode': 422, 'message': 'Invalid batch'}, rate_headers)
+            response = {'data': [{'id': str(uuid.uuid4())} for _ in body]}
+            stub.store(body)
+        else:
+            return self._reply(404, {'statusCode': 404, 'message': 'Not found'})
+        stub.record('requests')
+        stub.remember(key, response)
+
+        if stub.take_drop():
+            # Envoi accepté, réponse perdue (coupure, délai dépassé côté client)
+            stub.record('dropped')
+            self.close_connection = True
+            return None
+        return self._reply(200, response, rate_headers)
+
+
+class ResendStubServer:
+    """Serveur de test en arrière-plan (thread démon)."""
+
+    def __init__(self, host='127.0.0.1', port=0, api_key='test', latency=0.0,
+                 rate=0, failure_rate=0.0, fail_next=0, drop_next=0):
+        self.api_key = api_key
+        self.latency = latency
+        self.rate = rate  # requêtes par seconde (0 = illimité)
+        self.failure_rate = failure_rate
+        self.fail_next = fail_next  # nombre de prochaines requêtes en 500 (tests)
+        self.drop_next = drop_next  # nombre de prochains envois acceptés sans réponse (tests)
+        self.emails = []
+        self.idempotency_keys = []
+        self._responses = {}
+        self.stats = {'requests': 0, 'rate_limited': 0, 'server_errors': 0, 'replays': 0, 'dropped': 0}
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def take_token(self):
+        """Fenêtre fixe d'une seconde : (autorisé, restant, secondes avant réinitialisation)."""
+        if not self.rate:
+            return True, 1000, 0
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1:
+                self._window_start = now
+                self._window_count = 0
+            reset = max(1, int(round(1 - (now - self._window_start))))
+            if self._window_count >= self.rate:
+                return False, 0, reset
+            self._window_count += 1
+            return True, self.rate - self._window_count, reset
+
+    def take_failure(self):
+        """True si la requête doit échouer (fail_next d'abord, puis failure_rate)."""
+        with self._lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                return True
+        return bool(self.failure_rate) and random.random() < self.failure_rate
+
+    def take_drop(self):
+        with self._lock:
+            if self.drop_next:
+                self.drop_next -= 1
+                return True
+        return False
+
+    def idempotent_response(self, key):
+        """Réponse d'origine d'une requête déjà acceptée avec cette clé (ou None)."""
+        if not key:
+            return None
+        with self._lock:
+            return self._responses.get(key)
+
+    def remember(self, key, response):
+        with self._lock:
+            self.idempotency_keys.append(key)
+            if key:
+                self._responses[key] = response
+
+    def record(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def store(self, emails):
+        with self._lock:
+            self.emails.extend(emails)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serveur local imitant l\'API Resend')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--api-key', default='test')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latence par requête (secondes)')
+    parser.add_argument('--rate', type=int, default=0, help='Requêtes autorisées par seconde (0 = illimité)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Proportion de réponses 500')
+    args = parser.parse_args()
+
+    server = ResendStubServer(
+        port=args.port, api_key=args.api_key, latency=args.latency,
+        rate=args.rate, failure_rate=args.failure_rate
+    )
+    print(f'Serveur Resend factice sur {server.url} (Ctrl+C pour arrêter)')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
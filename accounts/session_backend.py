@@ -0,0 +1,128 @@
+"""
+Moteur de sessions en base avec cache local (L1) et écritures regroupées.
+
+SESSION_ENGINE = 'accounts.session_backend'
+
+- Lecture : la session est d'abord cherchée dans un cache LRU propre au
+  processus (SESSION_L1_TIMEOUT secondes au plus), puis en base. Une copie
+  locale n'est servie que si son marqueur correspond à celui du cache
+  partagé (niveau L2, voir monnkap/cache_backend.py) : chaque
+  enregistrement ou suppression, sur n'importe quel worker, remplace ce
+  marqueur, et les copies des autres workers sont alors relues en base.
+- Écriture : avec `SessionWriteCoalescingMiddleware`
+  (accounts/middleware.py), une session non modifiée n'est réenregistrée que
+  lorsque son expiration glissante a avancé de plus de
+  SESSION_REFRESH_FRACTION × SESSION_COOKIE_AGE. Une consultation de page ne
+  provoque donc plus d'UPDATE sur django_session.
+
+Une copie locale coûte une lecture du cache partagé au lieu d'une requête
+sur django_session. Un marqueur absent (expiré, évincé) force la relecture
+en base.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import cache
+from django.utils import timezone
+
+from monnkap.cache_backend import LocalLRU
+
+
+SESSION_L1_TIMEOUT = getattr(settings, 'SESSION_L1_TIMEOUT', 30)  # secondes
+SESSION_L1_MAX_ENTRIES = getattr(settings, 'SESSION_L1_MAX_ENTRIES', 10000)
+SESSION_REFRESH_FRACTION = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.01)
+
+
+local_sessions = LocalLRU(SESSION_L1_MAX_ENTRIES, SESSION_L1_TIMEOUT)
+
+SESSION_MARKER_KEY = 'session_marker:{}'
+
+
+def _shared_cache():
+    # Cache à deux niveaux : les marqueurs ne passent jamais par le L1
+    return getattr(cache, 'l2', cache)
+
+
+def _get_marker(session_key):
+    """Marqueur courant d'une session (créé s'il est absent)."""
+    key = SESSION_MARKER_KEY.format(session_key)
+    shared = _shared_cache()
+    marker = shared.get(key)
+    if marker is None:
+        marker = time.time_ns()
+        if not shared.add(key, marker, settings.SESSION_COOKIE_AGE):
+            marker = shared.get(key, marker)
+    return marker
+
+
+def _replace_marker(session_key):
+    """Nouveau marqueur : les copies locales des autres workers sont périmées."""
+    marker = time.time_ns()
+    _shared_cache().set(SESSION_MARKER_KEY.format(session_key), marker, settings.SESSION_COOKIE_AGE)
+    return marker
+
+
+class SessionStore(DBStore):
+    """
+    Session en base (django_session) avec cache L1 local.
+    Retient la date d'expiration enregistrée pour décider s'il faut la repousser.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_expire_date = None
+
+    def load(self):
+        marker = None
+        if self.session_key is not None:
+            # Lu avant la base : un enregistrement concurrent rend la copie invalide
+            marker = _get_marker(self.session_key)
+            cached = local_sessions.get(self.session_key)
+            if cached is not None:
+                session_data, expire_date, cached_marker = cached
+                if cached_marker == marker and expire_date > timezone.now():
+                    self._stored_expire_date = expire_date
+                    return self.decode(session_data)
+                local_sessions.delete(self.session_key)
+
+        s = self._get_session_from_db()
+        if s is None:
+            return {}
+        self._stored_expire_date = s.expire_date
+        local_sessions.set(s.session_key, (s.session_data, s.expire_date, marker))
+        return self.decode(s.session_data)
+
+    def create_model_instance(self, data):
+        obj = super().create_model_instance(data)
+        self._pending = obj
+        return obj
+
+    def save(self, must_create=False):
+        self._pending = None
+        super().save(must_create=must_create)
+        obj = self._pending
+        if obj is not None:
+            self._stored_expire_date = obj.expire_date
+            marker = _replace_marker(obj.session_key)
+            local_sessions.set(obj.session_key, (obj.session_data, obj.expire_date, marker))
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key is not None:
+            local_sessions.delete(key)
+            _shared_cache().delete(SESSION_MARKER_KEY.format(key))
+
+    def needs_refresh(self):
+        """
+        True si l'expiration glissante a avancé de plus de la fraction
+        autorisée depuis le dernier enregistrement.
+        """
+        self._get_session()
+        if self._stored_expire_date is None:
+            return False
+        age = self.get_expiry_age()
+        drift = self.get_expiry_date() - self._stored_expire_date
+        return drift >= timedelta(seconds=age * SESSION_REFRESH_FRACTION)
@@ -0,0 +1,52 @@
+"""
+Balises de gabarit pour les feuilles de style et scripts de la mise en page
+(bundles de monnkap/assets.py).
+
+    {% load asset_tags %}
+    {% stylesheets %}   dans le <head>
+    {% scripts %}       en fin de <body>
+"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from monnkap.assets import BUNDLES, bundle_available, bundle_content, bundle_path
+
+register = template.Library()
+
+
+def _links(paths):
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(path),) for path in paths))
+
+
+@register.simple_tag
+def stylesheets():
+    """
+    Bundles construits : CSS critique en ligne, puis app.css en preload
+    (non bloquant). Le page loader couvre la page jusqu'à son application
+    (classe « css-loading »). Sinon : les feuilles sources, bloquantes.
+    """
+    if not (bundle_available('critical.css') and bundle_available('app.css')):
+        return _links(BUNDLES['critical.css'] + BUNDLES['app.css'])
+
+    href = static(bundle_path('app.css'))
+    return format_html(
+        '<style>{}</style>\n'
+        '<script>document.documentElement.classList.add("css-loading")</script>\n'
+        '<link rel="preload" as="style" href="{}" '
+        'onload="this.onload=null;this.rel=\'stylesheet\';'
+        'document.documentElement.classList.remove(\'css-loading\')">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        # CSS écrit par nous, sans « </style> » : inséré tel quel
+        mark_safe(bundle_content('critical.css')),
+        href,
+        href,
+    )
+
+
+@register.simple_tag
+def scripts():
+    """Bundle app.js s'il est construit, sinon les scripts sources."""
+    paths = [bundle_path('app.js')] if bundle_available('app.js') else BUNDLES['app.js']
+    return format_html_join('\n', '<script src="{}"></script>', ((static(path),) for path in paths))
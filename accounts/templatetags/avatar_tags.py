@@ -0,0 +1,25 @@
+"""
+Balises de gabarit pour les photos de profil.
+
+    {% load avatar_tags %}
+    {% avatar member.user.profile 40 %}
+"""
+from django import template
+
+from ..avatars import avatar_urls
+
+register = template.Library()
+
+
+@register.inclusion_tag('accounts/avatar.html')
+def avatar(profile, size=40, css_class=''):
+    """
+    Affiche la miniature de l'avatar (WebP avec repli JPEG) à `size` pixels,
+    ou une icône si l'utilisateur n'a pas d'avatar.
+    """
+    return {
+        'urls': avatar_urls(profile, size * 2),  # écrans haute densité
+        'size': size,
+        'icon_size': f'{size / 40:.2f}rem',
+        'css_class': css_class,
+    }
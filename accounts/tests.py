@@ -1,3 +1,730 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from accounts import views as account_views
+from accounts.email_backend import FakeEmailBackend, ResendAPIError, ResendEmailBackend
+from accounts.emails import send_welcome_email
+from accounts import session_backend
+from accounts.session_backend import SESSION_REFRESH_FRACTION, SessionStore
+from accounts.user_context import PROFILE_VERSION_CACHE_KEY
+from accounts.models import (
+    OutboxEmail, UserProfile, ReportChunk, SyncChange, SyncOperation, Wallet, WalletTransaction,
+)
+from accounts.outbox import OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_DELAY
+from accounts.resend_stub import ResendStubServer
+from expenses.models import Expense
+from goals.models import Goal
+from groups.models import Group, Membership
+from monnkap.cache_backend import LocalLRU
+from monnkap.conditional import GROUP_VERSION_KEY, get_versions
+from monnkap.pwa import cache_partition
+from monnkap.sync import SYNC_RETENTION_DAYS, SYNC_SETTLE_SECONDS, prune_sync_log
+
+
+class UserDataVersionTests(TestCase):
+    """Pages conditionnelles (monnkap/conditional.py) après un changement de nom."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'alice', 'alice@example.com', 'motdepasse-123', first_name='Alice', last_name='Old'
+        )
+        self.client.force_login(self.user)
+        # Crée le profil et le cookie CSRF (tous deux entrent dans l'ETag)
+        self.client.get(reverse('accounts:profile'))
+
+    def _profile_post(self, **changes):
+        data = {
+            'username': 'alice', 'first_name': 'Alice', 'last_name': 'Old', 'email': 'alice@example.com',
+            'theme_preference': 'auto', 'low_balance_threshold': '50000',
+        }
+        data.update(changes)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('accounts:profile'), data)
+        self.assertEqual(response.status_code, 302)
+        # Message de succès affiché une fois (une page avec messages n'a pas de 304)
+        self.client.get(response.url)
+
+    def test_name_change_invalidates_page(self):
+        url = reverse('dashboard:home')
+        response = self.client.get(url)
+        self.assertContains(response, 'Alice Old')
+        etag = response['ETag']
+
+        self._profile_post(last_name='New')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Alice New')
+
+    def test_unchanged_profile_keeps_page(self):
+        url = reverse('dashboard:home')
+        etag = self.client.get(url)['ETag']
+
+        self._profile_post()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_name_change_bumps_group_versions(self):
+        group = Group.objects.create(name='Famille', creator=self.user)
+        Membership.objects.create(group=group, user=self.user, role='admin')
+        key = GROUP_VERSION_KEY.format(group.pk)
+        [before] = get_versions([key])
+
+        self.user.first_name = 'Alicia'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        [after] = get_versions([key])
+        self.assertNotEqual(before, after)
+
+    def test_last_login_update_keeps_versions(self):
+        group = Group.objects.create(name='Famille', creator=self.user)
+        Membership.objects.create(group=group, user=self.user, role='admin')
+        key = GROUP_VERSION_KEY.format(group.pk)
+        [before] = get_versions([key])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(get_versions([key]), [before])
+
+
+class ThemeVersionTests(TestCase):
+    """Thème mémorisé dans la session avec la version du profil (accounts/user_context.py)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('henri', 'henri@example.com', 'motdepasse-123')
+        self.client.force_login(self.user)
+        self.profile, _ = UserProfile.objects.get_or_create(user=self.user)
+
+    def _server_theme(self):
+        response = self.client.get(reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().split('data-server-theme="', 1)[1].split('"', 1)[0]
+
+    def test_profile_change_updates_theme(self):
+        self.profile.theme_preference = 'dark'
+        self.profile.save()
+        self.assertEqual(self._server_theme(), 'dark')
+
+        self.profile.theme_preference = 'light'
+        self.profile.save()
+
+        self.assertEqual(self._server_theme(), 'light')
+
+    def test_evicted_version_does_not_match_old_session(self):
+        self.profile.theme_preference = 'dark'
+        self.profile.save()
+        version_key = PROFILE_VERSION_CACHE_KEY.format(user_id=self.user.pk)
+        # Version absente quand le thème est mémorisé dans la session
+        cache.delete(version_key)
+        self.assertEqual(self._server_theme(), 'dark')
+
+        self.profile.theme_preference = 'light'
+        self.profile.save()
+        # Version évincée du cache partagé
+        cache.delete(version_key)
+
+        self.assertEqual(self._server_theme(), 'light')
+
+
+class SessionWriteCoalescingTests(TestCase):
+    """Écritures de django_session avec SessionWriteCoalescingMiddleware."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('carol', 'carol@example.com', 'motdepasse-123')
+        self.client.force_login(self.user)
+        self.start = timezone.now()
+
+    def _get_at(self, minutes, url):
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(minutes=minutes)):
+            return self.client.get(url)
+
+    def test_page_views_coalesce_session_writes(self):
+        url = reverse('dashboard:home')
+        # Une page par minute pendant deux heures
+        with CaptureQueriesContext(connection) as queries:
+            for minute in range(121):
+                self.assertEqual(self._get_at(minute, url).status_code, 200)
+
+        writes = [q for q in queries if q['sql'].startswith('UPDATE "django_session"')]
+        interval = settings.SESSION_COOKIE_AGE * SESSION_REFRESH_FRACTION / 60  # minutes
+        self.assertGreater(len(writes), 0)
+        self.assertLessEqual(len(writes), 120 // interval + 1)
+        # L'expiration glissante suit quand même l'activité
+        session = Session.objects.get(session_key=self.client.session.session_key)
+        expected = self.start + timedelta(minutes=120, seconds=settings.SESSION_COOKIE_AGE)
+        self.assertGreaterEqual(session.expire_date, expected - timedelta(minutes=interval))
+
+    def test_logout_ends_session(self):
+        url = reverse('dashboard:home')
+        session_key = self.client.session.session_key
+        # Session dans le cache local du processus
+        self.assertEqual(self._get_at(0, url).status_code, 200)
+
+        self.client.get(reverse('accounts:logout'))
+
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+        self.client.cookies['sessionid'] = session_key
+        self.assertRedirects(self.client.get(url), f"{reverse('accounts:login')}?next={url}")
+
+    def _on_other_worker(self):
+        # Autre worker : même base et même cache partagé, L1 distinct
+        return mock.patch.object(session_backend, 'local_sessions', LocalLRU(100, 30))
+
+    def test_logout_on_other_worker_ends_session(self):
+        url = reverse('dashboard:home')
+        session_key = self.client.session.session_key
+        # Session dans le cache local de ce worker
+        self.assertEqual(self._get_at(0, url).status_code, 200)
+
+        with self._on_other_worker():
+            SessionStore(session_key).delete()
+
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+        self.assertRedirects(self.client.get(url), f"{reverse('accounts:login')}?next={url}")
+
+    def test_change_on_other_worker_is_not_lost(self):
+        session_key = self.client.session.session_key
+        # Session dans le cache local de ce worker
+        SessionStore(session_key).load()
+
+        with self._on_other_worker():
+            other = SessionStore(session_key)
+            other['oauth_state'] = 'abc'
+            other.save()
+
+        # Ce worker relit la session en base, puis l'enregistre sans perdre la clé
+        session = SessionStore(session_key)
+        self.assertEqual(session.get('oauth_state'), 'abc')
+        session['theme'] = 'dark'
+        session.save()
+        with self._on_other_worker():
+            stored = SessionStore(session_key)
+            self.assertEqual((stored.get('oauth_state'), stored.get('theme')), ('abc', 'dark'))
+
+
+class OutboxTests(TestCase):
+    """Emails transactionnels : écriture dans l'outbox, puis envoi par `send_outbox_emails`."""
+
+    registration = {
+        'username': 'dave', 'first_name': 'Dave', 'last_name': 'Test', 'email': 'dave@example.com',
+        'password1': 'Motdepasse-solide-42', 'password2': 'Motdepasse-solide-42',
+    }
+
+    def setUp(self):
+        FakeEmailBackend.sent = []
+
+    def _run_worker(self):
+        call_command(
+            'send_outbox_emails', once=True, concurrency=1,
+            backend='accounts.email_backend.FakeEmailBackend', stdout=StringIO(),
+        )
+
+    def test_register_queues_one_email(self):
+        response = self.client.post(reverse('accounts:register'), self.registration)
+
+        self.assertRedirects(response, reverse('accounts:login'), fetch_redirect_response=False)
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.kind, email.to_email, email.status), ('welcome', 'dave@example.com', 'pending'))
+        self.assertEqual(email.context['user']['pk'], User.objects.get(username='dave').pk)
+
+    def test_rolled_back_register_queues_nothing(self):
+        def queue_then_fail(user):
+            send_welcome_email(user)
+            raise RuntimeError('échec après la mise en file')
+
+        with mock.patch.object(account_views, 'send_welcome_email', side_effect=queue_then_fail):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('accounts:register'), self.registration)
+
+        self.assertFalse(User.objects.filter(username='dave').exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_worker_marks_email_sent(self):
+        user = User.objects.create_user('erin', 'erin@example.com', 'motdepasse-123')
+        send_welcome_email(user)
+
+        self._run_worker()
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('sent', 1, ''))
+        self.assertIsNotNone(email.sent_at)
+        [message] = FakeEmailBackend.sent
+        self.assertEqual(message.to, ['erin@example.com'])
+        self.assertEqual(email.provider_message_id, message.provider_message_id)
+        self.assertEqual(message.idempotency_key, f'outbox-{email.pk}')
+
+    @override_settings(FAKE_EMAIL_FAILURE_RATE=1)
+    def test_worker_retries_with_backoff_then_fails(self):
+        user = User.objects.create_user('erin', 'erin@example.com', 'motdepasse-123')
+        send_welcome_email(user)
+
+        with self.assertLogs('accounts.outbox', 'WARNING') as logs:
+            for attempt in range(1, OUTBOX_MAX_ATTEMPTS):
+                started = timezone.now()
+                self._run_worker()
+                email = OutboxEmail.objects.get()
+                self.assertEqual((email.status, email.attempts), ('pending', attempt))
+                self.assertIn('Échec simulé', email.last_error)
+                # Délai exponentiel, gigue de ±20 %
+                delay = (email.next_attempt_at - started).total_seconds()
+                expected = OUTBOX_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                self.assertGreaterEqual(delay, expected * 0.8 - 1)
+                self.assertLessEqual(delay, expected * 1.2 + 1)
+
+                # Pas encore dû : le worker n'y touche pas
+                self._run_worker()
+                self.assertEqual(OutboxEmail.objects.get().attempts, attempt)
+                OutboxEmail.objects.update(next_attempt_at=timezone.now())
+
+            self._run_worker()
+            email = OutboxEmail.objects.get()
+            self.assertEqual((email.status, email.attempts), ('failed', OUTBOX_MAX_ATTEMPTS))
+        self.assertIn('abandonné après', logs.output[-1])
+        self.assertEqual(FakeEmailBackend.sent, [])
+
+
+@override_settings(
+    RESEND_REQUESTS_PER_SECOND=0, RESEND_MAX_RETRIES=2, RESEND_RETRY_BASE_DELAY=0.01,
+)
+class ResendEmailBackendTests(SimpleTestCase):
+    """ResendEmailBackend contre le serveur local accounts/resend_stub.py."""
+
+    def _messages(self, count, attachment=False):
+        messages = []
+        for index in range(count):
+            message = EmailMultiAlternatives(
+                f'Rapport {index}', 'Texte', 'noreply@example.com', [f'user{index}@example.com']
+            )
+            message.attach_alternative('<p>Texte</p>', 'text/html')
+            if attachment:
+                message.attach('rapport.csv', 'a;b', 'text/csv')
+            messages.append(message)
+        return messages
+
+    def _send(self, stub, messages, **kwargs):
+        backend = ResendEmailBackend(api_key='test', api_url=stub.url, **kwargs)
+        with self.assertLogs('accounts.email_backend', 'INFO'):
+            sent = backend.send_messages(messages)
+        return backend, sent
+
+    def test_messages_are_batched(self):
+        messages = self._messages(150)
+        with ResendStubServer() as stub:
+            backend, sent = self._send(stub, messages)
+
+        self.assertEqual(sent, 150)
+        # Lots de 100 au plus sur /emails/batch
+        self.assertEqual(stub.stats['requests'], 2)
+        self.assertEqual(backend.metrics['requests'], 2)
+        self.assertEqual(len(stub.emails), 150)
+        self.assertEqual(stub.emails[0]['html'], '<p>Texte</p>')
+        self.assertTrue(all(message.provider_message_id for message in messages))
+        self.assertEqual(len({message.provider_message_id for message in messages}), 150)
+
+    def test_attachments_are_sent_one_by_one(self):
+        messages = self._messages(2) + self._messages(1, attachment=True)
+        with ResendStubServer() as stub:
+            backend, sent = self._send(stub, messages)
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(stub.stats['requests'], 2)
+        [with_attachment] = [email for email in stub.emails if 'attachments' in email]
+        self.assertEqual(with_attachment['attachments'][0]['filename'], 'rapport.csv')
+
+    @override_settings(RESEND_REQUESTS_PER_SECOND=20)
+    def test_requests_are_spaced(self):
+        messages = self._messages(4, attachment=True)
+        with ResendStubServer() as stub:
+            backend, sent = self._send(stub, messages)
+
+        self.assertEqual(sent, 4)
+        # 4 requêtes à 20/s : au moins 3 intervalles de 50 ms
+        self.assertGreaterEqual(backend.metrics['seconds'], 0.15)
+
+    def test_rate_limited_requests_are_retried(self):
+        messages = self._messages(2, attachment=True)
+        with ResendStubServer(rate=1) as stub:
+            backend, sent = self._send(stub, messages)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(stub.stats['rate_limited'], 1)
+        self.assertEqual(backend.metrics['rate_limited'], 1)
+        self.assertEqual(backend.metrics['retries'], 1)
+        # Retry-After (1 s) respecté
+        self.assertGreaterEqual(backend.metrics['seconds'], 1)
+
+    def test_server_errors_are_retried(self):
+        messages = self._messages(3)
+        with ResendStubServer(fail_next=2) as stub:
+            backend, sent = self._send(stub, messages)
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(stub.stats['server_errors'], 2)
+        self.assertEqual(backend.metrics['retries'], 2)
+        self.assertEqual(len(stub.emails), 3)
+
+    def test_persistent_server_errors_mark_messages(self):
+        messages = self._messages(3)
+        with ResendStubServer(failure_rate=1) as stub:
+            backend = ResendEmailBackend(api_key='test', api_url=stub.url)
+            with self.assertLogs('accounts.email_backend', 'ERROR'):
+                with self.assertRaises(ResendAPIError):
+                    backend.send_messages(messages)
+
+        # Première tentative et RESEND_MAX_RETRIES nouvelles tentatives
+        self.assertEqual(stub.stats['server_errors'], 3)
+        self.assertEqual(backend.metrics['failed'], 3)
+        self.assertTrue(all(message.send_error.status_code == 500 for message in messages))
+
+    def test_lost_response_is_not_resent(self):
+        keyed = self._messages(3)
+        for index, message in enumerate(keyed):
+            message.idempotency_key = f'outbox-{index}'
+        for name, messages in (('clés des messages', keyed), ('clé tirée au hasard', self._messages(3))):
+            with self.subTest(name), ResendStubServer(drop_next=1) as stub:
+                backend, sent = self._send(stub, messages)
+
+                self.assertEqual(sent, 3)
+                # Lot accepté une fois ; la nouvelle tentative reçoit la réponse d'origine
+                self.assertEqual(len(stub.emails), 3)
+                self.assertEqual((stub.stats['dropped'], stub.stats['replays']), (1, 1))
+                self.assertEqual(backend.metrics['retries'], 1)
+                self.assertTrue(all(message.provider_message_id for message in messages))
+                self.assertTrue(stub.idempotency_keys[0])
+
+    def test_batch_key_comes_from_messages(self):
+        messages = self._messages(2)
+        for index, message in enumerate(messages):
+            message.idempotency_key = f'outbox-{index}'
+        with ResendStubServer() as stub:
+            self._send(stub, messages)
+            self._send(stub, messages)
+
+        [key] = set(stub.idempotency_keys)
+        self.assertTrue(key.startswith('batch-'))
+        self.assertEqual((len(stub.emails), stub.stats['replays']), (2, 1))
+
+    def test_unauthorized_batch_is_not_split(self):
+        messages = self._messages(3)
+        with ResendStubServer(api_key='autre') as stub:
+            backend = ResendEmailBackend(api_key='test', api_url=stub.url)
+            with self.assertLogs('accounts.email_backend', 'ERROR'):
+                with self.assertRaises(ResendAPIError):
+                    backend.send_messages(messages)
+
+        # Clé refusée : pas de renvoi message par message
+        self.assertEqual(backend.metrics['requests'], 1)
+        self.assertTrue(all(message.send_error.status_code == 401 for message in messages))
+
+    def test_incomplete_batch_response(self):
+        messages = self._messages(3)
+        backend = ResendEmailBackend(api_key='test', fail_silently=True)
+        with mock.patch.object(backend, '_post', return_value={'data': [{'id': 'premier'}]}):
+            with self.assertLogs('accounts.email_backend', 'ERROR'):
+                sent = backend.send_messages(messages)
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(messages[0].provider_message_id, 'premier')
+        self.assertIsNone(messages[0].send_error)
+        self.assertTrue(all(message.send_error for message in messages[1:]))
+        self.assertFalse(any(hasattr(message, 'provider_message_id') for message in messages[1:]))
+
+    def test_single_text_message(self):
+        message = EmailMessage('Bonjour', 'Texte', 'noreply@example.com', ['user@example.com'])
+        with ResendStubServer() as stub:
+            backend, sent = self._send(stub, [message])
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(stub.emails, [{
+            'from': 'noreply@example.com', 'to': ['user@example.com'], 'subject': 'Bonjour', 'text': 'Texte',
+        }])
+
+
+class SyncApiTests(TestCase):
+    """API de synchronisation de la PWA (monnkap/sync.py)."""
+
+    operations = [
+        {'key': 'op-1', 'type': 'expense', 'data': {
+            'amount': '1500', 'description': 'Taxi', 'date': '2026-10-18', 'category_name': 'Transport',
+        }},
+        {'key': 'op-2', 'type': 'transaction', 'data': {
+            'transaction_type': 'income', 'amount': '50000', 'description': 'Salaire',
+            'date': '2026-10-18', 'category_name': 'Salaire',
+        }},
+        {'key': 'op-3', 'type': 'transaction', 'data': {
+            'transaction_type': 'expense', 'amount': '200', 'description': 'Pain',
+            'date': '2026-10-18', 'category_name': 'Alimentation',
+        }},
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user('frank', 'frank@example.com', 'motdepasse-123')
+        self.client.force_login(self.user)
+
+    def _push(self, operations, partition=None):
+        body = {'operations': operations, 'partition': partition or cache_partition(self.user.pk)}
+        return self.client.post(reverse('sync_push'), json.dumps(body), content_type='application/json')
+
+    def _statuses(self, response):
+        return [(result['key'], result['status']) for result in response.json()['results']]
+
+    def _settle(self):
+        # Lignes plus anciennes que la fenêtre de stabilisation
+        SyncChange.objects.update(changed_at=timezone.now() - timedelta(seconds=SYNC_SETTLE_SECONDS + 1))
+
+    def _pull(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get(reverse('sync_changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_push_applies_operations(self):
+        response = self._push(self.operations)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._statuses(response), [('op-1', 'applied'), ('op-2', 'applied'), ('op-3', 'applied')])
+        # Sortie du portefeuille : créée par sa dépense, comme dans add_transaction_view
+        bread = WalletTransaction.objects.get(description='Pain')
+        self.assertEqual(bread.expense, Expense.objects.get(user=self.user, description='Pain'))
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.user.wallet.available_balance, Decimal('48300'))
+        self.assertEqual(SyncOperation.objects.filter(user=self.user).count(), 3)
+
+    def test_replay_is_not_applied_twice(self):
+        first = self._push(self.operations).json()['results']
+
+        response = self._push(self.operations)
+
+        self.assertEqual(self._statuses(response), [('op-1', 'duplicate'), ('op-2', 'duplicate'), ('op-3', 'duplicate')])
+        self.assertEqual(
+            [result['id'] for result in response.json()['results']], [result['id'] for result in first]
+        )
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(WalletTransaction.objects.filter(wallet__user=self.user).count(), 3)
+
+    def test_same_key_twice_in_one_batch(self):
+        response = self._push([self.operations[0], self.operations[0]])
+
+        self.assertEqual(self._statuses(response), [('op-1', 'applied'), ('op-1', 'duplicate')])
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+
+    def test_invalid_operations_are_rejected(self):
+        response = self._push([
+            {'key': '', 'type': 'expense', 'data': {}},
+            {'key': 'op-4', 'type': 'goal', 'data': {}},
+            {'key': 'op-5', 'type': 'expense', 'data': {'amount': '-3'}},
+            self.operations[0],
+        ])
+
+        self.assertEqual(
+            self._statuses(response),
+            [('', 'rejected'), ('op-4', 'rejected'), ('op-5', 'rejected'), ('op-1', 'applied')],
+        )
+        self.assertIn('amount', response.json()['results'][2]['errors'])
+        # Une opération rejetée n'est pas marquée appliquée : elle peut être corrigée et renvoyée
+        self.assertEqual(list(SyncOperation.objects.values_list('key', flat=True)), ['op-1'])
+
+    def test_other_partition_is_forbidden(self):
+        other = User.objects.create_user('grace', 'grace@example.com', 'motdepasse-123')
+
+        response = self._push(self.operations, partition=cache_partition(other.pk))
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(SyncOperation.objects.exists())
+
+    def test_push_writes_sync_log_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self._push(self.operations)
+
+        log_queries = [q['sql'] for q in queries if '"accounts_syncchange"' in q['sql']]
+        self.assertEqual(len(log_queries), 2)
+        # Une ligne par objet : 2 dépenses, 3 transactions, 3 catégories
+        self.assertEqual(SyncChange.objects.count(), 8)
+
+    def test_changes_after_cursor(self):
+        self._push(self.operations)
+
+        # Changements trop récents : renvoyés au passage suivant
+        first = self._pull()
+        self.assertTrue(first['reset'])
+        self.assertEqual(first['changes']['expense'], [])
+
+        self._settle()
+        second = self._pull(first['cursor'])
+        self.assertFalse(second['reset'])
+        self.assertEqual(
+            sorted(expense['description'] for expense in second['changes']['expense']), ['Pain', 'Taxi']
+        )
+        self.assertEqual(len(second['changes']['transaction']), 3)
+        self.assertEqual(len(second['changes']['category']), 3)
+
+        third = self._pull(second['cursor'])
+        self.assertEqual(third['changes']['expense'], [])
+        self.assertFalse(third['has_more'])
+
+    def test_changes_are_paged(self):
+        self._push(self.operations)
+        self._settle()
+
+        page = self._pull(limit=5)
+        self.assertTrue(page['has_more'])
+        rest = self._pull(page['cursor'])
+        self.assertFalse(rest['has_more'])
+        received = sum(len(objects) for response in (page, rest) for objects in response['changes'].values())
+        self.assertEqual(received, 8)
+
+    def test_changes_of_other_users_are_hidden(self):
+        self._push(self.operations)
+        self._settle()
+        other = User.objects.create_user('grace', 'grace@example.com', 'motdepasse-123')
+        self.client.force_login(other)
+
+        changes = self._pull()['changes']
+
+        self.assertEqual((changes['expense'], changes['transaction']), ([], []))
+        # Catégories : partagées
+        self.assertEqual(len(changes['category']), 3)
+
+    def test_deletion_and_old_cursor(self):
+        self._push(self.operations)
+        self._settle()
+        cursor = self._pull()['cursor']
+        taxi = Expense.objects.get(description='Taxi')
+        taxi_id = taxi.pk
+        taxi.delete()
+        self._settle()
+
+        changes = self._pull(cursor)
+        self.assertEqual(changes['deleted']['expense'], [taxi_id])
+        self.assertEqual(changes['changes']['expense'], [])
+
+        # Curseur plus ancien que la rétention : tout est renvoyé
+        change_id = cursor.split('.')[0]
+        expired = f'{change_id}.{int(time.time()) - (SYNC_RETENTION_DAYS + 1) * 86400}'
+        changes = self._pull(expired)
+        self.assertTrue(changes['reset'])
+        self.assertEqual([expense['description'] for expense in changes['changes']['expense']], ['Pain'])
+
+    def test_prune_sync_log(self):
+        self._push(self.operations)
+        Expense.objects.get(description='Taxi').delete()
+        old = timezone.now() - timedelta(days=SYNC_RETENTION_DAYS + 1)
+        SyncChange.objects.update(changed_at=old)
+        SyncOperation.objects.update(created_at=old)
+
+        # Dépense et sa transaction supprimées, trois clés d'idempotence
+        self.assertEqual(prune_sync_log(), (2, 3))
+        # Seules les suppressions sont purgées : les objets restent synchronisables
+        self.assertFalse(SyncChange.objects.filter(deleted=True).exists())
+        self.assertEqual(SyncChange.objects.count(), 6)
+
+
+class PeriodicReportsResumeTests(TestCase):
+    """Reprise de `send_periodic_reports` après des envois en échec."""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{index}', f'user{index}@example.com', 'motdepasse-123')
+            for index in range(5)
+        ]
+        FakeEmailBackend.sent = []
+
+    def _run(self):
+        call_command(
+            'send_periodic_reports', 'monthly', date='2026-09-15', workers=1, send_batch_size=2,
+            backend='accounts.email_backend.FakeEmailBackend', stdout=StringIO(),
+        )
+
+    def test_failed_recipients_are_retried_on_resume(self):
+        with override_settings(FAKE_EMAIL_FAILURE_RATE=1):
+            self._run()
+        chunk = ReportChunk.objects.get()
+        self.assertFalse(chunk.is_done)
+        self.assertEqual(chunk.failed_user_ids, [user.pk for user in self.users])
+        self.assertEqual(FakeEmailBackend.sent, [])
+
+        self._run()
+        chunk.refresh_from_db()
+        self.assertTrue(chunk.is_done)
+        self.assertEqual(chunk.failed_user_ids, [])
+        self.assertEqual(chunk.sent_count, len(self.users))
+        self.assertEqual(
+            sorted(message.to[0] for message in FakeEmailBackend.sent),
+            sorted(user.email for user in self.users),
+        )
+
+    def test_done_chunk_is_not_sent_again(self):
+        self._run()
+        self._run()
+        self.assertEqual(len(FakeEmailBackend.sent), len(self.users))
+        # Une clé d'idempotence par utilisateur et par période
+        keys = {message.idempotency_key for message in FakeEmailBackend.sent}
+        self.assertEqual(len(keys), len(self.users))
+        self.assertTrue(all(key.startswith('report-monthly-') for key in keys))
+        self.assertTrue(ReportChunk.objects.get().is_done)
+
+
+class GoalAllocationAlertTests(TestCase):
+    """Une allocation vers un objectif recalcule le solde et évalue l'alerte de solde bas."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('bob', 'bob@example.com', 'motdepasse-123')
+        self.client.force_login(self.user)
+        self.wallet = Wallet.objects.create(user=self.user)
+        WalletTransaction.objects.create(
+            wallet=self.wallet, transaction_type='income', amount=Decimal('100000'),
+            description='Salaire', date=date(2026, 10, 1),
+        )
+        self.goal = Goal.objects.create(
+            user=self.user, title='Moto', target_amount=Decimal('500000'), deadline=date(2027, 6, 1),
+        )
+
+    def test_allocation_below_threshold_queues_alert(self):
+        self.assertFalse(OutboxEmail.objects.filter(kind='low_balance_alert').exists())
+
+        response = self.client.post(
+            reverse('accounts:allocate_to_goal', args=[self.goal.pk]), {'amount': '60000'}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_balance, Decimal('40000'))
+        self.assertEqual(OutboxEmail.objects.filter(kind='low_balance_alert', user=self.user).count(), 1)
+
+    def test_allocation_counts_wallet_write(self):
+        def allocations():
+            labels = {'kind': 'goal_allocation'}
+            return REGISTRY.get_sample_value('monnkap_wallet_writes_total', labels) or 0
+
+        before = allocations()
+        self.client.post(reverse('accounts:allocate_to_goal', args=[self.goal.pk]), {'amount': '10000'})
+
+        self.assertEqual(allocations(), before + 1)
+
+    def test_allocation_above_threshold_sends_nothing(self):
+        self.client.post(reverse('accounts:allocate_to_goal', args=[self.goal.pk]), {'amount': '10000'})
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_balance, Decimal('90000'))
+        self.assertFalse(OutboxEmail.objects.filter(kind='low_balance_alert').exists())
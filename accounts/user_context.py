@@ -0,0 +1,145 @@
+"""
+Contexte utilisateur chargé une fois par requête.
+
+`UserContextMiddleware` remplace l'utilisateur paresseux de Django :
+l'utilisateur, son profil et son portefeuille sont lus par une seule requête
+jointe, au premier accès à `request.user`. Les vues récupèrent ensuite le
+portefeuille et le profil sans nouvelle requête avec `get_user_wallet()` et
+`get_user_profile()`.
+
+Le thème d'affichage est mémorisé dans la session avec la version du profil :
+le rendu d'une page ne charge pas l'utilisateur juste pour le thème.
+L'enregistrement d'un profil change sa version (voir le signal dans
+accounts/models.py), ce qui invalide le thème mémorisé dans toutes les
+sessions de l'utilisateur. La version est lue dans le cache partagé (niveau
+L2 de monnkap/cache_backend.py) ; une version absente (évincée) est recréée
+avec une nouvelle valeur, qu'aucune session ne peut avoir mémorisée.
+"""
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+from .models import UserProfile
+from .wallet_models import Wallet
+
+
+THEME_SESSION_KEY = '_user_theme'
+PROFILE_VERSION_CACHE_KEY = 'accounts:profile_version:{user_id}'
+
+
+# ==================== UTILISATEUR ====================
+
+def load_user(user_id):
+    """Utilisateur, profil et portefeuille en une requête jointe."""
+    return User._default_manager.select_related('profile', 'wallet').filter(pk=user_id).first()
+
+
+def get_user(request):
+    """
+    Équivalent de django.contrib.auth.get_user() qui charge le profil et le
+    portefeuille avec l'utilisateur (backends dérivés de ModelBackend).
+    La vérification de la session est identique à celle de Django.
+    """
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    backend = auth.load_backend(backend_path)
+    if not isinstance(backend, ModelBackend):
+        return auth.get_user(request)
+
+    user = load_user(user_id)
+    if user is None or not backend.user_can_authenticate(user):
+        return AnonymousUser()
+
+    # Vérification de la session (mot de passe changé, SECRET_KEY renouvelée)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    session_auth_hash = user.get_session_auth_hash()
+    if session_hash and constant_time_compare(session_hash, session_auth_hash):
+        return user
+    if session_hash and any(
+        constant_time_compare(session_hash, fallback_auth_hash)
+        for fallback_auth_hash in user.get_session_auth_fallback_hash()
+    ):
+        request.session.cycle_key()
+        request.session[auth.HASH_SESSION_KEY] = session_auth_hash
+        return user
+    request.session.flush()
+    return AnonymousUser()
+
+
+def get_user_wallet(request):
+    """Portefeuille de l'utilisateur connecté, créé au besoin (sans requête s'il a été joint)."""
+    try:
+        return request.user.wallet
+    except Wallet.DoesNotExist:
+        wallet, created = Wallet.objects.get_or_create(user=request.user)
+        request.user.wallet = wallet
+        return wallet
+
+
+def get_user_profile(request):
+    """Profil de l'utilisateur connecté, créé au besoin (sans requête s'il a été joint)."""
+    try:
+        return request.user.profile
+    except UserProfile.DoesNotExist:
+        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        request.user.profile = profile
+        return profile
+
+
+# ==================== THÈME ====================
+
+def _shared_cache():
+    # Cache à deux niveaux : les versions ne passent jamais par le L1
+    return getattr(cache, 'l2', cache)
+
+
+def get_profile_version(user_id):
+    """Version courante du profil d'un utilisateur (créée si absente)."""
+    key = PROFILE_VERSION_CACHE_KEY.format(user_id=user_id)
+    shared = _shared_cache()
+    version = shared.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not shared.add(key, version, None):
+            version = shared.get(key, version)
+    return version
+
+
+def bump_profile_version(user_id):
+    """Invalide le thème mémorisé dans les sessions de l'utilisateur."""
+    _shared_cache().set(PROFILE_VERSION_CACHE_KEY.format(user_id=user_id), time.time_ns(), None)
+
+
+def get_theme(request):
+    """
+    Thème préféré de l'utilisateur de la requête.
+
+    Sans session authentifiée, aucun accès à la base. Sinon le thème est lu
+    dans la session tant que la version du profil n'a pas changé.
+    """
+    session = getattr(request, 'session', None)
+    if session is None or auth.SESSION_KEY not in session:
+        return 'auto'
+
+    user_id = str(session[auth.SESSION_KEY])
+    version = get_profile_version(user_id)
+    stored = session.get(THEME_SESSION_KEY)
+    if stored and stored[0] == user_id and stored[1] == version:
+        return stored[2]
+
+    if not request.user.is_authenticated:
+        return 'auto'
+    theme = get_user_profile(request).theme_preference
+    session[THEME_SESSION_KEY] = [user_id, version, theme]
+    return theme
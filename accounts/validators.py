@@ -2,16 +2,19 @@
 Validateurs personnalisés pour les fichiers uploadés
 """
 from django.core.exceptions import ValidationError
-from django.core.files.images import get_image_dimensions
+from PIL import Image
 import os
 
 
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+
 def validate_image_file(image):
     """
     Valide qu'un fichier uploadé est bien une image valide.
     
-    Vérifie:
-    - Type MIME
+    Vérifie (sans décoder l'image) :
+    - Format réel (en-tête du fichier)
     - Extension
     - Taille max (5 MB)
     - Dimensions max (4000x4000)
@@ -29,23 +32,29 @@ def validate_image_file(image):
             f'Format de fichier non autorisé. Utilisez: {", ".join(valid_extensions)}'
         )
     
-    # Vérifier que c'est vraiment une image (pas juste l'extension)
+    # Vérifier que c'est vraiment une image (pas juste l'extension).
+    # Image.open ne lit que l'en-tête : format et dimensions sont connus sans
+    # décoder les pixels.
+    position = image.tell() if hasattr(image, 'tell') else None
     try:
-        # get_image_dimensions retourne (width, height) ou None si pas une image
-        width, height = get_image_dimensions(image)
-        
-        if width is None or height is None:
-            raise ValidationError('Le fichier n\'est pas une image valide.')
-        
-        # Vérifier les dimensions maximales
-        max_dimension = 4000
-        if width > max_dimension or height > max_dimension:
-            raise ValidationError(
-                f'Les dimensions de l\'image ne doivent pas dépasser {max_dimension}x{max_dimension} pixels.'
-            )
-            
-    except Exception as e:
-        raise ValidationError(f'Erreur lors de la validation de l\'image: {str(e)}')
+        with Image.open(image) as header:
+            image_format = header.format
+            width, height = header.size
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise ValidationError('Le fichier n\'est pas une image valide.')
+    finally:
+        if position is not None:
+            image.seek(position)
+
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise ValidationError('Le fichier n\'est pas une image valide.')
+
+    # Vérifier les dimensions maximales
+    max_dimension = 4000
+    if width > max_dimension or height > max_dimension:
+        raise ValidationError(
+            f'Les dimensions de l\'image ne doivent pas dépasser {max_dimension}x{max_dimension} pixels.'
+        )
     
     return image
 
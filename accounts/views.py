@@ -1,9 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.views.decorators.http import require_safe
 from django.contrib import messages
-from django.contrib.auth import login, authenticate, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
+from django.db import transaction as db_transaction
 from django.db.models import Sum
 from django.views.decorators.cache import never_cache
 from django.views.decorators.debug import sensitive_post_parameters
@@ -13,16 +16,20 @@ from decimal import Decimal
 from .forms import UserRegistrationForm, UserUpdateForm, ProfileUpdateForm
 from .wallet_forms import WalletTransactionForm, GoalAllocationForm
 from .models import Wallet, WalletTransaction, GoalAllocation
-from .emails import send_welcome_email, send_goal_achieved_email, send_low_balance_alert
+from .emails import send_welcome_email, send_goal_achieved_email
+from .user_context import get_user_profile, get_user_wallet
+from .avatars import AVATAR_NAME_RE, avatar_storage
 from goals.models import Goal
 from .motivation_messages import get_wallet_income_message
+from monnkap.conditional import conditional_page
+from monnkap.pwa import offline_form
 
 
 @ratelimit(key='ip', rate='5/h', method='POST')
 def register_view(request):
     """
     Vue d'inscription d'un nouvel utilisateur.
-    Crée automatiquement un profil utilisateur via les signaux Django.
+    Crée le profil utilisateur avec le compte (UserRegistrationForm.save).
     Rate limited: 5 tentatives par heure par IP.
     """
     if request.user.is_authenticated:
@@ -37,14 +44,11 @@ def register_view(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            username = form.cleaned_data.get('username')
-            
-            # Envoyer l'email de bienvenue
-            try:
+            # Compte et email de bienvenue (outbox) dans la même transaction
+            with db_transaction.atomic():
+                user = form.save()
                 send_welcome_email(user)
-            except Exception as e:
-                print(f"Erreur envoi email de bienvenue: {e}")
+            username = form.cleaned_data.get('username')
             
             messages.success(request, f'Compte créé avec succès pour {username}! Vous pouvez maintenant vous connecter.')
             return redirect('accounts:login')
@@ -76,16 +80,13 @@ def login_view(request):
     
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
+        # is_valid() authentifie déjà (backends, axes, hachage) : un seul contrôle
+        # du mot de passe par connexion
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(request=request, username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Bienvenue, {username}!')
-                return redirect('dashboard:home')
-            else:
-                messages.error(request, 'Nom d\'utilisateur ou mot de passe incorrect.')
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Bienvenue, {user.get_username()}!')
+            return redirect('dashboard:home')
         else:
             messages.error(request, 'Nom d\'utilisateur ou mot de passe incorrect.')
     else:
@@ -114,7 +115,7 @@ def profile_view(request):
         profile_form = ProfileUpdateForm(
             request.POST,
             request.FILES,
-            instance=request.user.profile
+            instance=get_user_profile(request)
         )
         
         if user_form.is_valid() and profile_form.is_valid():
@@ -126,7 +127,7 @@ def profile_view(request):
             messages.error(request, 'Erreur lors de la mise à jour du profil.')
     else:
         user_form = UserUpdateForm(instance=request.user)
-        profile_form = ProfileUpdateForm(instance=request.user.profile)
+        profile_form = ProfileUpdateForm(instance=get_user_profile(request))
     
     context = {
         'user_form': user_form,
@@ -136,14 +137,41 @@ def profile_view(request):
     return render(request, 'accounts/profile.html', context)
 
 
+@require_safe
+def serve_avatar_view(request, name):
+    """
+    Sert un avatar ou une miniature adressés par contenu.
+
+    Le nom contient l'empreinte SHA-256 du fichier : il ne change jamais de
+    contenu et peut être mis en cache indéfiniment par le navigateur et les
+    proxies. Les anciens noms (non adressés par contenu) ne sont pas servis ici.
+    """
+    if AVATAR_NAME_RE.match(name) is None:
+        raise Http404
+    # Le nom de fichier contient l'empreinte du contenu
+    etag = f'"{name.rsplit("/", 1)[-1]}"'
+    headers = {'Cache-Control': 'public, max-age=31536000, immutable', 'ETag': etag}
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers=headers)
+    storage = avatar_storage()
+    try:
+        response = FileResponse(storage.open(name, 'rb'))
+    except FileNotFoundError:
+        raise Http404
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
 # ==================== VUES DU PORTEFEUILLE ====================
 
+@conditional_page()
 @login_required
 def wallet_dashboard_view(request):
     """
     Tableau de bord du portefeuille avec vue d'ensemble des finances.
     """
-    wallet, created = Wallet.objects.get_or_create(user=request.user)
+    wallet = get_user_wallet(request)
     
     # Récupérer les transactions récentes avec pagination
     transactions_queryset = WalletTransaction.objects.filter(
@@ -201,50 +229,47 @@ def wallet_dashboard_view(request):
     return render(request, 'accounts/wallet_dashboard.html', context)
 
 
+@offline_form
 @login_required
 def add_transaction_view(request):
     """
     Ajouter une transaction au portefeuille.
     """
-    wallet, created = Wallet.objects.get_or_create(user=request.user)
+    wallet = get_user_wallet(request)
     
     if request.method == 'POST':
         form = WalletTransactionForm(request.POST)
         if form.is_valid():
-            transaction = form.save(commit=False)
-            transaction.wallet = wallet
+            # Transaction, dépense liée et alertes éventuelles (solde bas, budgets,
+            # évaluées par WalletTransaction.save) dans la même transaction SQL
+            with db_transaction.atomic():
+                transaction = form.save(commit=False)
+                transaction.wallet = wallet
             
-            # Si c'est une sortie (expense), créer automatiquement une dépense liée
-            if transaction.transaction_type == 'expense':
-                from expenses.models import Expense
-                from django.db.models.signals import post_save
-                from .wallet_models import create_or_update_wallet_transaction_from_expense
+                # Si c'est une sortie (expense), créer automatiquement une dépense liée
+                if transaction.transaction_type == 'expense':
+                    from expenses.models import Expense
+                    from django.db.models.signals import post_save
+                    from .wallet_models import create_or_update_wallet_transaction_from_expense
                 
-                # Désactiver temporairement le signal pour éviter le doublon
-                post_save.disconnect(create_or_update_wallet_transaction_from_expense, sender=Expense)
+                    # Désactiver temporairement le signal pour éviter le doublon
+                    post_save.disconnect(create_or_update_wallet_transaction_from_expense, sender=Expense)
                 
-                try:
-                    # Créer la dépense associée
-                    expense = Expense.objects.create(
-                        user=request.user,
-                        amount=transaction.amount,
-                        category=transaction.category,
-                        description=transaction.description,
-                        date=transaction.date
-                    )
-                    transaction.expense = expense
-                finally:
-                    # Réactiver le signal
-                    post_save.connect(create_or_update_wallet_transaction_from_expense, sender=Expense)
-            
-            transaction.save()
+                    try:
+                        # Créer la dépense associée
+                        expense = Expense.objects.create(
+                            user=request.user,
+                            amount=transaction.amount,
+                            category=transaction.category,
+                            description=transaction.description,
+                            date=transaction.date
+                        )
+                        transaction.expense = expense
+                    finally:
+                        # Réactiver le signal
+                        post_save.connect(create_or_update_wallet_transaction_from_expense, sender=Expense)
             
-            # Vérifier si le solde est bas après une sortie
-            if transaction.transaction_type == 'expense' and wallet.available_balance < 50000:
-                try:
-                    send_low_balance_alert(request.user, wallet)
-                except Exception as e:
-                    print(f"Erreur envoi email alerte solde: {e}")
+                transaction.save()
             
             type_label = "Entrée" if transaction.transaction_type == 'income' else "Sortie"
             messages.success(request, f'{type_label} de {transaction.amount} FCFA enregistrée!')
@@ -277,7 +302,7 @@ def allocate_to_goal_view(request, goal_pk):
     """
     Allouer des fonds du portefeuille à un objectif.
     """
-    wallet, created = Wallet.objects.get_or_create(user=request.user)
+    wallet = get_user_wallet(request)
     goal = get_object_or_404(Goal, pk=goal_pk, user=request.user)
     
     # Recalculer les soldes pour avoir les données à jour
@@ -91,7 +91,9 @@ class WalletTransaction(models.Model):
         Wallet,
         on_delete=models.CASCADE,
         related_name='transactions',
-        verbose_name='Portefeuille'
+        verbose_name='Portefeuille',
+        # Index couvert par accounts_wallettx_type_idx (voir Meta.indexes)
+        db_index=False,
     )
     transaction_type = models.CharField(
         max_length=20,
@@ -137,17 +139,25 @@ class WalletTransaction(models.Model):
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Totaux des entrées et sorties d'un portefeuille (update_balances)
+            models.Index(fields=['wallet', 'transaction_type'], name='accounts_wallettx_type_idx'),
+        ]
 
     def __str__(self):
         type_label = "+" if self.transaction_type == 'income' else "-"
         return f"{type_label}{self.amount} FCFA - {self.description}"
 
     def save(self, *args, **kwargs):
-        """Met à jour le portefeuille après une transaction."""
+        """Met à jour le portefeuille après une transaction et évalue les alertes."""
+        from .alerts import check_wallet_alerts
+        from monnkap.metrics import record_wallet_write
         is_new = self.pk is None
         super().save(*args, **kwargs)
         if is_new:
+            record_wallet_write(f'transaction_{self.transaction_type}')
             self.wallet.update_balances()
+            check_wallet_alerts(self.wallet, self)
 
 
 class GoalAllocation(models.Model):
@@ -189,6 +199,18 @@ class GoalAllocation(models.Model):
     def __str__(self):
         return f"{self.amount} FCFA alloués à {self.goal.title}"
 
+    def save(self, *args, **kwargs):
+        """Met à jour le portefeuille après une allocation et évalue l'alerte de solde bas."""
+        from .alerts import check_wallet_alerts
+        from monnkap.metrics import record_wallet_write
+        is_new = self.pk is None
+        super().save(*args, **kwargs)
+        if is_new:
+            record_wallet_write('goal_allocation')
+            self.wallet.update_balances()
+            check_wallet_alerts(self.wallet)
+
+
 # Signaux pour synchroniser Expense et WalletTransaction
 @receiver(post_save, sender='expenses.Expense')
 def create_or_update_wallet_transaction_from_expense(sender, instance, created, **kwargs):
@@ -232,9 +254,30 @@ def delete_wallet_transaction_from_expense(sender, instance, **kwargs):
     """
     if hasattr(instance, 'wallet_transaction') and instance.wallet_transaction:
         instance.wallet_transaction.delete()
-    def save(self, *args, **kwargs):
-        """Met à jour le portefeuille après une allocation."""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if is_new:
-            self.wallet.update_balances()
+
+
+# Signaux pour les requêtes conditionnelles (voir monnkap/conditional.py)
+@receiver(post_save, sender=Wallet)
+def bump_wallet_data_version(sender, instance, **kwargs):
+    """Change la version des pages de l'utilisateur (soldes affichés)."""
+    from monnkap.conditional import bump_user_version
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=WalletTransaction)
+@receiver(post_delete, sender=WalletTransaction)
+@receiver(post_save, sender=GoalAllocation)
+@receiver(post_delete, sender=GoalAllocation)
+def bump_wallet_entry_data_version(sender, instance, **kwargs):
+    """Change la version des pages du propriétaire du portefeuille (ETag)."""
+    from monnkap.conditional import bump_user_version
+    bump_user_version(instance.wallet.user_id)
+
+
+# Journal de synchronisation de la PWA (voir monnkap/sync.py)
+@receiver(post_save, sender=WalletTransaction)
+@receiver(post_delete, sender=WalletTransaction)
+def record_transaction_sync_change(sender, instance, signal, **kwargs):
+    """Transaction du portefeuille créée, modifiée ou supprimée."""
+    from monnkap.sync import record_signal_change
+    record_signal_change('transaction', instance, signal, instance.wallet.user_id, kwargs.get('origin'))
@@ -6,11 +6,23 @@ set -o errexit  # Exit on error
 # Installer les dépendances
 pip install -r requirements.txt
 
+# Bundles CSS / JS minifiés (static/dist/), empreintés par collectstatic
+python manage.py build_assets
+
 # Collecter les fichiers statiques
 python manage.py collectstatic --no-input
 
+# Manifeste de précache du service worker (URLs empreintées par collectstatic)
+python manage.py build_precache_manifest
+
 # Appliquer les migrations
 python manage.py migrate
 
+# Créer la table du cache partagé (DatabaseCache), sans effet si elle existe
+python manage.py createcachetable
+
 # Créer le superuser par défaut si aucun utilisateur n'existe
 python manage.py create_default_superuser
+
+# Miniatures des avatars manquantes (normalement générées à l'envoi)
+python manage.py process_avatars
@@ -0,0 +1,212 @@
+"""
+Commande de mesure des vues principales avec le client de test : latence
+(p50/p95), nombre de requêtes SQL, pic de mémoire Python et taille du HTML
+(brut et gzip) par vue.
+Le résultat est écrit en JSON pour comparer deux exécutions.
+
+À lancer sur les données de seed_benchmark_data :
+    python manage.py seed_benchmark_data
+    python manage.py benchmark_views --output avant.json
+    ... modification ...
+    python manage.py benchmark_views --output apres.json --compare avant.json
+"""
+import gzip
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from groups.models import Group
+
+from .seed_benchmark_data import BENCH_USERNAME
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _hot_views(user):
+    """Vues mesurées : nom → URL."""
+    views = {
+        'home_view': reverse('dashboard:home'),
+        'statistics_view': reverse('dashboard:statistics'),
+        'expense_list_view': reverse('expenses:list'),
+        'budget_list_view': reverse('expenses:budget_list'),
+        'wallet_dashboard_view': reverse('accounts:wallet'),
+    }
+    # Le plus grand groupe de l'utilisateur
+    group = (
+        Group.objects.filter(pk__in=user.member_groups.values('pk'))
+        .annotate(member_count=Count('members'))
+        .order_by('-member_count', 'pk')
+        .first()
+    )
+    if group is not None:
+        views['group_detail_view'] = reverse('groups:detail', args=[group.pk])
+    return views
+
+
+class Command(BaseCommand):
+    help = 'Mesure latence, requêtes SQL et mémoire des vues principales (résultat JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            default=BENCH_USERNAME,
+            help=f'Utilisateur connecté pendant la mesure (défaut : {BENCH_USERNAME})',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Requêtes mesurées par vue',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=2,
+            help='Requêtes non mesurées par vue avant la mesure',
+        )
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            help='Limiter la mesure à ces vues (ex. home_view group_detail_view)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Fichier JSON de sortie (défaut : sortie standard)',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Fichier JSON d\'une exécution précédente à comparer',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(
+                f'Utilisateur {options["username"]} introuvable : lancer d\'abord seed_benchmark_data'
+            )
+
+        views = _hot_views(user)
+        if options['views']:
+            unknown = set(options['views']) - set(views)
+            if unknown:
+                raise CommandError(f'Vues inconnues : {", ".join(sorted(unknown))}')
+            views = {name: url for name, url in views.items() if name in options['views']}
+
+        client = Client()
+        client.force_login(user)
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in views.items():
+                self.stderr.write(f'🔍 {name} ({url})')
+                results[name] = self._measure(client, url, options['iterations'], options['warmup'])
+
+        report = {
+            'meta': {
+                'date': timezone.now().isoformat(),
+                'revision': self._revision(),
+                'username': user.username,
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'views': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'✅ Résultats écrits dans {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+
+        durations = []
+        queries = []
+        status = None
+        for _ in range(max(1, iterations)):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                durations.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+            queries.append(len(captured))
+
+        # Mémoire mesurée à part : tracemalloc ralentit fortement les requêtes
+        tracemalloc.start()
+        try:
+            client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(_percentile(durations, 50), 2),
+            'p95_ms': round(_percentile(durations, 95), 2),
+            'mean_ms': round(statistics.mean(durations), 2),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+            # Octets transférés par requête (CSS / JS en ligne inclus)
+            'html_kb': round(len(response.content) / 1024, 1),
+            'html_gzip_kb': round(len(gzip.compress(response.content)) / 1024, 1),
+        }
+
+    def _revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def _compare(self, path, results):
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)['views']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Impossible de lire {path} : {e}')
+
+        self.stderr.write(f'\n📊 Comparaison avec {path}')
+        for name, current in results.items():
+            before = previous.get(name)
+            if before is None:
+                self.stderr.write(f'  → {name:<22} absent de la référence')
+                continue
+            self.stderr.write(
+                f'  → {name:<22} p50 {before["p50_ms"]:8.1f} → {current["p50_ms"]:8.1f} ms | '
+                f'p95 {before["p95_ms"]:8.1f} → {current["p95_ms"]:8.1f} ms | '
+                f'requêtes {before["queries"]:4d} → {current["queries"]:4d} | '
+                f'mémoire {before["peak_memory_kb"]:8.0f} → {current["peak_memory_kb"]:8.0f} Ko'
+            )
+            if 'html_kb' in before:
+                self.stderr.write(
+                    f'    {"":<22} HTML {before["html_kb"]:7.1f} → {current["html_kb"]:7.1f} Ko | '
+                    f'gzip {before["html_gzip_kb"]:6.1f} → {current["html_gzip_kb"]:6.1f} Ko'
+                )
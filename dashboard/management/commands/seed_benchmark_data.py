@@ -0,0 +1,374 @@
+"""
+Commande de génération de données fictives pour les mesures de performance :
+utilisateurs, dépenses, budgets, transactions du portefeuille, objectifs et
+grands groupes (contributions, dépenses partagées, épargne, fil d'activité).
+
+Les données sont reproductibles : même graine et mêmes tailles → mêmes
+données (les dates sont relatives à aujourd'hui). Les données fictives
+existantes (utilisateurs perf_*) sont supprimées avant chaque génération.
+
+Les insertions passent par bulk_create : ni signaux ni save() (pas d'alertes
+ni d'emails dans l'outbox). Les montants dérivés (soldes des portefeuilles,
+montants collectés des objectifs et des groupes) sont recalculés à la fin.
+
+Exemples :
+    python manage.py seed_benchmark_data
+    python manage.py seed_benchmark_data --users 200 --expenses 2000 --group-size 150
+    python manage.py seed_benchmark_data --cleanup
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import GoalAllocation, UserProfile, Wallet, WalletTransaction
+from expenses.models import Budget, Category, Expense
+from goals.models import Contribution, Goal
+from groups.models import (
+    Group, GroupActivity, GroupContribution, GroupExpense, GroupExpenseSplit,
+    GroupGoal, GroupSavingsContribution, GroupSavingsGoal, Membership, UserSearchIndex,
+)
+from groups.search import normalize_search_text
+
+
+BENCH_PREFIX = 'perf_'
+BENCH_USERNAME = f'{BENCH_PREFIX}user_0000'  # membre de tous les groupes
+
+DEFAULT_CATEGORIES = [
+    ('Alimentation', 'bi-basket', '#28a745'),
+    ('Transport', 'bi-bus-front', '#17a2b8'),
+    ('Logement', 'bi-house', '#6f42c1'),
+    ('Santé', 'bi-heart-pulse', '#dc3545'),
+    ('Loisirs', 'bi-controller', '#fd7e14'),
+    ('Éducation', 'bi-book', '#007bff'),
+]
+DESCRIPTIONS = [
+    'Marché Mokolo', 'Taxi', 'Loyer', 'Pharmacie', 'Cinéma', 'Frais de scolarité',
+    'Crédit téléphone', 'Boulangerie', 'Carburant', 'Restaurant', 'Électricité', 'Eau',
+]
+
+
+def _money(rng, low, high, step=50):
+    return Decimal(rng.randrange(low, high, step))
+
+
+class Command(BaseCommand):
+    help = 'Génère des données fictives reproductibles pour les mesures de performance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Nombre d\'utilisateurs')
+        parser.add_argument('--expenses', type=int, default=300, help='Dépenses par utilisateur')
+        parser.add_argument('--incomes', type=int, default=24, help='Revenus (portefeuille) par utilisateur')
+        parser.add_argument('--goals', type=int, default=5, help='Objectifs par utilisateur')
+        parser.add_argument('--contributions', type=int, default=10, help='Contributions par objectif')
+        parser.add_argument('--groups', type=int, default=3, help='Nombre de groupes')
+        parser.add_argument('--group-size', type=int, default=50, help='Membres par groupe')
+        parser.add_argument(
+            '--group-contributions', type=int, default=500, help='Contributions par groupe'
+        )
+        parser.add_argument(
+            '--group-expenses', type=int, default=100, help='Dépenses partagées par groupe'
+        )
+        parser.add_argument('--months', type=int, default=12, help='Historique couvert (mois)')
+        parser.add_argument('--seed', type=int, default=42, help='Graine du générateur aléatoire')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Taille des lots d\'insertion')
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Supprimer les données fictives puis quitter',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self._cleanup()
+        if options['cleanup']:
+            return
+        if options['group_size'] < 1 or options['users'] < 1:
+            raise CommandError('--users et --group-size doivent être positifs')
+
+        self.rng = random.Random(options['seed'])
+        self.today = timezone.now().date()
+        self.days = max(1, options['months'] * 30)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            self.categories = self._categories()
+            # Assez d'utilisateurs pour remplir un groupe
+            users = self._users(max(options['users'], options['group_size']))
+            # Données personnelles pour les --users premiers, les autres ne sont que membres
+            owners = users[:options['users']]
+            self._expenses(owners, options['expenses'])
+            self._budgets(owners, options['months'])
+            self._incomes(owners, options['incomes'])
+            self._goals(owners, options['goals'], options['contributions'])
+            self._groups(
+                users, options['groups'], options['group_size'],
+                options['group_contributions'], options['group_expenses'],
+            )
+            self._recompute_totals()
+
+        self.stdout.write(f'\n📊 Données générées en {time.perf_counter() - started:.1f} s')
+        self.stdout.write(self.style.SUCCESS(f'✅ Terminé (utilisateur de référence : {BENCH_USERNAME})'))
+
+    def _bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f'  → {model.__name__} : {len(created)}')
+        return created
+
+    def _date(self):
+        return self.today - timedelta(days=self.rng.randrange(self.days))
+
+    # ==================== GÉNÉRATION ====================
+
+    def _categories(self):
+        categories = list(Category.objects.order_by('pk'))
+        if not categories:
+            categories = self._bulk(Category, [
+                Category(name=name, icon=icon, color=color) for name, icon, color in DEFAULT_CATEGORIES
+            ])
+        return categories
+
+    def _users(self, count):
+        self.stdout.write(f'🔧 Création de {count} utilisateurs fictifs...')
+        self._bulk(User, [
+            User(
+                username=f'{BENCH_PREFIX}user_{index:04d}',
+                email=f'{BENCH_PREFIX}user_{index:04d}@example.com',
+                first_name=f'Perf{index}',
+                last_name='Benchmark',
+                password='!',
+            )
+            for index in range(count)
+        ])
+        # bulk_create ne renseigne pas les pk sur tous les SGBD
+        users = list(User.objects.filter(username__startswith=BENCH_PREFIX).order_by('username'))
+        self._bulk(UserProfile, [UserProfile(user=user) for user in users])
+        self._bulk(Wallet, [Wallet(user=user) for user in users])
+        self._bulk(UserSearchIndex, [
+            UserSearchIndex(
+                user=user,
+                username=normalize_search_text(user.username),
+                first_name=normalize_search_text(user.first_name),
+                last_name=normalize_search_text(user.last_name),
+            )
+            for user in users
+        ])
+        return users
+
+    def _expenses(self, users, per_user):
+        self.stdout.write(f'🔧 {per_user} dépenses par utilisateur...')
+        self._bulk(Expense, [
+            Expense(
+                user=user,
+                category=self.rng.choice(self.categories),
+                amount=_money(self.rng, 500, 60000),
+                description=self.rng.choice(DESCRIPTIONS),
+                date=self._date(),
+            )
+            for user in users
+            for _ in range(per_user)
+        ])
+        # Comme le signal post_save d'Expense : une sortie du portefeuille par dépense
+        wallets = dict(Wallet.objects.filter(user__in=users).values_list('user_id', 'pk'))
+        self._bulk(WalletTransaction, [
+            WalletTransaction(
+                wallet_id=wallets[expense.user_id],
+                transaction_type='expense',
+                amount=expense.amount,
+                category_id=expense.category_id,
+                expense=expense,
+                description=expense.description,
+                date=expense.date,
+            )
+            for expense in Expense.objects.filter(user__in=users).only(
+                'pk', 'user_id', 'amount', 'category_id', 'description', 'date'
+            ).iterator()
+        ])
+
+    def _budgets(self, users, months):
+        budgets = []
+        for user in users:
+            for offset in range(min(months, 3)):
+                month_start = (self.today.replace(day=1) - timedelta(days=31 * offset)).replace(day=1)
+                for category in self.rng.sample(self.categories, min(4, len(self.categories))):
+                    budgets.append(Budget(
+                        user=user,
+                        category=category,
+                        amount=_money(self.rng, 20000, 300000, 5000),
+                        month=month_start.month,
+                        year=month_start.year,
+                    ))
+        self._bulk(Budget, budgets)
+
+    def _incomes(self, users, per_user):
+        wallets = dict(Wallet.objects.filter(user__in=users).values_list('user_id', 'pk'))
+        self._bulk(WalletTransaction, [
+            WalletTransaction(
+                wallet_id=wallets[user.pk],
+                transaction_type='income',
+                amount=_money(self.rng, 150000, 600000, 1000),
+                description=self.rng.choice(['Salaire', 'Prime', 'Tontine', 'Vente']),
+                date=self._date(),
+            )
+            for user in users
+            for _ in range(per_user)
+        ])
+
+    def _goals(self, users, per_user, contributions):
+        goals = self._bulk(Goal, [
+            Goal(
+                user=user,
+                title=f'Objectif {index + 1}',
+                target_amount=_money(self.rng, 100000, 2000000, 10000),
+                deadline=self.today + timedelta(days=self.rng.randrange(30, 720)),
+                status=self.rng.choices(['active', 'completed', 'cancelled'], (8, 1, 1))[0],
+            )
+            for user in users
+            for index in range(per_user)
+        ])
+        goals = list(Goal.objects.filter(user__in=users))
+        self._bulk(Contribution, [
+            Contribution(goal=goal, amount=_money(self.rng, 1000, 50000), date=self._date())
+            for goal in goals
+            for _ in range(contributions)
+        ])
+        wallets = dict(Wallet.objects.filter(user__in=users).values_list('user_id', 'pk'))
+        self._bulk(GoalAllocation, [
+            GoalAllocation(wallet_id=wallets[goal.user_id], goal=goal, amount=_money(self.rng, 5000, 30000))
+            for goal in goals
+            if goal.status == 'active'
+        ])
+
+    def _groups(self, users, count, size, contributions, expenses):
+        self.stdout.write(f'🔧 {count} groupe(s) de {size} membres...')
+        reference = users[0]
+        groups = []
+        for index in range(count):
+            group = Group.objects.create(
+                name=f'{BENCH_PREFIX}groupe_{index + 1}',
+                description='Groupe fictif pour les mesures de performance',
+                creator=reference,
+                target_amount=_money(self.rng, 1000000, 10000000, 100000),
+                deadline=self.today + timedelta(days=365),
+            )
+            members = [reference] + self.rng.sample(users[1:], min(size, len(users)) - 1)
+            Membership.objects.bulk_create([
+                Membership(user=user, group=group, role='admin' if user == reference else 'member')
+                for user in members
+            ])
+            goals = GroupGoal.objects.bulk_create([
+                GroupGoal(
+                    group=group,
+                    title=f'Objectif collectif {goal_index + 1}',
+                    target_amount=_money(self.rng, 500000, 5000000, 50000),
+                    deadline=self.today + timedelta(days=self.rng.randrange(60, 540)),
+                    created_by=reference,
+                )
+                for goal_index in range(3)
+            ])
+            GroupContribution.objects.bulk_create([
+                GroupContribution(
+                    group=group,
+                    goal=self.rng.choice(goals + [None]),
+                    user=self.rng.choice(members),
+                    amount=_money(self.rng, 1000, 100000),
+                    date=self._date(),
+                )
+                for _ in range(contributions)
+            ], batch_size=self.batch_size)
+            group_expenses = GroupExpense.objects.bulk_create([
+                GroupExpense(
+                    group=group,
+                    category=self.rng.choice(self.categories),
+                    amount=_money(self.rng, 5000, 500000, 500),
+                    description=self.rng.choice(DESCRIPTIONS),
+                    paid_by=self.rng.choice(members),
+                    date=self._date(),
+                )
+                for _ in range(expenses)
+            ], batch_size=self.batch_size)
+            splits = []
+            for expense in GroupExpense.objects.filter(group=group):
+                share = (expense.amount / len(members)).quantize(Decimal('0.01'))
+                splits.extend(
+                    GroupExpenseSplit(expense=expense, user=user, amount=share, is_paid=self.rng.random() < 0.6)
+                    for user in members
+                )
+            GroupExpenseSplit.objects.bulk_create(splits, batch_size=self.batch_size)
+            savings = GroupSavingsGoal.objects.create(
+                group=group,
+                title='Épargne commune',
+                target_amount=_money(self.rng, 500000, 5000000, 50000),
+                deadline=self.today + timedelta(days=365),
+                created_by=reference,
+            )
+            GroupSavingsContribution.objects.bulk_create([
+                GroupSavingsContribution(
+                    savings_goal=savings, user=self.rng.choice(members),
+                    amount=_money(self.rng, 1000, 50000), date=self._date(),
+                )
+                for _ in range(max(1, contributions // 5))
+            ], batch_size=self.batch_size)
+            # Fil d'activité (normalement alimenté par les signaux)
+            GroupActivity.objects.bulk_create([
+                GroupActivity(
+                    group=group,
+                    actor=contribution.user,
+                    kind='contribution',
+                    amount=contribution.amount,
+                    description=f'{contribution.user.username} a contribué',
+                    object_id=contribution.pk,
+                )
+                for contribution in GroupContribution.objects.filter(group=group).select_related('user')
+            ], batch_size=self.batch_size)
+            groups.append(group)
+            self.stdout.write(
+                f'  → {group.name} : {len(members)} membres, {contributions} contributions, '
+                f'{len(group_expenses)} dépenses, {len(splits)} parts'
+            )
+        return groups
+
+    def _recompute_totals(self):
+        """Recalcule les montants dérivés ignorés par bulk_create."""
+        self.stdout.write('🔧 Recalcul des soldes et montants collectés...')
+
+        def total(model, key, **filters):
+            amounts = model.objects.filter(**{key: OuterRef('pk')}, **filters).values(key)
+            return Coalesce(
+                Subquery(amounts.annotate(total=Sum('amount')).values('total')),
+                Value(Decimal('0.00')),
+            )
+
+        Goal.objects.filter(user__username__startswith=BENCH_PREFIX).update(
+            current_amount=total(Contribution, 'goal')
+        )
+        GroupGoal.objects.filter(group__name__startswith=BENCH_PREFIX).update(
+            current_amount=total(GroupContribution, 'goal')
+        )
+        groups = Group.objects.filter(name__startswith=BENCH_PREFIX)
+        # Contributions sans objectif : ancien système, comptées sur le groupe
+        groups.update(current_amount=total(GroupContribution, 'group', goal__isnull=True))
+        GroupSavingsGoal.objects.filter(group__in=groups).update(
+            current_amount=total(GroupSavingsContribution, 'savings_goal')
+        )
+        for wallet in Wallet.objects.filter(user__username__startswith=BENCH_PREFIX):
+            wallet.update_balances()
+
+    # ==================== NETTOYAGE ====================
+
+    def _cleanup(self):
+        ids = list(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+        if not ids:
+            return
+        self.stdout.write(f'🧹 Suppression des données fictives de {len(ids)} utilisateur(s)...')
+        with transaction.atomic():
+            for start in range(0, len(ids), self.batch_size):
+                User.objects.filter(pk__in=ids[start:start + self.batch_size]).delete()
+        self.stdout.write(self.style.SUCCESS('✅ Données fictives supprimées'))
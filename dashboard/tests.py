@@ -1,3 +1,201 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import EmailVerificationCode, SlowQuery
+from accounts.wallet_models import WalletTransaction
+from expenses.models import Budget, Expense
+from goals.models import Goal
+from groups.models import GroupContribution
+from monnkap.query_count import QueryBudgetMixin
+from monnkap.query_plans import QueryPlanMixin
+
+from .management.commands.benchmark_views import _hot_views
+from .management.commands.seed_benchmark_data import BENCH_USERNAME
+
+
+class SeededDataTestCase(TestCase):
+    """Jeu de données réduit de `seed_benchmark_data`, partagé par les tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark_data',
+            users=3, expenses=40, incomes=6, goals=3, contributions=3,
+            groups=1, group_size=8, group_contributions=30, group_expenses=6,
+            stdout=StringIO(),
+        )
+        cls.user = User.objects.get(username=BENCH_USERNAME)
+
+
+class QueryBudgetTests(QueryBudgetMixin, SeededDataTestCase):
+    """
+    Nombre de requêtes SQL des vues principales, comparé aux budgets de
+    query_budgets.json (base de non-régression : nombres mesurés, N+1 connus
+    compris). Un dépassement (nouveau N+1...) fait échouer la CI ;
+    après une optimisation, abaisser le budget correspondant.
+    """
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_hot_views_within_budget(self):
+        for name, url in _hot_views(self.user).items():
+            with self.subTest(view=name):
+                self.assertWithinQueryBudget(url)
+
+
+@override_settings(QUERY_COUNT_ENABLED=True)
+class QueryLocationTests(SeededDataTestCase):
+    """
+    Origine des N+1 journalisés par QueryCountMiddleware : la ligne de la vue
+    ou du gabarit, jamais les execute_wrapper des autres middlewares.
+    """
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _suspect_locations(self, url):
+        with self.assertLogs('monnkap.query_count', 'WARNING') as logs:
+            self.client.get(url)
+        return [
+            line.split(' : ', 1)[1]
+            for line in '\n'.join(logs.output).splitlines()
+            if 'N+1 probable' in line
+        ]
+
+    def test_location_in_model_code(self):
+        locations = self._suspect_locations(_hot_views(self.user)['budget_list_view'])
+        self.assertIn('expenses/models.py:', locations[0])
+        self.assertFalse([location for location in locations if location.startswith('monnkap/')])
+
+    def test_location_in_template(self):
+        locations = self._suspect_locations(_hot_views(self.user)['group_detail_view'])
+        self.assertTrue(locations[0].startswith('groups/views.py:'))
+        self.assertIn('← groups/group_detail.html:', locations[0])
+
+
+@mock.patch('monnkap.slow_queries.SLOW_QUERY_THRESHOLD_MS', 0)
+class SlowQueryPlanTests(SeededDataTestCase):
+    """
+    Journal des requêtes lentes : aucun EXPLAIN pendant la requête HTTP, la
+    plus lente est notée puis son plan capturé par `slow_queries --capture-plans`.
+    """
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _get_home(self):
+        with self.assertLogs('monnkap.slow_queries', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('dashboard:home')).status_code, 200)
+
+    def test_plan_captured_outside_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            self._get_home()
+        self.assertFalse([q['sql'] for q in queries if q['sql'].lstrip().upper().startswith('EXPLAIN')])
+        pending = SlowQuery.objects.exclude(plan_sql='')
+        self.assertEqual(pending.count(), 1)
+        self.assertEqual(SlowQuery.objects.exclude(explain='').count(), 0)
+
+        output = StringIO()
+        call_command('slow_queries', capture_plans=True, stdout=output)
+
+        self.assertIn('1 plan(s) capturé(s)', output.getvalue())
+        self.assertFalse(SlowQuery.objects.exclude(plan_sql='').exists())
+        self.assertEqual(SlowQuery.objects.exclude(explain='').exclude(explained_at=None).count(), 1)
+
+    def test_plan_noted_once_per_interval(self):
+        self._get_home()
+        # Plans récents et jamais battus : rien à noter
+        SlowQuery.objects.update(max_ms=10 ** 6, explained_at=timezone.now(), plan_sql='')
+
+        self._get_home()
+        self.assertFalse(SlowQuery.objects.exclude(plan_sql='').exists())
+
+        # Plans anciens : la plus lente est notée à nouveau, une seule
+        SlowQuery.objects.update(explained_at=timezone.now() - timedelta(days=1))
+        self._get_home()
+        self.assertEqual(SlowQuery.objects.exclude(plan_sql='').count(), 1)
+
+
+class HotQueryPlanTests(QueryPlanMixin, SeededDataTestCase):
+    """
+    Plans d'exécution des requêtes chaudes : chacune doit passer par son index
+    (voir Meta.indexes des modèles). Un retour au parcours complet de la table
+    fait échouer la CI.
+    """
+
+    def setUp(self):
+        self.today = timezone.now().date()
+
+    def test_expenses_of_month(self):
+        # Tableau de bord, Budget.get_spent_amount
+        queryset = Expense.objects.filter(
+            user=self.user, date__month=self.today.month, date__year=self.today.year
+        )
+        self.assertUsesIndex(queryset, 'expenses_user_date_idx')
+
+    def test_expenses_since(self):
+        queryset = Expense.objects.filter(user=self.user, date__gte=self.today - timedelta(days=7))
+        self.assertUsesIndex(queryset, 'expenses_user_date_idx')
+
+    def test_recent_expenses(self):
+        queryset = Expense.objects.filter(user=self.user).order_by('-date', '-created_at')[:5]
+        self.assertUsesIndex(queryset, 'expenses_user_date_idx')
+
+    def test_category_expenses_of_month(self):
+        category_id = Expense.objects.filter(user=self.user).values_list('category_id', flat=True).first()
+        queryset = Expense.objects.filter(
+            user=self.user, category_id=category_id,
+            date__month=self.today.month, date__year=self.today.year,
+        )
+        self.assertUsesIndex(queryset, 'expenses_user_cat_date_idx')
+
+    def test_budgets_of_month(self):
+        queryset = Budget.objects.filter(user=self.user, year=self.today.year, month=self.today.month)
+        self.assertUsesIndex(queryset, 'expenses_budget_period_idx')
+
+    def test_wallet_totals(self):
+        # Wallet.update_balances
+        for transaction_type in ('income', 'expense'):
+            with self.subTest(transaction_type=transaction_type):
+                queryset = WalletTransaction.objects.filter(
+                    wallet=self.user.wallet, transaction_type=transaction_type
+                ).values('amount')
+                self.assertUsesIndex(queryset, 'accounts_wallettx_type_idx')
+
+    def test_active_goals(self):
+        queryset = Goal.objects.filter(user=self.user, status='active').order_by('deadline')[:5]
+        self.assertUsesIndex(queryset, 'goals_user_status_idx')
+
+    def test_group_contributions_by_member(self):
+        # Page du groupe : contributions et statistiques par membre
+        group = self.user.member_groups.first()
+        with self.subTest('contributions'):
+            self.assertUsesIndex(GroupContribution.objects.filter(group=group), 'groups_contrib_member_idx')
+        with self.subTest('statistiques'):
+            queryset = GroupContribution.objects.filter(group=group).values('user_id').annotate(
+                total=Sum('amount')
+            ).order_by('-total')
+            self.assertUsesIndex(queryset, 'groups_contrib_member_idx')
+
+    def test_user_contributions_of_month(self):
+        queryset = GroupContribution.objects.filter(
+            user=self.user, date__month=self.today.month, date__year=self.today.year
+        )
+        self.assertUsesIndex(queryset, 'groups_contrib_user_date_idx')
+
+    def test_valid_verification_codes(self):
+        queryset = EmailVerificationCode.objects.filter(
+            user=self.user, is_used=False, expires_at__gt=timezone.now()
+        )
+        self.assertUsesIndex(queryset, 'accounts_code_lookup_idx')
@@ -9,8 +9,10 @@ import json
 from expenses.models import Expense, Category
 from goals.models import Goal
 from groups.models import Group, GroupContribution
+from monnkap.conditional import conditional_page
 
 
+@conditional_page(user_groups=True)
 @login_required
 def home_view(request):
     """
@@ -152,6 +154,7 @@ def home_view(request):
     return render(request, 'dashboard/home.html', context)
 
 
+@conditional_page()
 @login_required
 def statistics_view(request):
     """
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from decimal import Decimal
 
 
@@ -52,7 +54,9 @@ class Expense(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='expenses',
-        verbose_name='Utilisateur'
+        verbose_name='Utilisateur',
+        # Index couvert par expenses_user_date_idx (voir Meta.indexes)
+        db_index=False,
     )
     category = models.ForeignKey(
         Category,
@@ -92,6 +96,12 @@ class Expense(models.Model):
         verbose_name = 'Dépense'
         verbose_name_plural = 'Dépenses'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Dépenses d'un utilisateur par période (listes, totaux du mois, statistiques)
+            models.Index(fields=['user', '-date'], name='expenses_user_date_idx'),
+            # Dépenses d'une catégorie par période (budgets par catégorie, filtres)
+            models.Index(fields=['user', 'category', '-date'], name='expenses_user_cat_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.amount} FCFA ({self.date})"
@@ -105,7 +115,8 @@ class Budget(models.Model):
     """
     Modèle pour définir des budgets mensuels par catégorie.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
+    # Index couvert par expenses_budget_period_idx (voir Meta.indexes)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets', db_index=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='budgets', null=True, blank=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Montant du budget")
     month = models.IntegerField(verbose_name="Mois (1-12)")
@@ -117,6 +128,10 @@ class Budget(models.Model):
     class Meta:
         unique_together = ['user', 'category', 'month', 'year']
         ordering = ['-year', '-month']
+        indexes = [
+            # Budgets d'un mois, toutes catégories (liste des budgets, alertes)
+            models.Index(fields=['user', 'year', 'month'], name='expenses_budget_period_idx'),
+        ]
         verbose_name = "Budget"
         verbose_name_plural = "Budgets"
     
@@ -146,7 +161,7 @@ class Budget(models.Model):
         spent = self.get_spent_amount()
         if self.amount == 0:
             return 0
-        percentage = (spent / float(self.amount)) * 100
+        percentage = (float(spent) / float(self.amount)) * 100
         return min(percentage, 100)
     
     def is_exceeded(self):
@@ -174,3 +189,31 @@ class Budget(models.Model):
             'warning': 'warning',
             'exceeded': 'danger'
         }.get(status, 'secondary')
+
+
+# Signaux pour les requêtes conditionnelles (voir monnkap/conditional.py)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def bump_user_data_version(sender, instance, **kwargs):
+    """Change la version des pages de l'utilisateur (ETag)."""
+    from monnkap.conditional import bump_user_version
+    bump_user_version(instance.user_id)
+
+
+# Journal de synchronisation de la PWA (voir monnkap/sync.py)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def record_expense_sync_change(sender, instance, signal, **kwargs):
+    """Dépense créée, modifiée ou supprimée."""
+    from monnkap.sync import record_signal_change
+    record_signal_change('expense', instance, signal, instance.user_id, kwargs.get('origin'))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def record_category_sync_change(sender, instance, signal, **kwargs):
+    """Catégorie (partagée par tous les utilisateurs)."""
+    from monnkap.sync import record_signal_change
+    record_signal_change('category', instance, signal, None, kwargs.get('origin'))
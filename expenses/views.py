@@ -12,8 +12,11 @@ from .models import Expense, Category, Budget
 from .forms import ExpenseForm, CategoryForm
 from .budget_forms import BudgetForm
 from accounts.motivation_messages import get_expense_message
+from monnkap.conditional import conditional_page
+from monnkap.pwa import offline_form
 
 
+@conditional_page()
 @login_required
 def expense_list_view(request):
     """
@@ -86,6 +89,7 @@ def expense_list_view(request):
     return render(request, 'expenses/expense_list.html', context)
 
 
+@offline_form
 @login_required
 def expense_create_view(request):
     """
@@ -334,6 +338,7 @@ def export_expenses_csv(request):
 
 # ==================== VUES POUR LES BUDGETS ====================
 
+@conditional_page()
 @login_required
 def budget_list_view(request):
     """
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from decimal import Decimal
 
@@ -20,7 +22,9 @@ class Goal(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='goals',
-        verbose_name='Utilisateur'
+        verbose_name='Utilisateur',
+        # Index couvert par goals_user_status_idx (voir Meta.indexes)
+        db_index=False,
     )
     title = models.CharField(
         max_length=200,
@@ -66,6 +70,9 @@ class Goal(models.Model):
         verbose_name = 'Objectif financier'
         verbose_name_plural = 'Objectifs financiers'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='goals_user_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -150,3 +157,29 @@ class Contribution(models.Model):
         super().save(*args, **kwargs)
         if is_new:
             self.goal.add_contribution(self.amount)
+
+
+# Signaux pour les requêtes conditionnelles (voir monnkap/conditional.py)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+def bump_goal_data_version(sender, instance, **kwargs):
+    """Change la version des pages de l'utilisateur (ETag)."""
+    from monnkap.conditional import bump_user_version
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Contribution)
+@receiver(post_delete, sender=Contribution)
+def bump_contribution_data_version(sender, instance, **kwargs):
+    """Change la version des pages du propriétaire de l'objectif (ETag)."""
+    from monnkap.conditional import bump_user_version
+    bump_user_version(instance.goal.user_id)
+
+
+# Journal de synchronisation de la PWA (voir monnkap/sync.py)
+@receiver(post_save, sender=Goal)
+@receiver(post_delete, sender=Goal)
+def record_goal_sync_change(sender, instance, signal, **kwargs):
+    """Objectif créé, modifié (contributions, allocations) ou supprimé."""
+    from monnkap.sync import record_signal_change
+    record_signal_change('goal', instance, signal, instance.user_id, kwargs.get('origin'))
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
 from .models import Goal, Contribution
@@ -8,9 +9,11 @@ from .forms import GoalForm, ContributionForm
 from accounts.emails import send_goal_achieved_email
 from accounts.motivation_messages import get_savings_message
 from expenses.models import Expense
-from accounts.models import Wallet
+from accounts.user_context import get_user_wallet
+from monnkap.conditional import conditional_page
 
 
+@conditional_page()
 @login_required
 def goal_list_view(request):
     """
@@ -129,18 +132,22 @@ def contribution_create_view(request, goal_pk):
     if request.method == 'POST':
         form = ContributionForm(request.POST)
         if form.is_valid():
-            contribution = form.save(commit=False)
-            contribution.goal = goal
-            contribution.save()
-            
-            # Vérifier si l'objectif est atteint et envoyer un email
-            if goal.get_progress_percentage() >= 100 and goal.status == 'active':
-                goal.status = 'completed'
-                goal.save()
-                try:
+            with transaction.atomic():
+                # Contribution.save() peut déjà passer l'objectif à 'completed'
+                was_active = goal.status == 'active'
+                contribution = form.save(commit=False)
+                contribution.goal = goal
+                contribution.save()
+                
+                # Vérifier si l'objectif est atteint et mettre l'email en file (outbox)
+                goal_achieved = was_active and goal.get_progress_percentage() >= 100
+                if goal_achieved:
+                    if goal.status != 'completed':
+                        goal.status = 'completed'
+                        goal.save()
                     send_goal_achieved_email(request.user, goal)
-                except Exception as e:
-                    print(f"Erreur envoi email objectif atteint: {e}")
+            
+            if goal_achieved:
                 messages.success(request, f'🎉 Félicitations ! Objectif "{goal.title}" atteint !')
             else:
                 messages.success(request, f'Contribution de {contribution.amount} FCFA ajoutée!')
@@ -213,7 +220,7 @@ def release_goal_funds_view(request, pk):
     
     if request.method == 'POST':
         # Récupérer le wallet
-        wallet, _ = Wallet.objects.get_or_create(user=request.user)
+        wallet = get_user_wallet(request)
         
         # Remettre l'argent dans le solde disponible
         amount_to_release = goal.current_amount
@@ -0,0 +1,247 @@
+"""
+Résolution des adhésions aux groupes pour les vues.
+
+Le décorateur `group_access` charge l'objet ciblé (groupe, objectif, dépense,
+partage ou objectif d'épargne), son groupe et l'adhésion de l'utilisateur
+connecté en une seule requête SQL, puis applique la règle de rôle de la vue.
+
+Les adhésions résolues sont mémorisées sur la requête et, brièvement, dans le
+cache Django. La carte en cache est versionnée par utilisateur : toute
+modification d'une adhésion change la version et rend l'ancienne carte
+inaccessible, même sur les autres workers. La version est lue et écrite dans
+le cache partagé (niveau L2 de monnkap/cache_backend.py), jamais dans le L1
+de chaque worker.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.shortcuts import get_object_or_404, redirect
+
+from .models import Group, Membership
+
+
+MEMBERSHIP_CACHE_TIMEOUT = getattr(settings, 'GROUP_MEMBERSHIP_CACHE_TIMEOUT', 60)
+
+ROLE_MEMBER = 'member'
+ROLE_ADMIN = 'admin'
+
+_REQUEST_ATTR = '_group_memberships'
+
+
+def _version_key(user_id):
+    return f'groups:memberships:version:{user_id}'
+
+
+def _map_key(user_id, version):
+    return f'groups:memberships:{user_id}:{version}'
+
+
+def _shared_cache():
+    # Cache à deux niveaux : les versions ne passent jamais par le L1
+    return getattr(cache, 'l2', cache)
+
+
+def _get_version(user_id):
+    """Retourne la version courante de la carte d'adhésions d'un utilisateur."""
+    shared = _shared_cache()
+    version = shared.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        if not shared.add(_version_key(user_id), version, None):
+            version = shared.get(_version_key(user_id), version)
+    return version
+
+
+def invalidate_membership_cache(user_id):
+    """
+    Invalide la carte d'adhésions d'un utilisateur.
+    Appelé par les signaux de Membership (création, modification, suppression).
+    """
+    _shared_cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+class _MembershipMap:
+    """
+    Carte {group_id: (membership_id, role)} d'un utilisateur pour une requête.
+    `complete` indique que toutes les adhésions ont été chargées ; sinon,
+    seules les entrées résolues par les vues sont connues (None = non membre).
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.version = _get_version(user_id)
+        cached = cache.get(_map_key(user_id, self.version))
+        if cached is None:
+            self.complete, self.entries = False, {}
+        else:
+            self.complete, self.entries = cached
+
+    def knows(self, group_id):
+        return self.complete or group_id in self.entries
+
+    def get(self, group_id):
+        return self.entries.get(group_id)
+
+    def remember(self, group_id, entry):
+        if group_id in self.entries and self.entries[group_id] == entry:
+            return
+        self.entries[group_id] = entry
+        self._store()
+
+    def load_all(self):
+        """Charge toutes les adhésions de l'utilisateur en une requête."""
+        rows = Membership.objects.filter(
+            user_id=self.user_id
+        ).values_list('group_id', 'pk', 'role')
+        self.entries = {group_id: (pk, role) for group_id, pk, role in rows}
+        self.complete = True
+        self._store()
+
+    def _store(self):
+        # Écrit sous la version lue en début de requête : si une adhésion a
+        # changé entre-temps, cette carte devient simplement inaccessible.
+        cache.set(
+            _map_key(self.user_id, self.version),
+            (self.complete, self.entries),
+            MEMBERSHIP_CACHE_TIMEOUT
+        )
+
+
+def _membership_map(request):
+    membership_map = getattr(request, _REQUEST_ATTR, None)
+    if membership_map is None:
+        membership_map = _MembershipMap(request.user.pk)
+        setattr(request, _REQUEST_ATTR, membership_map)
+    return membership_map
+
+
+def _build_membership(request, group, entry):
+    """Construit l'instance Membership de l'utilisateur à partir d'une entrée de la carte."""
+    if entry is None:
+        return None
+    membership_id, role = entry
+    membership = Membership(pk=membership_id, user=request.user, group=group, role=role)
+    membership._state.adding = False
+    membership._state.db = 'default'
+    return membership
+
+
+def get_membership(request, group):
+    """
+    Retourne l'adhésion de l'utilisateur connecté à un groupe (ou None).
+    Accepte un Group ou un identifiant ; sans requête SQL si la carte est en cache.
+    """
+    group_id = group.pk if isinstance(group, Group) else int(group)
+    membership_map = _membership_map(request)
+    if not membership_map.knows(group_id):
+        membership_map.load_all()
+    if not isinstance(group, Group):
+        group = Group(pk=group_id)
+        group._state.adding = False
+    return _build_membership(request, group, membership_map.get(group_id))
+
+
+def get_user_group_ids(request):
+    """Retourne les identifiants des groupes dont l'utilisateur connecté est membre."""
+    membership_map = _membership_map(request)
+    if not membership_map.complete:
+        membership_map.load_all()
+    return [group_id for group_id, entry in membership_map.entries.items() if entry]
+
+
+def get_group_ids_for_user(user_id):
+    """Identifiants des groupes d'un utilisateur, hors d'une requête HTTP."""
+    membership_map = _MembershipMap(user_id)
+    if not membership_map.complete:
+        membership_map.load_all()
+    return [group_id for group_id, entry in membership_map.entries.items() if entry]
+
+
+def has_role(membership, role):
+    """Vérifie qu'une adhésion satisfait le rôle demandé ('member' ou 'admin')."""
+    if membership is None:
+        return False
+    return role == ROLE_MEMBER or membership.role == role
+
+
+def _resolve_group(obj, group_path):
+    if group_path is None:
+        return obj
+    for attr in group_path.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _default_denied_redirect(obj, group, role):
+    if role == ROLE_ADMIN:
+        return redirect('groups:detail', pk=group.pk)
+    return redirect('groups:list')
+
+
+def group_access(model=Group, lookup='pk', group_path=None, role=ROLE_MEMBER,
+                 denied_message=None, denied_redirect=None, select_related=()):
+    """
+    Décorateur de vue : résout l'objet ciblé, son groupe et l'adhésion de l'utilisateur.
+
+    La vue décorée reçoit l'objet et l'adhésion à la place de l'argument d'URL :
+    `view(request, obj, membership, **autres_kwargs)`.
+
+    Args:
+        model: Modèle ciblé par l'URL (Group, GroupGoal, GroupExpense...)
+        lookup: Nom de l'argument d'URL contenant la clé primaire
+        group_path: Chemin vers le groupe depuis l'objet ('group', 'expense__group').
+            Par défaut 'group', ou l'objet lui-même pour Group.
+        role: Rôle minimal requis ('member' ou 'admin')
+        denied_message: Message affiché en cas de refus
+        denied_redirect: Callable (obj, group) -> réponse de redirection en cas de refus
+        select_related: Relations supplémentaires à charger avec l'objet
+    """
+    if group_path is None and model is not Group:
+        group_path = 'group'
+
+    if denied_message is None:
+        if role == ROLE_ADMIN:
+            denied_message = 'Seuls les administrateurs peuvent effectuer cette action.'
+        else:
+            denied_message = 'Vous n\'êtes pas membre de ce groupe.'
+
+    group_ref = f'{group_path}_id' if group_path else 'pk'
+    related = tuple(select_related)
+    if group_path:
+        related = (group_path,) + related
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            pk = kwargs.pop(lookup)
+
+            viewer_memberships = Membership.objects.filter(
+                group=OuterRef(group_ref),
+                user=request.user
+            )
+            queryset = model.objects.select_related(*related).annotate(
+                viewer_membership_id=Subquery(viewer_memberships.values('pk')[:1]),
+                viewer_role=Subquery(viewer_memberships.values('role')[:1])
+            )
+            obj = get_object_or_404(queryset, pk=pk)
+            group = _resolve_group(obj, group_path)
+
+            entry = None
+            if obj.viewer_membership_id is not None:
+                entry = (obj.viewer_membership_id, obj.viewer_role)
+            _membership_map(request).remember(group.pk, entry)
+            membership = _build_membership(request, group, entry)
+
+            if not has_role(membership, role):
+                messages.error(request, denied_message)
+                if denied_redirect is not None:
+                    return denied_redirect(obj, group)
+                return _default_denied_redirect(obj, group, role)
+
+            return view_func(request, obj, membership, *args, **kwargs)
+        return wrapper
+    return decorator
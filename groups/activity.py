@@ -0,0 +1,108 @@
+"""
+Fil d'activité des groupes.
+
+Les événements (contributions, dépenses, remboursements, épargne, adhésions)
+sont journalisés dans GroupActivity par les signaux de groups/models.py.
+Le fil est paginé par identifiant (pagination par curseur) : son coût ne
+dépend pas de la taille de l'historique.
+"""
+from .models import GroupActivity
+
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 50
+
+ACTIVITY_FIELDS = ('id', 'kind', 'amount', 'description', 'created_at', 'actor__username')
+
+ACTIVITY_ICONS = {
+    'contribution': 'bi-piggy-bank',
+    'expense': 'bi-receipt',
+    'split_paid': 'bi-check-circle',
+    'savings_contribution': 'bi-wallet2',
+    'member_joined': 'bi-person-plus',
+    'member_left': 'bi-person-dash',
+}
+
+
+def parse_cursor(value):
+    """Convertit un curseur reçu en paramètre GET (None si absent ou invalide)."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor >= 0 else None
+
+
+def get_activity_page(group_id, before=None, since=None, limit=FEED_PAGE_SIZE):
+    """
+    Retourne une page du fil d'activité d'un groupe.
+
+    Args:
+        group_id: Identifiant du groupe
+        before: Curseur pour charger les activités plus anciennes
+        since: Curseur pour ne charger que les activités plus récentes (polling)
+        limit: Nombre maximal d'activités
+
+    Returns:
+        dict avec 'activities' (les plus récentes d'abord), 'next_cursor'
+        (curseur de la page plus ancienne ou None) et 'latest_cursor'
+        (curseur à renvoyer en `since` lors du prochain polling, None pour
+        les pages plus anciennes)
+    """
+    limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+    queryset = GroupActivity.objects.filter(group_id=group_id).values(*ACTIVITY_FIELDS)
+
+    if since is not None:
+        # Polling : les plus anciennes d'abord pour avancer le curseur sans trou
+        rows = list(queryset.filter(id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        latest_cursor = rows[-1]['id'] if rows else since
+        rows.reverse()
+        return {
+            'activities': rows,
+            'next_cursor': None,
+            'latest_cursor': latest_cursor,
+            'has_more': has_more,
+        }
+
+    if before is not None:
+        queryset = queryset.filter(id__lt=before)
+    rows = list(queryset.order_by('-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest_cursor = None
+    if before is None:
+        latest_cursor = rows[0]['id'] if rows else 0
+    return {
+        'activities': rows,
+        'next_cursor': rows[-1]['id'] if has_more else None,
+        'latest_cursor': latest_cursor,
+        'has_more': has_more,
+    }
+
+
+def activity_to_row(activity):
+    """Convertit une instance GroupActivity au format des lignes du fil."""
+    return {
+        'id': activity.pk,
+        'kind': activity.kind,
+        'amount': activity.amount,
+        'description': activity.description,
+        'created_at': activity.created_at,
+        'actor__username': activity.actor.username if activity.actor_id else None,
+    }
+
+
+def serialize_activity(row):
+    """Prépare une activité pour la réponse JSON."""
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'label': dict(GroupActivity.KIND_CHOICES).get(row['kind'], row['kind']),
+        'icon': ACTIVITY_ICONS.get(row['kind'], 'bi-activity'),
+        'actor': row['actor__username'],
+        'amount': str(row['amount']) if row['amount'] is not None else None,
+        'description': row['description'],
+        'created_at': row['created_at'].isoformat(),
+    }
@@ -1,24 +1,158 @@
-from django.http import JsonResponse
+import asyncio
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
+from django.utils.cache import patch_vary_headers
+from django_ratelimit.decorators import ratelimit
+from .access import get_membership, get_user_group_ids
+from .activity import (
+    get_activity_page, serialize_activity, parse_cursor, FEED_PAGE_SIZE, FEED_MAX_PAGE_SIZE
+)
+from .live import broadcaster, format_sse, get_event_backend, read_events_token
+from .models import Membership
+from .search import search_users
+
+
+USER_SEARCH_RATE = getattr(settings, 'USER_SEARCH_RATE', '60/m')
+SSE_HEARTBEAT_INTERVAL = getattr(settings, 'GROUP_EVENTS_HEARTBEAT', 15)
+# Origine des pages du site, autorisée à lire le flux servi depuis GROUP_EVENTS_URL
+_site = urlsplit(getattr(settings, 'SITE_URL', ''))
+SITE_ORIGIN = f'{_site.scheme}://{_site.netloc}' if _site.netloc else ''
 
 
 @login_required
+@ratelimit(key='user', rate=USER_SEARCH_RATE, method='GET', block=False)
 def search_users_api(request):
     """
-    API pour rechercher des utilisateurs par nom d'utilisateur.
-    Retourne une liste d'utilisateurs correspondant à la recherche.
+    API pour rechercher des utilisateurs à inviter (autocomplétion).
+    Retourne une liste d'utilisateurs classés par pertinence (voir groups/search.py).
+    Rate limited par utilisateur (USER_SEARCH_RATE, 60/min par défaut).
     """
+    if getattr(request, 'limited', False):
+        return JsonResponse({'error': 'Trop de recherches, veuillez patienter.'}, status=429)
+
     query = request.GET.get('q', '').strip()
+    users = search_users(request.user, query, group_ids=get_user_group_ids(request))
+    return JsonResponse(users, safe=False)
+
+
+@login_required
+def group_activity_api(request, group_pk):
+    """
+    API du fil d'activité d'un groupe (pagination par curseur).
+    
+    Paramètres GET :
+    - before : curseur pour charger les activités plus anciennes
+    - since : curseur pour ne récupérer que les nouvelles activités (polling)
+    - limit : nombre d'activités (max 50)
     
-    if len(query) < 2:
-        return JsonResponse([], safe=False)
+    L'adhésion est vérifiée via la carte en cache : un polling ne coûte
+    qu'une requête SQL (le fil lui-même).
+    """
+    if get_membership(request, group_pk) is None:
+        return JsonResponse({'error': 'Vous n\'êtes pas membre de ce groupe.'}, status=403)
     
-    # Rechercher les utilisateurs dont le username contient la requête
-    users = User.objects.filter(
-        username__icontains=query
-    ).exclude(
-        id=request.user.id  # Exclure l'utilisateur actuel
-    ).values('username', 'first_name', 'last_name')[:10]
+    limit = parse_cursor(request.GET.get('limit')) or FEED_PAGE_SIZE
+    page = get_activity_page(
+        group_pk,
+        before=parse_cursor(request.GET.get('before')),
+        since=parse_cursor(request.GET.get('since')),
+        limit=limit
+    )
+    page['activities'] = [serialize_activity(row) for row in page['activities']]
     
-    return JsonResponse(list(users), safe=False)
+    return JsonResponse(page)
+
+
+def _stream_user_id(request, group_pk):
+    """Utilisateur du flux : jeton signé (processus d'événements distinct) ou session."""
+    token = request.GET.get('token')
+    if token:
+        return read_events_token(token, group_pk)
+    return request.user.pk if request.user.is_authenticated else None
+
+
+def _is_stream_member(user_id, group_pk):
+    return Membership.objects.filter(user_id=user_id, group_id=group_pk).exists()
+
+
+def _allow_web_origin(request, response):
+    # Flux servi depuis une autre origine (GROUP_EVENTS_URL) : la page du site y accède en CORS
+    origin = request.headers.get('Origin')
+    if origin and origin == SITE_ORIGIN:
+        response['Access-Control-Allow-Origin'] = origin
+        response['Access-Control-Allow-Headers'] = 'Last-Event-ID, Cache-Control'
+    patch_vary_headers(response, ('Origin',))
+    return response
+
+
+async def group_events_api(request, group_pk):
+    """
+    Flux Server-Sent Events d'un groupe (activités et progression des objectifs).
+
+    Vue asynchrone : chaque connexion ouverte ne mobilise qu'une file asyncio,
+    pas un thread. Servie par le processus ASGI dédié (monnkap/asgi_events.py) ;
+    sous WSGI (processus web), elle répond 404 sans ouvrir de flux et le client
+    se rabat sur le polling de l'API d'activité.
+
+    Reprise : l'en-tête Last-Event-ID (ou le paramètre `since`) renvoie les
+    activités manquées depuis ce curseur avant de passer au direct.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Un flux bloquerait un thread du serveur WSGI pour toute sa durée
+        return JsonResponse({'error': 'Flux en direct indisponible sur ce serveur'}, status=404)
+    if request.method == 'OPTIONS':
+        return _allow_web_origin(request, HttpResponse(status=204))
+
+    user_id = await sync_to_async(_stream_user_id)(request, group_pk)
+    if user_id is None:
+        return _allow_web_origin(request, JsonResponse({'error': 'Authentification requise'}, status=401))
+
+    if not await sync_to_async(_is_stream_member)(user_id, group_pk):
+        return _allow_web_origin(request, JsonResponse({'error': 'Accès refusé'}, status=403))
+
+    since = parse_cursor(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+    await sync_to_async(get_event_backend().ensure_listening)()
+
+    async def event_stream():
+        # Abonnement avant la reprise : aucun événement ne peut être manqué
+        # entre les deux (les doublons éventuels sont ignorés par le client)
+        subscriber = broadcaster.subscribe(group_pk)
+        queue = subscriber[1]
+        try:
+            yield 'retry: 5000\n\n'
+            if since is not None:
+                page = await sync_to_async(get_activity_page)(
+                    group_pk, since=since, limit=FEED_MAX_PAGE_SIZE
+                )
+                for row in reversed(page['activities']):
+                    yield format_sse({
+                        'id': row['id'],
+                        'kind': 'activity',
+                        'data': serialize_activity(row),
+                    })
+                if page['has_more']:
+                    # Trop d'activités manquées : le client recharge le fil
+                    yield format_sse({'kind': 'resync', 'data': {}})
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Battement de cœur : maintient la connexion et revérifie l'adhésion
+                    if not await sync_to_async(_is_stream_member)(user_id, group_pk):
+                        return
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(group_pk, subscriber)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return _allow_web_origin(request, response)
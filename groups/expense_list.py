@@ -0,0 +1,129 @@
+"""
+Liste des dépenses d'un groupe.
+
+Chaque page est construite par une seule requête annotée : les chiffres par
+dépense (part par membre, montant non remboursé, nombre de partages non
+remboursés, statut du partage de l'utilisateur) sont calculés par des
+sous-requêtes corrélées sur les seules lignes de la page. La pagination se
+fait par curseur (date, id) : le coût d'une page ne dépend pas du nombre
+de dépenses du groupe.
+"""
+from datetime import date as date_type
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from .models import GroupExpense, GroupExpenseSplit
+
+
+EXPENSES_PAGE_SIZE = 20
+
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def parse_expense_cursor(value):
+    """Convertit un curseur 'AAAA-MM-JJ:id' (None si absent ou invalide)."""
+    try:
+        day, pk = (value or '').split(':')
+        return date_type.fromisoformat(day), int(pk)
+    except ValueError:
+        return None
+
+
+def parse_filter_id(value):
+    """Convertit un identifiant de filtre reçu en GET (None si absent ou invalide)."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _expense_cursor(expense):
+    return f'{expense.date.isoformat()}:{expense.pk}'
+
+
+def _split_subquery(queryset, expression):
+    """Agrégat sur les partages d'une dépense, évalué ligne par ligne."""
+    return Subquery(
+        queryset.filter(expense=OuterRef('pk')).order_by().values('expense').annotate(
+            value=expression
+        ).values('value')[:1]
+    )
+
+
+def annotate_expense_figures(queryset, viewer, member_count):
+    """
+    Ajoute aux dépenses les chiffres affichés dans la liste.
+
+    Annotations :
+    - member_share : part de l'utilisateur (son partage, sinon montant / membres)
+    - unpaid_amount : montant non encore remboursé
+    - unpaid_split_count : nombre de partages non remboursés
+    - viewer_split_id, viewer_split_paid : partage de l'utilisateur (None si aucun)
+    """
+    splits = GroupExpenseSplit.objects.all()
+    viewer_splits = GroupExpenseSplit.objects.filter(expense=OuterRef('pk'), user=viewer)
+    default_share = ExpressionWrapper(
+        F('amount') / Value(Decimal(member_count or 1)), output_field=_MONEY
+    )
+
+    return queryset.annotate(
+        paid_total=Coalesce(
+            _split_subquery(splits.filter(is_paid=True), Sum('amount')),
+            Value(Decimal('0.00')),
+            output_field=_MONEY
+        ),
+        unpaid_split_count=Coalesce(
+            _split_subquery(splits.filter(is_paid=False), Count('pk')),
+            Value(0)
+        ),
+        viewer_split_id=Subquery(viewer_splits.values('pk')[:1]),
+        viewer_split_paid=Subquery(viewer_splits.values('is_paid')[:1]),
+        viewer_split_amount=Subquery(viewer_splits.values('amount')[:1]),
+    ).annotate(
+        unpaid_amount=ExpressionWrapper(F('amount') - F('paid_total'), output_field=_MONEY),
+        member_share=Case(
+            When(viewer_split_amount__isnull=False, then=F('viewer_split_amount')),
+            default=default_share,
+            output_field=_MONEY
+        ),
+    )
+
+
+def get_expense_page(group, viewer, member_count, after=None, category_id=None,
+                     payer_id=None, limit=EXPENSES_PAGE_SIZE):
+    """
+    Retourne une page de dépenses annotées, les plus récentes d'abord.
+
+    Args:
+        group: Groupe concerné
+        viewer: Utilisateur connecté (pour sa part et son statut)
+        member_count: Nombre de membres du groupe
+        after: Curseur (date, id) de la dernière dépense de la page précédente
+        category_id: Filtre par catégorie
+        payer_id: Filtre par payeur
+
+    Returns:
+        dict avec 'expenses' et 'next_cursor' (None sur la dernière page)
+    """
+    queryset = GroupExpense.objects.filter(group=group).select_related('paid_by', 'category')
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    if payer_id:
+        queryset = queryset.filter(paid_by_id=payer_id)
+    if after is not None:
+        after_date, after_pk = after
+        queryset = queryset.filter(Q(date__lt=after_date) | Q(date=after_date, pk__lt=after_pk))
+
+    queryset = annotate_expense_figures(queryset, viewer, member_count).order_by('-date', '-pk')
+    expenses = list(queryset[:limit + 1])
+    has_more = len(expenses) > limit
+    expenses = expenses[:limit]
+
+    return {
+        'expenses': expenses,
+        'next_cursor': _expense_cursor(expenses[-1]) if has_more else None,
+    }
@@ -0,0 +1,235 @@
+"""
+Événements en direct des groupes (Server-Sent Events).
+
+Les écritures (activités, progression des objectifs) publient de petits
+événements JSON vers le backend configuré par `GROUP_EVENTS_BACKEND` :
+
+- LocalEventBackend : diffusion en mémoire dans le processus courant
+  (développement, tests, déploiement à un seul worker) ;
+- PostgresEventBackend : diffusion entre workers via LISTEN/NOTIFY de
+  PostgreSQL, sans infrastructure supplémentaire.
+
+Dans chaque processus, un `Broadcaster` distribue les événements reçus aux
+connexions SSE ouvertes (une file asyncio par connexion).
+
+Le flux est servi par un processus ASGI dédié (`events` du Procfile,
+monnkap/asgi_events.py) ; le site reste servi en WSGI. Si ce processus a
+sa propre adresse (GROUP_EVENTS_URL), la page passe un jeton signé dans
+l'URL du flux : le cookie de session n'est pas envoyé à une autre origine.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+GROUP_EVENTS_URL = getattr(settings, 'GROUP_EVENTS_URL', '').rstrip('/')
+GROUP_EVENTS_TOKEN_MAX_AGE = getattr(settings, 'GROUP_EVENTS_TOKEN_MAX_AGE', 24 * 3600)
+_TOKEN_SALT = 'groups.live.events'
+
+
+class Broadcaster:
+    """
+    Distribution en mémoire des événements aux abonnés d'un processus.
+    `deliver` peut être appelé depuis n'importe quel thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, group_id):
+        """Enregistre un abonné (à appeler depuis la boucle asyncio de la connexion)."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(group_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, group_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(group_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[group_id]
+
+    def subscriber_count(self, group_id=None):
+        with self._lock:
+            if group_id is None:
+                return sum(len(subscribers) for subscribers in self._subscribers.values())
+            return len(self._subscribers.get(group_id, ()))
+
+    def deliver(self, group_id, event):
+        """Transmet un événement à tous les abonnés du groupe dans ce processus."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(group_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Boucle fermée : la connexion est en cours de fermeture
+                pass
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            # Client trop lent : on abandonne l'événement le plus ancien,
+            # il pourra resynchroniser via Last-Event-ID
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+broadcaster = Broadcaster()
+
+
+class LocalEventBackend:
+    """
+    Backend en mémoire : les événements ne quittent pas le processus.
+    Suffisant avec un seul worker et utilisé comme substitut en local.
+    """
+
+    def publish(self, group_id, event):
+        broadcaster.deliver(group_id, event)
+
+    def ensure_listening(self):
+        pass
+
+
+class PostgresEventBackend:
+    """
+    Backend inter-workers basé sur LISTEN/NOTIFY de PostgreSQL.
+
+    La publication passe par pg_notify sur la connexion Django ; chaque
+    processus ouvre une connexion dédiée à l'écoute dans un thread démon
+    et relaie les notifications au Broadcaster local.
+    """
+    channel = 'monnkap_group_events'
+
+    def __init__(self):
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, group_id, event):
+        payload = json.dumps({'group_id': group_id, 'event': event})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='group-events-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        params = connection.get_connection_params()
+        listen_connection = psycopg2.connect(**params)
+        listen_connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with listen_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.channel}')
+        logger.info("Écoute des événements de groupe via PostgreSQL")
+
+        try:
+            while True:
+                if select.select([listen_connection], [], [], 30) == ([], [], []):
+                    continue
+                listen_connection.poll()
+                while listen_connection.notifies:
+                    notify = listen_connection.notifies.pop(0)
+                    try:
+                        message = json.loads(notify.payload)
+                        broadcaster.deliver(message['group_id'], message['event'])
+                    except (ValueError, KeyError):
+                        logger.warning(f"Notification de groupe invalide: {notify.payload[:200]}")
+        except Exception as e:
+            logger.error(f"Arrêt de l'écoute des événements de groupe: {e}", exc_info=True)
+        finally:
+            listen_connection.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_event_backend():
+    """Retourne le backend d'événements configuré (instancié une fois par processus)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_path = getattr(
+                    settings, 'GROUP_EVENTS_BACKEND', 'groups.live.LocalEventBackend'
+                )
+                _backend = import_string(backend_path)()
+    return _backend
+
+
+def publish_group_event(group_id, kind, data, event_id=None):
+    """
+    Publie un événement de groupe après la validation de la transaction en cours.
+
+    Args:
+        group_id: Identifiant du groupe
+        kind: Type d'événement SSE ('activity', 'goal_progress'...)
+        data: Données JSON-sérialisables
+        event_id: Identifiant SSE (curseur d'activité) pour la reprise via Last-Event-ID
+    """
+    event = {'kind': kind, 'data': data, 'id': event_id}
+
+    def _publish():
+        try:
+            get_event_backend().publish(group_id, event)
+        except Exception as e:
+            logger.error(f"Erreur publication événement de groupe: {e}", exc_info=True)
+
+    transaction.on_commit(_publish)
+
+
+def format_sse(event):
+    """Formate un événement au format text/event-stream."""
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['kind']}")
+    lines.append(f"data: {json.dumps(event['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+# ==================== URL DU FLUX ====================
+
+def group_events_url(user_id, group_id):
+    """
+    URL du flux SSE d'un groupe pour la page d'un membre : chemin relatif, ou
+    adresse du processus d'événements avec un jeton signé si GROUP_EVENTS_URL.
+    """
+    path = reverse('groups:api_events', args=[group_id])
+    if not GROUP_EVENTS_URL:
+        return path
+    token = signing.dumps([user_id, group_id], salt=_TOKEN_SALT, compress=True)
+    return f'{GROUP_EVENTS_URL}{path}?{urlencode({"token": token})}'
+
+
+def read_events_token(token, group_id):
+    """Identifiant de l'utilisateur du jeton, ou None (invalide, expiré, autre groupe)."""
+    try:
+        user_id, token_group_id = signing.loads(token, salt=_TOKEN_SALT, max_age=GROUP_EVENTS_TOKEN_MAX_AGE)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return user_id if token_group_id == group_id else None
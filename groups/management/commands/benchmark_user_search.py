@@ -0,0 +1,180 @@
+"""
+Commande pour mesurer la latence de la recherche d'utilisateurs
+(autocomplétion des invitations) sur un grand volume d'utilisateurs.
+
+Exemple : python manage.py benchmark_user_search --users 1000000
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from groups.models import UserSearchIndex
+from groups.search import normalize_search_text, search_users
+
+
+BENCH_PREFIX = 'bench_'
+
+FIRST_NAMES = [
+    'Aïcha', 'Alain', 'Amandine', 'Arnaud', 'Blaise', 'Brigitte', 'Carine', 'Christian',
+    'Daniel', 'Élodie', 'Emmanuel', 'Estelle', 'Fabrice', 'Florence', 'Georges', 'Hervé',
+    'Irène', 'Jacques', 'Joëlle', 'Junior', 'Léa', 'Marcel', 'Mireille', 'Nadège',
+    'Olivier', 'Pascal', 'Patricia', 'Rodrigue', 'Sandrine', 'Serge', 'Thérèse', 'Yannick',
+]
+LAST_NAMES = [
+    'Abena', 'Atangana', 'Biya', 'Eto', 'Fotso', 'Kamga', 'Kengne', 'Mbarga', 'Mballa',
+    'Mbappé', 'Ndongo', 'Ngono', 'Njoya', 'Nkoulou', 'Onana', 'Owona', 'Tchami', 'Tchoupo',
+]
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Mesure la latence de la recherche d\'utilisateurs (génère des utilisateurs fictifs si besoin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000000,
+            help='Nombre d\'utilisateurs fictifs à atteindre (défaut: 1 000 000)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Nombre de recherches mesurées par scénario',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Taille des lots d\'insertion',
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Ne pas mesurer l\'ancienne recherche (username__icontains)',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Supprimer les utilisateurs fictifs puis quitter',
+        )
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self._cleanup(options['batch_size'])
+            return
+
+        rng = random.Random(42)
+        self._seed(options['users'], options['batch_size'], rng)
+
+        searcher = User(pk=0)
+        queries = self._sample_queries(options['queries'], rng)
+
+        self.stdout.write(f'\n⏱️  {len(queries)} recherches par scénario\n')
+        if not options['skip_legacy']:
+            self._report('Ancienne recherche (icontains)', queries, lambda q: list(
+                User.objects.filter(username__icontains=q).values(
+                    'username', 'first_name', 'last_name'
+                )[:10]
+            ))
+
+        def cold(query):
+            cache.clear()
+            return search_users(searcher, query)
+        self._report('Index, cache vide', queries, cold)
+
+        # Frappe progressive : chaque caractère réutilise les préfixes en cache
+        typed = []
+        for query in queries:
+            typed.extend(query[:length] for length in range(2, len(query) + 1))
+        cache.clear()
+        self._report('Index, frappe progressive (cache)', typed, lambda q: search_users(searcher, q))
+
+    def _seed(self, target, batch_size, rng):
+        existing = User.objects.filter(username__startswith=BENCH_PREFIX).count()
+        missing = target - existing
+        if missing <= 0:
+            self.stdout.write(f'✅ {existing} utilisateurs fictifs déjà présents')
+            return
+
+        self.stdout.write(f'🔧 Création de {missing} utilisateurs fictifs...')
+        created = 0
+        while created < missing:
+            size = min(batch_size, missing - created)
+            users = []
+            for offset in range(size):
+                number = existing + created + offset
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                users.append(User(
+                    username=f'{BENCH_PREFIX}{normalize_search_text(first_name)}{number}',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password='!',
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=batch_size)
+                usernames = [user.username for user in users]
+                UserSearchIndex.objects.bulk_create([
+                    UserSearchIndex(
+                        user_id=pk,
+                        username=normalize_search_text(username),
+                        first_name=normalize_search_text(first_name),
+                        last_name=normalize_search_text(last_name),
+                    )
+                    for pk, username, first_name, last_name in User.objects.filter(
+                        username__in=usernames
+                    ).values_list('pk', 'username', 'first_name', 'last_name')
+                ], batch_size=batch_size)
+            created += size
+            self.stdout.write(f'  → {existing + created}/{target}')
+
+    def _sample_queries(self, count, rng):
+        queries = []
+        for _ in range(count):
+            kind = rng.random()
+            if kind < 0.4:
+                queries.append(normalize_search_text(rng.choice(FIRST_NAMES))[:rng.randint(2, 5)])
+            elif kind < 0.7:
+                queries.append(normalize_search_text(rng.choice(LAST_NAMES))[:rng.randint(2, 6)])
+            elif kind < 0.9:
+                queries.append(BENCH_PREFIX + normalize_search_text(rng.choice(FIRST_NAMES))[:2])
+            else:
+                # Sous-chaîne au milieu d'un nom
+                name = normalize_search_text(rng.choice(LAST_NAMES))
+                queries.append(name[1:4])
+        return queries
+
+    def _report(self, label, queries, run):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f'  {label}: p50 {statistics.median(timings):.2f} ms | '
+            f'p95 {_percentile(timings, 95):.2f} ms | max {max(timings):.2f} ms'
+        )
+
+    def _cleanup(self, batch_size):
+        total = 0
+        while True:
+            ids = list(User.objects.filter(
+                username__startswith=BENCH_PREFIX
+            ).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            User.objects.filter(pk__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} utilisateur(s) fictif(s) supprimé(s)'))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('groups', '0009_alter_group_current_amount_alter_group_deadline_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contribution', 'Contribution'), ('expense', 'Dépense partagée'), ('split_paid', 'Remboursement'), ('savings_contribution', "Contribution d'épargne"), ('member_joined', 'Nouveau membre'), ('member_left', "Départ d'un membre")], max_length=30, verbose_name='Type')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Montant')),
+                ('description', models.CharField(blank=True, default='', max_length=255, verbose_name='Description')),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name="Identifiant de l'élément")),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='group_activities', to=settings.AUTH_USER_MODEL, verbose_name='Auteur')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='groups.group', verbose_name='Groupe')),
+            ],
+            options={
+                'verbose_name': 'Activité de groupe',
+                'verbose_name_plural': 'Activités de groupe',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['group', '-id'], name='groups_activity_feed_idx')],
+            },
+        ),
+    ]
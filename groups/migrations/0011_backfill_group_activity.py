@@ -0,0 +1,102 @@
+# Generated manually on 2026-10-19
+"""
+Migration de données : alimenter GroupActivity avec l'historique existant
+(contributions, dépenses, remboursements, épargne et adhésions).
+"""
+
+from django.db import migrations
+
+
+def backfill_group_activity(apps, schema_editor):
+    """
+    Créer une activité pour chaque élément existant, dans l'ordre chronologique,
+    afin que la pagination par identifiant suive l'ordre des événements.
+    """
+    GroupActivity = apps.get_model('groups', 'GroupActivity')
+    GroupContribution = apps.get_model('groups', 'GroupContribution')
+    GroupExpense = apps.get_model('groups', 'GroupExpense')
+    GroupExpenseSplit = apps.get_model('groups', 'GroupExpenseSplit')
+    GroupSavingsContribution = apps.get_model('groups', 'GroupSavingsContribution')
+    Membership = apps.get_model('groups', 'Membership')
+
+    activities = []
+    for contribution in GroupContribution.objects.select_related('goal').iterator():
+        activities.append(GroupActivity(
+            group_id=contribution.group_id,
+            actor_id=contribution.user_id,
+            kind='contribution',
+            amount=contribution.amount,
+            description=contribution.goal.title if contribution.goal_id else '',
+            object_id=contribution.pk,
+            created_at=contribution.created_at,
+        ))
+    for expense in GroupExpense.objects.iterator():
+        activities.append(GroupActivity(
+            group_id=expense.group_id,
+            actor_id=expense.paid_by_id,
+            kind='expense',
+            amount=expense.amount,
+            description=expense.description,
+            object_id=expense.pk,
+            created_at=expense.created_at,
+        ))
+    paid_splits = GroupExpenseSplit.objects.filter(
+        is_paid=True, paid_at__isnull=False
+    ).select_related('expense')
+    for split in paid_splits.iterator():
+        activities.append(GroupActivity(
+            group_id=split.expense.group_id,
+            actor_id=split.user_id,
+            kind='split_paid',
+            amount=split.amount,
+            description=split.expense.description,
+            object_id=split.pk,
+            created_at=split.paid_at,
+        ))
+    savings_contributions = GroupSavingsContribution.objects.select_related('savings_goal')
+    for contribution in savings_contributions.iterator():
+        activities.append(GroupActivity(
+            group_id=contribution.savings_goal.group_id,
+            actor_id=contribution.user_id,
+            kind='savings_contribution',
+            amount=contribution.amount,
+            description=contribution.savings_goal.title,
+            object_id=contribution.pk,
+            created_at=contribution.created_at,
+        ))
+    for membership in Membership.objects.iterator():
+        activities.append(GroupActivity(
+            group_id=membership.group_id,
+            actor_id=membership.user_id,
+            kind='member_joined',
+            object_id=membership.pk,
+            created_at=membership.joined_at,
+        ))
+
+    activities.sort(key=lambda activity: activity.created_at)
+    GroupActivity.objects.bulk_create(activities, batch_size=500)
+
+    if activities:
+        print(f"✅ {len(activities)} activités de groupe importées")
+
+
+def reverse_migration(apps, schema_editor):
+    """
+    Vider le journal d'activité.
+    """
+    GroupActivity = apps.get_model('groups', 'GroupActivity')
+    GroupActivity.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0010_groupactivity'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_group_activity,
+            reverse_code=reverse_migration
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('groups', '0011_backfill_group_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchIndex',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('username', models.CharField(db_index=True, max_length=150, verbose_name="Nom d'utilisateur normalisé")),
+                ('first_name', models.CharField(blank=True, db_index=True, max_length=150, verbose_name='Prénom normalisé')),
+                ('last_name', models.CharField(blank=True, db_index=True, max_length=150, verbose_name='Nom normalisé')),
+            ],
+            options={
+                'verbose_name': 'Index de recherche utilisateur',
+                'verbose_name_plural': 'Index de recherche utilisateurs',
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated manually on 2026-10-19
+"""
+Migration de données : alimenter UserSearchIndex avec les utilisateurs existants
+et, sous PostgreSQL, créer les index trigrammes pour la recherche par sous-chaîne.
+"""
+
+import unicodedata
+
+from django.db import DatabaseError, migrations, transaction
+
+
+TRIGRAM_INDEXES = (
+    ('groups_usersearch_username_trgm', 'username'),
+    ('groups_usersearch_first_name_trgm', 'first_name'),
+    ('groups_usersearch_last_name_trgm', 'last_name'),
+)
+
+
+def normalize(value):
+    """Même normalisation que groups.search.normalize_search_text."""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in value if not unicodedata.combining(c)).casefold().strip()
+
+
+def backfill_user_search_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserSearchIndex = apps.get_model('groups', 'UserSearchIndex')
+
+    entries = []
+    created = 0
+    for user_id, username, first_name, last_name in User.objects.values_list(
+        'pk', 'username', 'first_name', 'last_name'
+    ).iterator():
+        entries.append(UserSearchIndex(
+            user_id=user_id,
+            username=normalize(username),
+            first_name=normalize(first_name),
+            last_name=normalize(last_name),
+        ))
+        if len(entries) >= 1000:
+            UserSearchIndex.objects.bulk_create(entries, ignore_conflicts=True)
+            created += len(entries)
+            entries = []
+    UserSearchIndex.objects.bulk_create(entries, ignore_conflicts=True)
+    created += len(entries)
+
+    if created:
+        print(f"\n✅ {created} utilisateur(s) indexé(s) pour la recherche")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Index GIN trigrammes (PostgreSQL uniquement) ; SQLite se contente des index par préfixe."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        print(f"\n⚠️ Extension pg_trgm indisponible, recherche par préfixe uniquement: {e}")
+        return
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON groups_usersearchindex '
+            f'USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0012_usersearchindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_search_index, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0013_backfill_user_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupexpense',
+            index=models.Index(fields=['group', '-date', '-id'], name='groups_expense_list_idx'),
+        ),
+    ]
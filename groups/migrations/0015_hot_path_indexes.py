@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('groups', '0014_groupexpense_list_index'),
+    ]
+
+    operations = [
+        # Index composites créés avant de supprimer les index des clés
+        # étrangères qu'ils remplacent
+        migrations.AddIndex(
+            model_name='groupcontribution',
+            index=models.Index(fields=['group', 'user'], name='groups_contrib_member_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupcontribution',
+            index=models.Index(fields=['user', '-date'], name='groups_contrib_user_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='groupcontribution',
+            name='group',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='groups.group', verbose_name='Groupe'),
+        ),
+        migrations.AlterField(
+            model_name='groupcontribution',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='group_contributions', to=settings.AUTH_USER_MODEL, verbose_name='Contributeur'),
+        ),
+    ]
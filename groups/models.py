@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from decimal import Decimal
 import secrets
 import string
@@ -167,7 +169,9 @@ class GroupContribution(models.Model):
         Group,
         on_delete=models.CASCADE,
         related_name='contributions',
-        verbose_name='Groupe'
+        verbose_name='Groupe',
+        # Index couvert par groups_contrib_member_idx (voir Meta.indexes)
+        db_index=False,
     )
     goal = models.ForeignKey(
         'GroupGoal',
@@ -182,7 +186,9 @@ class GroupContribution(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='group_contributions',
-        verbose_name='Contributeur'
+        verbose_name='Contributeur',
+        # Index couvert par groups_contrib_user_date_idx (voir Meta.indexes)
+        db_index=False,
     )
     amount = models.DecimalField(
         max_digits=10,
@@ -209,6 +215,12 @@ class GroupContribution(models.Model):
         verbose_name = 'Contribution de groupe'
         verbose_name_plural = 'Contributions de groupe'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Contributions d'un groupe, par membre (page du groupe, statistiques)
+            models.Index(fields=['group', 'user'], name='groups_contrib_member_idx'),
+            # Contributions d'un utilisateur par période (tableau de bord, rapports)
+            models.Index(fields=['user', '-date'], name='groups_contrib_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.amount} FCFA pour {self.group.name}"
@@ -419,6 +431,9 @@ class GroupExpense(models.Model):
         verbose_name = 'Dépense de groupe'
         verbose_name_plural = 'Dépenses de groupe'
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['group', '-date', '-id'], name='groups_expense_list_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.amount} FCFA ({self.group.name})"
@@ -639,3 +654,318 @@ class GroupSavingsContribution(models.Model):
         super().save(*args, **kwargs)
         if is_new:
             self.savings_goal.add_contribution(self.amount)
+
+
+
+class GroupActivity(models.Model):
+    """
+    Journal d'activité d'un groupe (table en ajout seul).
+    Alimenté par les signaux ci-dessous ; le fil d'activité est paginé
+    par identifiant croissant (voir groups/activity.py).
+    """
+    KIND_CHOICES = [
+        ('contribution', 'Contribution'),
+        ('expense', 'Dépense partagée'),
+        ('split_paid', 'Remboursement'),
+        ('savings_contribution', 'Contribution d\'épargne'),
+        ('member_joined', 'Nouveau membre'),
+        ('member_left', 'Départ d\'un membre'),
+    ]
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='activities',
+        verbose_name='Groupe'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='group_activities',
+        verbose_name='Auteur'
+    )
+    kind = models.CharField(
+        max_length=30,
+        choices=KIND_CHOICES,
+        verbose_name='Type'
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name='Montant'
+    )
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        verbose_name='Description'
+    )
+    object_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Identifiant de l\'élément'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Date'
+    )
+
+    class Meta:
+        verbose_name = 'Activité de groupe'
+        verbose_name_plural = 'Activités de groupe'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['group', '-id'], name='groups_activity_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.group_id}"
+
+
+class UserSearchIndex(models.Model):
+    """
+    Index de recherche des utilisateurs (invitation de membres).
+    Copie normalisée (minuscules, sans accents) du nom d'utilisateur et des
+    noms, indexée pour les recherches par préfixe ; sous PostgreSQL, des
+    index trigrammes couvrent aussi les recherches par sous-chaîne.
+    Maintenu par le signal post_save de User (voir groups/search.py).
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_index',
+        verbose_name='Utilisateur'
+    )
+    username = models.CharField(
+        max_length=150,
+        db_index=True,
+        verbose_name='Nom d\'utilisateur normalisé'
+    )
+    first_name = models.CharField(
+        max_length=150,
+        blank=True,
+        db_index=True,
+        verbose_name='Prénom normalisé'
+    )
+    last_name = models.CharField(
+        max_length=150,
+        blank=True,
+        db_index=True,
+        verbose_name='Nom normalisé'
+    )
+
+    class Meta:
+        verbose_name = 'Index de recherche utilisateur'
+        verbose_name_plural = 'Index de recherche utilisateurs'
+
+    def __str__(self):
+        return self.username
+
+
+# Signaux pour invalider le cache des adhésions (voir groups/access.py)
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_membership_cache_on_change(sender, instance, **kwargs):
+    """Invalide la carte d'adhésions en cache de l'utilisateur concerné."""
+    from .access import invalidate_membership_cache
+    invalidate_membership_cache(instance.user_id)
+
+
+
+# Signaux pour alimenter le journal d'activité des groupes
+@receiver(post_save, sender=GroupContribution)
+def record_contribution_activity(sender, instance, created, **kwargs):
+    """Journalise une nouvelle contribution au groupe."""
+    if created:
+        GroupActivity.objects.create(
+            group_id=instance.group_id,
+            actor=instance.user,
+            kind='contribution',
+            amount=instance.amount,
+            description=instance.goal.title if instance.goal_id else '',
+            object_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=GroupExpense)
+def record_expense_activity(sender, instance, created, **kwargs):
+    """Journalise une nouvelle dépense partagée."""
+    if created:
+        GroupActivity.objects.create(
+            group_id=instance.group_id,
+            actor=instance.paid_by,
+            kind='expense',
+            amount=instance.amount,
+            description=instance.description,
+            object_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=GroupExpenseSplit)
+def record_split_paid_activity(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Journalise le remboursement d'une part.
+    Seules les sauvegardes qui passent explicitement `is_paid` dans
+    update_fields sont des remboursements (voir mark_split_paid_view).
+    """
+    if created or not instance.is_paid or not update_fields or 'is_paid' not in update_fields:
+        return
+    expense = instance.expense
+    GroupActivity.objects.create(
+        group_id=expense.group_id,
+        actor=instance.user,
+        kind='split_paid',
+        amount=instance.amount,
+        description=expense.description,
+        object_id=instance.pk
+    )
+
+
+@receiver(post_save, sender=GroupSavingsContribution)
+def record_savings_contribution_activity(sender, instance, created, **kwargs):
+    """Journalise une contribution à un objectif d'épargne de groupe."""
+    if created:
+        savings_goal = instance.savings_goal
+        GroupActivity.objects.create(
+            group_id=savings_goal.group_id,
+            actor=instance.user,
+            kind='savings_contribution',
+            amount=instance.amount,
+            description=savings_goal.title,
+            object_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=Membership)
+def record_member_joined_activity(sender, instance, created, **kwargs):
+    """Journalise l'arrivée d'un membre."""
+    if created:
+        GroupActivity.objects.create(
+            group_id=instance.group_id,
+            actor=instance.user,
+            kind='member_joined',
+            object_id=instance.pk
+        )
+
+
+@receiver(post_delete, sender=Membership)
+def record_member_left_activity(sender, instance, origin=None, **kwargs):
+    """
+    Journalise le départ d'un membre.
+    Ignoré lors des suppressions en cascade (groupe ou utilisateur supprimé).
+    """
+    if isinstance(origin, Membership):
+        GroupActivity.objects.create(
+            group_id=instance.group_id,
+            actor=instance.user,
+            kind='member_left',
+            object_id=instance.pk
+        )
+
+
+
+# Signal pour maintenir l'index de recherche des utilisateurs (voir groups/search.py)
+@receiver(post_save, sender=User)
+def update_user_search_index(sender, instance, update_fields=None, **kwargs):
+    """Met à jour l'index de recherche quand le nom d'utilisateur ou les noms changent."""
+    from .search import SEARCH_FIELDS, index_user
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        # Ex. mise à jour de last_login à la connexion : rien à réindexer
+        return
+    # Valeurs enregistrées, lues avant la sauvegarde (accounts.models.snapshot_user_display_fields)
+    saved = getattr(instance, '_saved_display_fields', None)
+    if saved is not None and all(saved[field] == getattr(instance, field) for field in SEARCH_FIELDS):
+        # Profil enregistré sans changement de nom : pas d'écriture
+        return
+    index_user(instance)
+
+
+# Signaux pour les événements en direct (voir groups/live.py)
+@receiver(post_save, sender=GroupActivity)
+def publish_activity_event(sender, instance, created, **kwargs):
+    """Diffuse chaque nouvelle activité aux membres connectés."""
+    if created:
+        from .activity import activity_to_row, serialize_activity
+        from .live import publish_group_event
+        publish_group_event(
+            instance.group_id,
+            'activity',
+            serialize_activity(activity_to_row(instance)),
+            event_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=GroupGoal)
+@receiver(post_save, sender=GroupSavingsGoal)
+def publish_goal_progress_event(sender, instance, **kwargs):
+    """Diffuse la progression d'un objectif de groupe ou d'épargne."""
+    from .live import publish_group_event
+    publish_group_event(
+        instance.group_id,
+        'goal_progress',
+        {
+            'goal_type': 'savings' if sender is GroupSavingsGoal else 'goal',
+            'goal_id': instance.pk,
+            'title': instance.title,
+            'current_amount': str(instance.current_amount),
+            'target_amount': str(instance.target_amount),
+            'percentage': float(instance.get_progress_percentage()),
+            'status': instance.status,
+        }
+    )
+
+
+# Signaux pour les requêtes conditionnelles (voir monnkap/conditional.py)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=GroupGoal)
+@receiver(post_delete, sender=GroupGoal)
+@receiver(post_save, sender=GroupSavingsGoal)
+@receiver(post_delete, sender=GroupSavingsGoal)
+def bump_group_data_version(sender, instance, **kwargs):
+    """Change la version des pages du groupe (ETag)."""
+    from monnkap.conditional import bump_group_version
+    bump_group_version(instance.pk if sender is Group else instance.group_id)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+@receiver(post_save, sender=GroupContribution)
+@receiver(post_delete, sender=GroupContribution)
+def bump_member_data_version(sender, instance, **kwargs):
+    """Change la version des pages du groupe et de celles du membre (ETag)."""
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_group_version(instance.group_id)
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=GroupExpense)
+@receiver(post_delete, sender=GroupExpense)
+def bump_group_expense_data_version(sender, instance, **kwargs):
+    """Change la version des pages du groupe et de celles du payeur (ETag)."""
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_group_version(instance.group_id)
+    bump_user_version(instance.paid_by_id)
+
+
+@receiver(post_save, sender=GroupExpenseSplit)
+@receiver(post_delete, sender=GroupExpenseSplit)
+def bump_split_data_version(sender, instance, **kwargs):
+    """Change la version des pages du groupe et de celles du débiteur (ETag)."""
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_group_version(instance.expense.group_id)
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=GroupSavingsContribution)
+@receiver(post_delete, sender=GroupSavingsContribution)
+def bump_savings_contribution_data_version(sender, instance, **kwargs):
+    """Change la version des pages du groupe et de celles du contributeur (ETag)."""
+    from monnkap.conditional import bump_group_version, bump_user_version
+    bump_group_version(instance.savings_goal.group_id)
+    bump_user_version(instance.user_id)
@@ -0,0 +1,209 @@
+"""
+Recherche d'utilisateurs pour l'invitation de membres.
+
+La recherche s'appuie sur UserSearchIndex (noms normalisés et indexés) :
+- recherche par préfixe via des intervalles sur index B-tree, efficace sur
+  tous les moteurs (y compris SQLite) ;
+- recherche par sous-chaîne à partir de 3 caractères, servie par les index
+  trigrammes sous PostgreSQL (voir la migration 0013).
+
+Les candidats (SEARCH_CANDIDATES_LIMIT au plus) sont choisis en SQL en
+plaçant d'abord les personnes qui partagent un groupe avec l'appelant
+(ORDER BY shared DESC avant le LIMIT) : elles ne sont pas évincées par des
+noms alphabétiquement antérieurs.
+
+Les candidats d'une requête sont mis en cache brièvement, par texte saisi et
+groupes de l'appelant. Quand la liste mise en cache pour un préfixe plus
+court est complète, les frappes suivantes sont filtrées en mémoire sans
+requête SQL. Le classement final (correspondance exacte, préfixe,
+sous-chaîne, groupes en commun) est appliqué en mémoire.
+"""
+import hashlib
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Exists, OuterRef, Q, Value
+
+from .models import Membership, UserSearchIndex
+
+
+SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+
+SEARCH_MIN_LENGTH = 2
+SUBSTRING_MIN_LENGTH = 3
+SEARCH_RESULTS_LIMIT = 10
+SEARCH_CANDIDATES_LIMIT = 50
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'USER_SEARCH_CACHE_TIMEOUT', 30)
+
+# Rangs de correspondance (plus petit = plus pertinent)
+MATCH_EXACT = 0
+MATCH_USERNAME_PREFIX = 1
+MATCH_NAME_PREFIX = 2
+MATCH_SUBSTRING = 3
+
+_PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def normalize_search_text(value):
+    """Minuscules et suppression des accents ('Élodie' -> 'elodie')."""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in value if not unicodedata.combining(c)).casefold().strip()
+
+
+def index_user(user):
+    """Crée ou met à jour l'entrée d'index d'un utilisateur."""
+    UserSearchIndex.objects.update_or_create(
+        user_id=user.pk,
+        defaults={field: normalize_search_text(getattr(user, field)) for field in SEARCH_FIELDS}
+    )
+
+
+def _cache_key(query, group_ids=()):
+    # Texte saisi et groupes hachés : clé valide pour tous les backends de cache
+    groups = ','.join(str(group_id) for group_id in sorted(group_ids))
+    return f'groups:user_search:{hashlib.md5(f"{groups}:{query}".encode()).hexdigest()}'
+
+
+def _prefix_filter(field, query):
+    # Intervalle [query, query + U+10FFFF) : utilisable par tout index B-tree
+    return {f'{field}__gte': query, f'{field}__lt': query + _PREFIX_UPPER_BOUND}
+
+
+def _fetch_candidates(query, group_ids=()):
+    """
+    Charge les candidats d'une requête (au plus SEARCH_CANDIDATES_LIMIT),
+    membres d'un des groupes `group_ids` d'abord.
+
+    Returns:
+        dict avec 'rows' (tuples id, username, prénom, nom, clés normalisées,
+        groupe en commun), 'complete' (toutes les correspondances sont
+        présentes) et 'substring' (les correspondances par sous-chaîne sont
+        incluses)
+    """
+    columns = (
+        'user_id', 'user__username', 'user__first_name', 'user__last_name',
+        'username', 'first_name', 'last_name', 'shared',
+    )
+    if group_ids:
+        shared = Exists(Membership.objects.filter(user_id=OuterRef('user_id'), group_id__in=group_ids))
+    else:
+        shared = Value(False, output_field=BooleanField())
+    active = UserSearchIndex.objects.filter(user__is_active=True).annotate(shared=shared)
+
+    rows = []
+    seen = set()
+    for field in SEARCH_FIELDS:
+        remaining = SEARCH_CANDIDATES_LIMIT + 1 - len(rows)
+        if remaining <= 0:
+            break
+        matches = active.filter(**_prefix_filter(field, query)).exclude(
+            user_id__in=seen
+        ).order_by('-shared', field).values_list(*columns)[:remaining]
+        for row in matches:
+            seen.add(row[0])
+            rows.append(row)
+
+    substring = len(query) >= SUBSTRING_MIN_LENGTH
+    remaining = SEARCH_CANDIDATES_LIMIT + 1 - len(rows)
+    if substring and remaining > 0:
+        contains = Q(username__contains=query) | Q(first_name__contains=query) | Q(last_name__contains=query)
+        rows.extend(
+            active.filter(contains).exclude(user_id__in=seen).order_by('-shared').values_list(
+                *columns
+            )[:remaining]
+        )
+
+    complete = len(rows) <= SEARCH_CANDIDATES_LIMIT
+    return {
+        'rows': rows[:SEARCH_CANDIDATES_LIMIT],
+        'complete': complete,
+        'substring': substring,
+    }
+
+
+def _match_rank(row, query):
+    """Rang de correspondance d'un candidat, None s'il ne correspond pas."""
+    username, first_name, last_name = row[4], row[5], row[6]
+    if username == query:
+        return MATCH_EXACT
+    if username.startswith(query):
+        return MATCH_USERNAME_PREFIX
+    if first_name.startswith(query) or last_name.startswith(query):
+        return MATCH_NAME_PREFIX
+    if len(query) >= SUBSTRING_MIN_LENGTH and (
+        query in username or query in first_name or query in last_name
+    ):
+        return MATCH_SUBSTRING
+    return None
+
+
+def get_candidates(query, group_ids=()):
+    """
+    Retourne les candidats d'une requête normalisée, depuis le cache si possible.
+    Une liste complète en cache pour un préfixe plus court est filtrée en mémoire.
+    """
+    prefixes = [query[:length] for length in range(len(query), SEARCH_MIN_LENGTH - 1, -1)]
+    cached = cache.get_many([_cache_key(prefix, group_ids) for prefix in prefixes])
+
+    entry = cached.get(_cache_key(query, group_ids))
+    if entry is not None:
+        return entry
+
+    needs_substring = len(query) >= SUBSTRING_MIN_LENGTH
+    for prefix in prefixes[1:]:
+        shorter = cached.get(_cache_key(prefix, group_ids))
+        if shorter and shorter['complete'] and (shorter['substring'] or not needs_substring):
+            entry = {
+                'rows': [row for row in shorter['rows'] if _match_rank(row, query) is not None],
+                'complete': True,
+                'substring': needs_substring,
+            }
+            break
+    else:
+        entry = _fetch_candidates(query, group_ids)
+
+    cache.set(_cache_key(query, group_ids), entry, SEARCH_CACHE_TIMEOUT)
+    return entry
+
+
+def search_users(user, query, group_ids=(), limit=SEARCH_RESULTS_LIMIT):
+    """
+    Recherche des utilisateurs à inviter.
+
+    Classement : correspondance exacte du nom d'utilisateur, préfixe du nom
+    d'utilisateur, préfixe du prénom ou du nom, puis sous-chaîne ; à rang
+    égal, les personnes partageant déjà un groupe avec l'appelant d'abord.
+
+    Args:
+        user: Utilisateur qui effectue la recherche (exclu des résultats)
+        query: Texte saisi
+        group_ids: Groupes de l'appelant (voir access.get_user_group_ids)
+        limit: Nombre maximal de résultats
+
+    Returns:
+        Liste de dicts (username, first_name, last_name, shares_group)
+    """
+    query = normalize_search_text(query)[:150]
+    if len(query) < SEARCH_MIN_LENGTH:
+        return []
+
+    ranked = []
+    for row in get_candidates(query, group_ids)['rows']:
+        if row[0] == user.pk:
+            continue
+        rank = _match_rank(row, query)
+        if rank is not None:
+            ranked.append((rank, row))
+
+    ranked.sort(key=lambda item: (item[0], not item[1][7], len(item[1][4]), item[1][4]))
+
+    return [
+        {
+            'username': row[1],
+            'first_name': row[2],
+            'last_name': row[3],
+            'shares_group': row[7],
+        }
+        for rank, row in ranked[:limit]
+    ]
@@ -1,3 +1,108 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from monnkap.cache_backend import LocalLRU
+
+from .models import Group, Membership, UserSearchIndex
+from .search import SEARCH_CANDIDATES_LIMIT, search_users
+
+
+class UserSearchSharedGroupTests(TestCase):
+    """Recherche d'utilisateurs : les membres d'un groupe commun passent avant le LIMIT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.searcher = User.objects.create_user('searcher', 'searcher@example.com', 'motdepasse-123')
+        # Plus de candidats que la limite, tous alphabétiquement avant le membre du groupe
+        for index in range(SEARCH_CANDIDATES_LIMIT + 5):
+            User.objects.create_user(f'martin{index:03d}', password='motdepasse-123')
+        cls.friend = User.objects.create_user('martinzz', password='motdepasse-123')
+        cls.group = Group.objects.create(name='Tontine', creator=cls.searcher)
+        Membership.objects.create(group=cls.group, user=cls.searcher, role='admin')
+        Membership.objects.create(group=cls.group, user=cls.friend, role='member')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_shared_group_member_beyond_alphabetical_limit(self):
+        results = search_users(self.searcher, 'martin', group_ids=[self.group.pk])
+
+        self.assertEqual(results[0]['username'], 'martinzz')
+        self.assertTrue(results[0]['shares_group'])
+        self.assertFalse(any(result['shares_group'] for result in results[1:]))
+
+    def test_candidates_are_cached_per_groups(self):
+        search_users(self.searcher, 'martin', group_ids=[self.group.pk])
+
+        results = search_users(self.searcher, 'martin')
+
+        self.assertEqual(results[0]['username'], 'martin000')
+        self.assertNotIn('martinzz', [result['username'] for result in results])
+
+    def test_shared_first_on_progressive_typing(self):
+        # 'ma' en cache, incomplet : 'mar' est rechargé, toujours membre en tête
+        search_users(self.searcher, 'ma', group_ids=[self.group.pk])
+
+        results = search_users(self.searcher, 'mar', group_ids=[self.group.pk])
+
+        self.assertEqual(results[0]['username'], 'martinzz')
+
+
+class UserSearchIndexTests(TestCase):
+    """Index de recherche maintenu par le signal post_save de User."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('elodie', password='motdepasse-123', first_name='Élodie')
+
+    def test_unchanged_names_skip_index(self):
+        self.user.email = 'elodie@example.com'
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+
+        self.assertFalse([q for q in queries if 'groups_usersearchindex' in q['sql']])
+
+    def test_renamed_user_is_reindexed(self):
+        self.user.last_name = 'Mbarga'
+        self.user.save()
+
+        index = UserSearchIndex.objects.get(user=self.user)
+        self.assertEqual((index.first_name, index.last_name), ('elodie', 'mbarga'))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'monnkap.cache_backend.TwoTierCache',
+        'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 5},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'groups-tests'},
+})
+class MembershipCacheTests(TestCase):
+    """Carte d'adhésions en cache (groups/access.py) avec le cache à deux niveaux de la production."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'motdepasse-123')
+        self.member = User.objects.create_user('member', 'member@example.com', 'motdepasse-123')
+        self.group = Group.objects.create(name='Tontine', creator=self.admin)
+        Membership.objects.create(group=self.group, user=self.admin, role='admin')
+        self.membership = Membership.objects.create(group=self.group, user=self.member, role='member')
+        caches['default'].clear()
+        self.client.force_login(self.member)
+
+    def test_removal_on_other_worker_revokes_access(self):
+        url = reverse('groups:api_activity', args=[self.group.pk])
+        # Carte d'adhésions et sa version dans le L1 de ce worker (version
+        # créée par add() en L2, recopiée en L1 à la lecture suivante)
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Autre worker : même cache partagé, L1 distinct
+        with mock.patch.object(caches['default'], 'l1', LocalLRU(100, 5)):
+            self.membership.delete()
+
+        self.assertEqual(self.client.get(url).status_code, 403)
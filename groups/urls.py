@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .api import search_users_api
+from .api import search_users_api, group_activity_api, group_events_api
 
 app_name = 'groups'
 
@@ -41,6 +41,8 @@ urlpatterns = [
 # API endpoints (à ajouter dans le futur dans une app séparée)
 api_urlpatterns = [
     path('api/search-users/', search_users_api, name='api_search_users'),
+    path('api/<int:group_pk>/activity/', group_activity_api, name='api_activity'),
+    path('api/<int:group_pk>/events/', group_events_api, name='api_events'),
 ]
 
 urlpatterns += api_urlpatterns
@@ -1,12 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Q
 from decimal import Decimal
-from .models import Group, Membership, GroupContribution, GroupExpense, GroupExpenseSplit, GroupSavingsGoal, GroupSavingsContribution
+from django.http import Http404
+from .models import Group, Membership, GroupContribution, GroupGoal, GroupExpense, GroupExpenseSplit, GroupSavingsGoal, GroupSavingsContribution
 from .forms import GroupForm, MembershipForm, GroupContributionForm, GroupExpenseForm, GroupSavingsGoalForm, GroupSavingsContributionForm
+from .access import group_access, ROLE_ADMIN
+from .activity import get_activity_page, serialize_activity
+from .live import group_events_url
+from .expense_list import get_expense_page, parse_expense_cursor, parse_filter_id
+from expenses.models import Category
+from monnkap.conditional import conditional_page
 
 
+@conditional_page(user_groups=True)
 @login_required
 def group_list_view(request):
     """
@@ -36,25 +44,18 @@ def group_help_view(request):
     return render(request, 'groups/group_help.html')
 
 
+@conditional_page(group_kwarg='pk')
 @login_required
-def group_detail_view(request, pk):
+@group_access(Group)
+def group_detail_view(request, group, membership):
     """
     Vue détaillée d'un groupe avec membres, objectifs et contributions.
     """
-    group = get_object_or_404(Group, pk=pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
     # Récupérer les membres et contributions
-    members = Membership.objects.filter(group=group).select_related('user')
+    members = Membership.objects.filter(group=group).select_related('user__profile')
     contributions = GroupContribution.objects.filter(group=group).select_related('user')
     
     # Récupérer les objectifs du groupe (nouvelle architecture)
-    from .models import GroupGoal
     goals = GroupGoal.objects.filter(group=group).select_related('created_by')
     
     # Statistiques par membre
@@ -65,13 +66,23 @@ def group_detail_view(request, pk):
         count=Count('id')
     ).order_by('-total')
     
+    # Fil d'activité (première page, la suite est chargée en JavaScript)
+    activity_page = get_activity_page(group.pk)
+    
     context = {
         'group': group,
         'membership': membership,
         'members': members,
         'contributions': contributions,
         'goals': goals,  # Nouveaux objectifs multiples
-        'member_stats': member_stats
+        'member_stats': member_stats,
+        'activities': [
+            dict(serialize_activity(row), date=row['created_at'])
+            for row in activity_page['activities']
+        ],
+        'activity_next_cursor': activity_page['next_cursor'],
+        'activity_latest_cursor': activity_page['latest_cursor'],
+        'activity_events_url': group_events_url(request.user.pk, group.pk),
     }
     
     return render(request, 'groups/group_detail.html', context)
@@ -117,17 +128,12 @@ def group_create_view(request):
 
 
 @login_required
-def group_update_view(request, pk):
+@group_access(Group, role=ROLE_ADMIN, denied_message='Seuls les administrateurs peuvent modifier ce groupe.')
+def group_update_view(request, group, membership):
     """
     Vue de modification d'un groupe (réservé aux admins).
     """
-    group = get_object_or_404(Group, pk=pk)
-    
-    # Vérifier que l'utilisateur est admin du groupe
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent modifier ce groupe.')
-        return redirect('groups:detail', pk=pk)
+    pk = group.pk
     
     if request.method == 'POST':
         form = GroupForm(request.POST, instance=group)
@@ -148,11 +154,13 @@ def group_update_view(request, pk):
 
 
 @login_required
-def group_delete_view(request, pk):
+@group_access(Group)
+def group_delete_view(request, group, membership):
     """
     Vue de suppression d'un groupe (réservé au créateur).
     """
-    group = get_object_or_404(Group, pk=pk, creator=request.user)
+    if group.creator_id != request.user.pk:
+        raise Http404
     
     if request.method == 'POST':
         group.delete()
@@ -165,17 +173,13 @@ def group_delete_view(request, pk):
 
 
 @login_required
-def member_add_view(request, group_pk):
+@group_access(Group, lookup='group_pk', role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent ajouter des membres.')
+def member_add_view(request, group, membership):
     """
     Vue d'ajout d'un membre à un groupe (réservé aux admins).
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est admin du groupe
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent ajouter des membres.')
-        return redirect('groups:detail', pk=group_pk)
+    group_pk = group.pk
     
     if request.method == 'POST':
         form = MembershipForm(request.POST)
@@ -201,25 +205,23 @@ def member_add_view(request, group_pk):
 
 
 @login_required
-def member_remove_view(request, group_pk, member_pk):
+@group_access(Group, lookup='group_pk', role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent retirer des membres.')
+def member_remove_view(request, group, admin_membership, member_pk):
     """
     Vue de suppression d'un membre d'un groupe (réservé aux admins).
     Un admin ne peut pas se retirer lui-même.
     Le créateur du groupe ne peut pas être retiré.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est admin du groupe
-    admin_membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not admin_membership:
-        messages.error(request, 'Seuls les administrateurs peuvent retirer des membres.')
-        return redirect('groups:detail', pk=group_pk)
+    group_pk = group.pk
     
     # Récupérer le membre à retirer
-    member_to_remove = get_object_or_404(Membership, pk=member_pk, group=group)
+    member_to_remove = get_object_or_404(
+        Membership.objects.select_related('user'), pk=member_pk, group=group
+    )
     
     # Vérifications de sécurité
-    if member_to_remove.user == group.creator:
+    if member_to_remove.user_id == group.creator_id:
         messages.error(request, 'Le créateur du groupe ne peut pas être retiré.')
         return redirect('groups:detail', pk=group_pk)
     
@@ -240,20 +242,14 @@ def member_remove_view(request, group_pk, member_pk):
 
 
 @login_required
-def contribution_create_view(request, group_pk):
+@group_access(Group, lookup='group_pk', denied_message='Vous devez être membre du groupe pour contribuer.')
+def contribution_create_view(request, group, membership):
     """
     Vue d'ajout d'une contribution à un groupe.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous devez être membre du groupe pour contribuer.')
-        return redirect('groups:list')
+    group_pk = group.pk
     
     # Récupérer les objectifs du groupe
-    from .models import GroupGoal
     goals = GroupGoal.objects.filter(group=group, status='active')
     
     # Récupérer l'objectif cible si spécifié dans l'URL
@@ -314,21 +310,16 @@ def contribution_create_view(request, group_pk):
 
 
 @login_required
-def group_goal_create_view(request, group_pk):
+@group_access(Group, lookup='group_pk', role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent créer des objectifs.')
+def group_goal_create_view(request, group, membership):
     """
     Vue de création d'un nouvel objectif pour un groupe.
     Seuls les admins peuvent créer des objectifs.
     """
-    from .models import GroupGoal
     from .forms import GroupGoalForm
     
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est admin du groupe
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent créer des objectifs.')
-        return redirect('groups:detail', pk=group_pk)
+    group_pk = group.pk
     
     if request.method == 'POST':
         form = GroupGoalForm(request.POST)
@@ -355,23 +346,17 @@ def group_goal_create_view(request, group_pk):
 
 
 @login_required
-def group_goal_edit_view(request, pk):
+@group_access(GroupGoal, role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent éditer les objectifs.')
+def group_goal_edit_view(request, goal, membership):
     """
     Vue d'édition d'un objectif de groupe.
     Seuls les admins peuvent éditer.
     """
-    from .models import GroupGoal
     from .forms import GroupGoalForm
     
-    goal = get_object_or_404(GroupGoal, pk=pk)
     group = goal.group
     
-    # Vérifier que l'utilisateur est admin
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent éditer les objectifs.')
-        return redirect('groups:detail', pk=group.pk)
-    
     if request.method == 'POST':
         form = GroupGoalForm(request.POST, instance=goal)
         if form.is_valid():
@@ -390,22 +375,15 @@ def group_goal_edit_view(request, pk):
 
 
 @login_required
-def group_goal_delete_view(request, pk):
+@group_access(GroupGoal, role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent supprimer les objectifs.')
+def group_goal_delete_view(request, goal, membership):
     """
     Vue de suppression d'un objectif de groupe.
     Seuls les admins peuvent supprimer.
     """
-    from .models import GroupGoal
-    
-    goal = get_object_or_404(GroupGoal, pk=pk)
     group = goal.group
     
-    # Vérifier que l'utilisateur est admin
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent supprimer les objectifs.')
-        return redirect('groups:detail', pk=group.pk)
-    
     if request.method == 'POST':
         goal_title = goal.title
         goal.delete()
@@ -458,18 +436,11 @@ def join_group_view(request, invite_code=None):
 
 
 @login_required
-def group_invite_view(request, pk):
+@group_access(Group)
+def group_invite_view(request, group, membership):
     """
     Vue pour afficher le code d'invitation et le lien d'un groupe.
     """
-    group = get_object_or_404(Group, pk=pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
     # Générer l'URL complète d'invitation
     invite_url = request.build_absolute_uri(f'/groups/join/{group.invite_code}/')
     
@@ -483,34 +454,46 @@ def group_invite_view(request, pk):
 
 
 @login_required
-def group_expense_list_view(request, group_pk):
+@group_access(Group, lookup='group_pk')
+def group_expense_list_view(request, group, membership):
     """
-    Vue listant toutes les dépenses d'un groupe.
+    Vue listant les dépenses d'un groupe (pagination par curseur, filtres
+    par catégorie et par payeur). Voir groups/expense_list.py.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
-    # Récupérer toutes les dépenses du groupe
-    expenses = GroupExpense.objects.filter(group=group).select_related('paid_by', 'category').order_by('-date')
-    
-    # Statistiques
-    total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-    my_paid = expenses.filter(paid_by=request.user).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    members = list(group.members.order_by('username').only('id', 'username'))
+    member_count = len(members)
+
+    category_id = parse_filter_id(request.GET.get('category'))
+    payer_id = parse_filter_id(request.GET.get('payer'))
+    cursor = parse_expense_cursor(request.GET.get('after'))
+
+    page = get_expense_page(
+        group, request.user, member_count,
+        after=cursor, category_id=category_id, payer_id=payer_id
+    )
+
+    # Statistiques (une seule agrégation sur toutes les dépenses du groupe)
+    totals = GroupExpense.objects.filter(group=group).aggregate(
+        total=Sum('amount'),
+        my_paid=Sum('amount', filter=Q(paid_by=request.user))
+    )
+    total_expenses = totals['total'] or Decimal('0.00')
+    my_paid = totals['my_paid'] or Decimal('0.00')
     
     # Mon solde (ce que j'ai payé - ma part)
-    member_count = group.members.count()
     my_share = total_expenses / member_count if member_count > 0 else Decimal('0.00')
     my_balance = my_paid - my_share
     
     context = {
         'group': group,
         'membership': membership,
-        'expenses': expenses,
+        'expenses': page['expenses'],
+        'next_cursor': page['next_cursor'],
+        'is_first_page': cursor is None,
+        'categories': Category.objects.all(),
+        'members': members,
+        'selected_category': category_id,
+        'selected_payer': payer_id,
         'total_expenses': total_expenses,
         'my_paid': my_paid,
         'my_share': my_share,
@@ -521,17 +504,12 @@ def group_expense_list_view(request, group_pk):
 
 
 @login_required
-def group_expense_create_view(request, group_pk):
+@group_access(Group, lookup='group_pk')
+def group_expense_create_view(request, group, membership):
     """
     Vue de création d'une dépense de groupe.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
+    group_pk = group.pk
     
     if request.method == 'POST':
         form = GroupExpenseForm(request.POST)
@@ -565,19 +543,13 @@ def group_expense_create_view(request, group_pk):
 
 
 @login_required
-def group_expense_detail_view(request, pk):
+@group_access(GroupExpense, select_related=('paid_by', 'category'))
+def group_expense_detail_view(request, expense, membership):
     """
     Vue détaillée d'une dépense de groupe avec répartition.
     """
-    expense = get_object_or_404(GroupExpense, pk=pk)
     group = expense.group
     
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
     # Récupérer tous les splits
     splits = expense.splits.select_related('user').order_by('user__username')
     
@@ -592,17 +564,17 @@ def group_expense_detail_view(request, pk):
 
 
 @login_required
-def mark_split_paid_view(request, split_pk):
+@group_access(GroupExpenseSplit, lookup='split_pk', group_path='expense__group', select_related=('user',),
+              denied_message='Vous n\'avez pas la permission de faire cela.',
+              denied_redirect=lambda split, group: redirect('groups:expense_detail', pk=split.expense_id))
+def mark_split_paid_view(request, split, membership):
     """
     Marquer un split comme payé.
     """
-    split = get_object_or_404(GroupExpenseSplit, pk=split_pk)
     expense = split.expense
-    group = expense.group
     
     # Vérifier que l'utilisateur est admin du groupe ou le membre concerné
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership or (membership.role != 'admin' and split.user != request.user):
+    if membership.role != ROLE_ADMIN and split.user_id != request.user.pk:
         messages.error(request, 'Vous n\'avez pas la permission de faire cela.')
         return redirect('groups:expense_detail', pk=expense.pk)
     
@@ -610,7 +582,7 @@ def mark_split_paid_view(request, split_pk):
         split.is_paid = True
         from django.utils import timezone
         split.paid_at = timezone.now()
-        split.save()
+        split.save(update_fields=['is_paid', 'paid_at'])
         messages.success(request, f'{split.user.username} a marqué sa part comme payée.')
     
     return redirect('groups:expense_detail', pk=expense.pk)
@@ -619,17 +591,11 @@ def mark_split_paid_view(request, split_pk):
 # ============= VUES D'ÉPARGNE DE GROUPE =============
 
 @login_required
-def group_savings_list_view(request, group_pk):
+@group_access(Group, lookup='group_pk')
+def group_savings_list_view(request, group, membership):
     """
     Liste des objectifs d'épargne d'un groupe.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
     
     # Récupérer les objectifs d'épargne
     savings_goals = GroupSavingsGoal.objects.filter(group=group)
@@ -657,17 +623,11 @@ def group_savings_list_view(request, group_pk):
 
 
 @login_required
-def group_savings_create_view(request, group_pk):
+@group_access(Group, lookup='group_pk')
+def group_savings_create_view(request, group, membership):
     """
     Créer un objectif d'épargne pour un groupe.
     """
-    group = get_object_or_404(Group, pk=group_pk)
-    
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
     
     if request.method == 'POST':
         form = GroupSavingsGoalForm(request.POST)
@@ -695,19 +655,13 @@ def group_savings_create_view(request, group_pk):
 
 
 @login_required
-def group_savings_detail_view(request, pk):
+@group_access(GroupSavingsGoal)
+def group_savings_detail_view(request, savings_goal, membership):
     """
     Vue détaillée d'un objectif d'épargne de groupe.
     """
-    savings_goal = get_object_or_404(GroupSavingsGoal, pk=pk)
     group = savings_goal.group
     
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
     # Récupérer les contributions
     contributions = GroupSavingsContribution.objects.filter(
         savings_goal=savings_goal
@@ -733,19 +687,13 @@ def group_savings_detail_view(request, pk):
 
 
 @login_required
-def group_savings_contribute_view(request, pk):
+@group_access(GroupSavingsGoal)
+def group_savings_contribute_view(request, savings_goal, membership):
     """
     Ajouter une contribution à un objectif d'épargne de groupe.
     """
-    savings_goal = get_object_or_404(GroupSavingsGoal, pk=pk)
     group = savings_goal.group
     
-    # Vérifier que l'utilisateur est membre du groupe
-    membership = Membership.objects.filter(user=request.user, group=group).first()
-    if not membership:
-        messages.error(request, 'Vous n\'êtes pas membre de ce groupe.')
-        return redirect('groups:list')
-    
     # Vérifier que l'objectif est actif
     if savings_goal.status != 'active':
         messages.error(request, 'Cet objectif d\'épargne n\'est pas actif.')
@@ -778,19 +726,15 @@ def group_savings_contribute_view(request, pk):
 
 
 @login_required
-def group_savings_edit_view(request, pk):
+@group_access(GroupSavingsGoal, role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent modifier les objectifs d\'épargne.',
+              denied_redirect=lambda savings_goal, group: redirect('groups:savings_detail', pk=savings_goal.pk))
+def group_savings_edit_view(request, savings_goal, membership):
     """
     Modifier un objectif d'épargne de groupe.
     """
-    savings_goal = get_object_or_404(GroupSavingsGoal, pk=pk)
     group = savings_goal.group
     
-    # Vérifier que l'utilisateur est admin du groupe
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent modifier les objectifs d\'épargne.')
-        return redirect('groups:savings_detail', pk=savings_goal.pk)
-    
     if request.method == 'POST':
         form = GroupSavingsGoalForm(request.POST, instance=savings_goal)
         if form.is_valid():
@@ -814,19 +758,15 @@ def group_savings_edit_view(request, pk):
 
 
 @login_required
-def group_savings_delete_view(request, pk):
+@group_access(GroupSavingsGoal, role=ROLE_ADMIN,
+              denied_message='Seuls les administrateurs peuvent supprimer les objectifs d\'épargne.',
+              denied_redirect=lambda savings_goal, group: redirect('groups:savings_detail', pk=savings_goal.pk))
+def group_savings_delete_view(request, savings_goal, membership):
     """
     Supprimer un objectif d'épargne de groupe.
     """
-    savings_goal = get_object_or_404(GroupSavingsGoal, pk=pk)
     group = savings_goal.group
     
-    # Vérifier que l'utilisateur est admin du groupe
-    membership = Membership.objects.filter(user=request.user, group=group, role='admin').first()
-    if not membership:
-        messages.error(request, 'Seuls les administrateurs peuvent supprimer les objectifs d\'épargne.')
-        return redirect('groups:savings_detail', pk=savings_goal.pk)
-    
     if request.method == 'POST':
         group_pk = group.pk
         savings_goal.delete()
@@ -0,0 +1,22 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis la racine du projet).
+
+Prépare le mode multiprocessus des métriques Prometheus (voir
+monnkap/metrics.py) : répertoire partagé vidé au démarrage, fichiers d'un
+worker arrêté marqués comme tels.
+"""
+import os
+import shutil
+
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/monnkap-metrics')
+
+
+def on_starting(server):
+    # Valeurs d'un déploiement précédent
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
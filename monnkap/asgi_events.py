@@ -0,0 +1,46 @@
+"""
+Application ASGI du processus d'événements (`events` du Procfile).
+
+Ne sert que le flux Server-Sent Events des groupes (vue asynchrone, une file
+asyncio par connexion, voir groups/live.py). Le reste du site est servi en
+WSGI par le processus `web` : sous ASGI, Django exécute chaque vue
+synchrone dans un unique thread partagé par worker, ce qui sérialiserait
+le traitement des pages.
+
+    gunicorn monnkap.asgi_events:application -k uvicorn.workers.UvicornWorker
+
+Le flux est exposé soit sur le même domaine (chemin /groups/api/<id>/events/
+routé vers ce processus par le proxy), soit sur sa propre adresse
+(GROUP_EVENTS_URL, authentification par jeton signé).
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+from django.urls import Resolver404, resolve
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'monnkap.settings')
+
+django_application = get_asgi_application()
+
+# Vues servies par ce processus (noms d'URL)
+EVENT_VIEWS = frozenset({'groups:api_events'})
+
+
+def _is_event_route(path):
+    try:
+        return resolve(path).view_name in EVENT_VIEWS
+    except Resolver404:
+        return False
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and not _is_event_route(scope['path']):
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
+        return
+    await django_application(scope, receive, send)
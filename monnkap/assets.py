@@ -0,0 +1,125 @@
+"""
+Bundles CSS et JavaScript de la mise en page commune (templates/base.html).
+
+`python manage.py build_assets` concatène et minifie les fichiers de chaque
+bundle dans static/dist/ (avant collectstatic, voir build.sh). collectstatic
+les empreinte ensuite (CompressedManifestStaticFilesStorage : hash du contenu
+dans le nom, cache navigateur d'un an) et les compresse (gzip, brotli).
+
+- critical.css : premier affichage (fond, page loader), inséré dans le <head> ;
+- app.css : Bootstrap, icônes et styles du site, chargé sans bloquer le rendu ;
+- app.js : Bootstrap et scripts du site, dans l'ordre d'origine.
+
+Les balises {% stylesheets %} et {% scripts %} (accounts/templatetags/
+asset_tags.py) utilisent les bundles s'ils sont construits et si
+ASSET_BUNDLES_ENABLED (par défaut hors DEBUG), sinon les fichiers sources un
+par un : en développement, une modification est visible sans rebuild.
+"""
+import posixpath
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+ASSET_BUNDLES_ENABLED = getattr(settings, 'ASSET_BUNDLES_ENABLED', not settings.DEBUG)
+
+DIST_DIR = 'dist'
+
+BUNDLES = {
+    'critical.css': [
+        'css/critical.css',
+    ],
+    'app.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.min.css',
+        'css/custom-design.css',
+        'css/skeleton.css',
+        'css/loading-spinner.css',
+        'css/page-transitions.css',
+        'css/base.css',
+        'css/toast-system.css',
+        'css/empty-states.css',
+        'css/progress-badges.css',
+    ],
+    'app.js': [
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        'js/loading-spinner.js',
+        'js/base.js',
+        'js/ux-enhancements.js',
+        'js/toast-system.js',
+        'js/skeleton-loader.js',
+        'js/pwa-installer.js',
+    ],
+}
+
+CSS_URL_RE = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+
+
+def bundle_path(name):
+    """Chemin statique du bundle minifié : 'app.css' → 'dist/app.min.css'."""
+    stem, ext = posixpath.splitext(name)
+    return f'{DIST_DIR}/{stem}.min{ext}'
+
+
+def _source(path):
+    absolute = finders.find(path)
+    if absolute is None:
+        raise FileNotFoundError(f'Fichier statique introuvable : {path}')
+    return Path(absolute).read_text(encoding='utf-8')
+
+
+def _rebase_css_urls(css, path):
+    """Réécrit les url() relatives de `path` pour un fichier placé dans dist/."""
+    source_dir = posixpath.dirname(path)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url({quote}{posixpath.relpath(target, DIST_DIR)}{quote})'
+
+    return CSS_URL_RE.sub(rebase, css)
+
+
+def build_bundle(name, output_dir=None):
+    """
+    Construit un bundle minifié dans static/dist/.
+
+    Returns:
+        tuple: (chemin écrit, taille des sources, taille du bundle) en octets
+    """
+    # Dépendances de build uniquement (build_assets)
+    import rcssmin
+    import rjsmin
+
+    sources = [(path, _source(path)) for path in BUNDLES[name]]
+    if name.endswith('.css'):
+        content = '\n'.join(_rebase_css_urls(text, path) for path, text in sources)
+        minified = rcssmin.cssmin(content, keep_bang_comments=True)
+    else:
+        # « ; » entre les fichiers : un script sans point-virgule final ne
+        # doit pas se fondre dans le suivant
+        minified = ';\n'.join(rjsmin.jsmin(text, keep_bang_comments=True).strip() for _, text in sources)
+
+    output_dir = Path(output_dir or settings.STATICFILES_DIRS[0])
+    output = output_dir / bundle_path(name)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(minified + '\n', encoding='utf-8')
+    source_size = sum(len(text.encode('utf-8')) for _, text in sources)
+    return output, source_size, output.stat().st_size
+
+
+@lru_cache(maxsize=None)
+def bundle_available(name):
+    """Le bundle est-il construit (trouvé par les finders de staticfiles) ?"""
+    return ASSET_BUNDLES_ENABLED and finders.find(bundle_path(name)) is not None
+
+
+@lru_cache(maxsize=None)
+def bundle_content(name):
+    """Contenu d'un bundle construit (CSS critique inséré dans la page)."""
+    return _source(bundle_path(name)).strip()
@@ -0,0 +1,361 @@
+"""
+Cache à deux niveaux : mémoire locale du processus (L1) devant un cache
+partagé entre workers (L2, ex. DatabaseCache).
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'monnkap.cache_backend.TwoTierCache',
+            'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 5, 'L1_MAX_ENTRIES': 5000},
+        },
+        'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'},
+    }
+
+- Lectures : L1 (LRU borné, durée de vie courte) puis L2 ; une valeur lue en
+  L2 est recopiée en L1.
+- Écritures : toujours en L2 (write-through), L1 mis à jour localement.
+  Les autres workers voient la nouvelle valeur au plus L1_TIMEOUT secondes
+  plus tard.
+- Compteurs (incr, decr, add — limites de débit, axes) : directement en L2,
+  jamais servis depuis L1.
+- Espaces de noms versionnés : `versioned_key(namespace, key)` et
+  `invalidate_namespace(namespace)` invalident d'un coup toutes les clés d'un
+  espace pour tous les workers (la version est relue en L2 au plus toutes
+  les VERSION_TIMEOUT secondes).
+- `get_or_compute()` : calcul unique par clé (un seul calcul par processus,
+  verrou en L2 entre workers) et stale-while-revalidate (la valeur périmée
+  est servie pendant qu'un seul worker la recalcule en arrière-plan).
+- `metrics()` : compteurs de hits/miss par niveau pour ce processus (aussi
+  exportés pour Prometheus, voir monnkap/metrics.py). Le temps passé dans le
+  cache figure dans l'en-tête Server-Timing (monnkap/server_timing.py).
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections
+
+from .metrics import record_cache_event
+from .server_timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Cache LRU en mémoire, avec expiration par entrée, partagé par les threads d'un processus."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            deadline, value = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TwoTierCache(BaseCache):
+    """Backend de cache Django : L1 local (LocalLRU) devant le cache L2 désigné par OPTIONS['L2']."""
+
+    METRIC_NAMES = (
+        'l1_hits', 'l2_hits', 'misses', 'sets', 'deletes',
+        'stale_served', 'recomputes', 'recompute_waits', 'recompute_errors',
+    )
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__(params)
+        self._l2_alias = options.get('L2', location or 'shared')
+        self.l1 = LocalLRU(options.get('L1_MAX_ENTRIES', 5000), options.get('L1_TIMEOUT', 5))
+        self.version_timeout = options.get('VERSION_TIMEOUT', 1)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self._metrics = dict.fromkeys(self.METRIC_NAMES, 0)
+        self._metrics_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+        record_cache_event(name, amount)
+
+    def metrics(self):
+        """Compteurs du processus et taux de succès global (L1 + L2)."""
+        with self._metrics_lock:
+            values = dict(self._metrics)
+        lookups = values['l1_hits'] + values['l2_hits'] + values['misses']
+        values['hit_ratio'] = round((values['l1_hits'] + values['l2_hits']) / lookups, 4) if lookups else 0.0
+        values['l1_size'] = len(self.l1)
+        return values
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metrics = dict.fromkeys(self.METRIC_NAMES, 0)
+
+    def _l1_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _l1_get(self, key, default=None):
+        # Valeurs sérialisées comme LocMemCache : un appelant qui modifie
+        # l'objet reçu ne modifie pas la copie en cache
+        data = self.l1.get(key, _MISSING)
+        return default if data is _MISSING else pickle.loads(data)
+
+    def _l1_set(self, key, value, timeout=None):
+        self.l1.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), timeout)
+
+    def _l1_timeout(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else max(0, timeout - time.time())
+
+    # ==================== API DJANGO ====================
+
+    @timed('cache')
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key, _MISSING)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_set(l1_key, value)
+        return value
+
+    @timed('cache')
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version), _MISSING)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        self._count('l1_hits', len(found))
+        if remaining:
+            from_l2 = self.l2.get_many(remaining, version=version)
+            self._count('l2_hits', len(from_l2))
+            self._count('misses', len(remaining) - len(from_l2))
+            for key, value in from_l2.items():
+                self._l1_set(self._l1_key(key, version), value)
+            found.update(from_l2)
+        return found
+
+    @timed('cache')
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout=timeout, version=version)
+        self._count('sets')
+        l1_timeout = self._l1_timeout(timeout)
+        if l1_timeout == 0:
+            self.l1.delete(self._l1_key(key, version))
+        else:
+            self._l1_set(self._l1_key(key, version), value, l1_timeout)
+
+    @timed('cache')
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout=timeout, version=version)
+        self._count('sets', len(data))
+        l1_timeout = self._l1_timeout(timeout)
+        for key, value in data.items():
+            if l1_timeout == 0 or key in failed:
+                self.l1.delete(self._l1_key(key, version))
+            else:
+                self._l1_set(self._l1_key(key, version), value, l1_timeout)
+        return failed
+
+    @timed('cache')
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Sémantique atomique du L2 (verrous, limites de débit) : pas de L1
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.add(key, value, timeout=timeout, version=version)
+
+    @timed('cache')
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.incr(key, delta, version=version)
+
+    @timed('cache')
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.decr(key, delta, version=version)
+
+    @timed('cache')
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout=timeout, version=version)
+
+    @timed('cache')
+    def has_key(self, key, version=None):
+        if self._l1_get(self._l1_key(key, version), _MISSING) is not _MISSING:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    @timed('cache')
+    def delete(self, key, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        self._count('deletes')
+        return self.l2.delete(key, version=version)
+
+    @timed('cache')
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.l1.delete(self._l1_key(key, version))
+        self._count('deletes', len(keys))
+        self.l2.delete_many(keys, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    # ==================== ESPACES DE NOMS VERSIONNÉS ====================
+
+    def _namespace_key(self, namespace):
+        return f'ns:{namespace}'
+
+    def get_namespace_version(self, namespace):
+        l1_key = self._l1_key(self._namespace_key(namespace), None)
+        version = self._l1_get(l1_key)
+        if version is None:
+            version = self.l2.get(self._namespace_key(namespace))
+            if version is None:
+                self.l2.add(self._namespace_key(namespace), 1, None)
+                version = self.l2.get(self._namespace_key(namespace), 1)
+            self._l1_set(l1_key, version, self.version_timeout)
+        return version
+
+    def versioned_key(self, namespace, key):
+        """Clé rattachée à la version courante de l'espace de noms."""
+        return f'{namespace}:v{self.get_namespace_version(namespace)}:{key}'
+
+    def invalidate_namespace(self, namespace):
+        """Invalide toutes les clés de l'espace de noms, pour tous les workers."""
+        key = self._namespace_key(namespace)
+        try:
+            version = self.l2.incr(key)
+        except ValueError:
+            self.l2.add(key, 1, None)
+            version = self.l2.incr(key)
+        self._l1_set(self._l1_key(key, None), version, self.version_timeout)
+        return version
+
+    # ==================== CALCUL UNIQUE ET STALE-WHILE-REVALIDATE ====================
+
+    def get_or_compute(self, key, compute, timeout, stale_timeout=0, version=None):
+        """
+        Retourne la valeur en cache ou la calcule une seule fois.
+
+        Args:
+            key: Clé de cache
+            compute: Fonction sans argument qui calcule la valeur
+            timeout: Durée de fraîcheur (secondes)
+            stale_timeout: Durée supplémentaire pendant laquelle une valeur
+                périmée est servie pendant son recalcul en arrière-plan
+        """
+        entry = self.get(key, version=version)
+        now = time.time()
+        if entry is not None:
+            value, fresh_until = entry
+            if now < fresh_until:
+                return value
+            # Périmée : servie telle quelle, un seul worker recalcule
+            self._count('stale_served')
+            if self.add(f'{key}:lock', 1, self.lock_timeout, version=version):
+                thread = threading.Thread(
+                    target=self._refresh,
+                    args=(key, compute, timeout, stale_timeout, version),
+                    daemon=True,
+                )
+                thread.start()
+            return value
+
+        with self._inflight_lock:
+            event = self._inflight.get((key, version))
+            owner = event is None
+            if owner:
+                event = self._inflight[(key, version)] = threading.Event()
+
+        if not owner:
+            # Un autre thread de ce processus calcule déjà cette valeur
+            self._count('recompute_waits')
+            event.wait(self.lock_timeout)
+            entry = self.get(key, version=version)
+            if entry is not None:
+                return entry[0]
+            return compute()
+
+        try:
+            if not self.add(f'{key}:lock', 1, self.lock_timeout, version=version):
+                # Calcul en cours dans un autre worker : attendre son résultat
+                self._count('recompute_waits')
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    entry = self.l2.get(key, version=version)
+                    if entry is not None:
+                        self._l1_set(self._l1_key(key, version), entry)
+                        return entry[0]
+            return self._store(key, compute, timeout, stale_timeout, version)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop((key, version), None)
+            event.set()
+
+    def _store(self, key, compute, timeout, stale_timeout, version):
+        try:
+            value = compute()
+            self._count('recomputes')
+            self.set(key, (value, time.time() + timeout), timeout + stale_timeout, version=version)
+            return value
+        finally:
+            self.l2.delete(f'{key}:lock', version=version)
+
+    def _refresh(self, key, compute, timeout, stale_timeout, version):
+        try:
+            self._store(key, compute, timeout, stale_timeout, version)
+        except Exception:
+            self._count('recompute_errors')
+            logger.exception(f"Échec du recalcul en arrière-plan de la clé de cache {key}")
+        finally:
+            # Connexions ouvertes par ce thread
+            connections.close_all()
@@ -0,0 +1,163 @@
+"""
+Requêtes conditionnelles (ETag / 304) pour les pages propres à un utilisateur.
+
+Chaque utilisateur et chaque groupe a une version de données (horodatage en
+nanosecondes), changée après la validation de toute écriture qui modifie ce
+qu'affichent ses pages : signaux post_save / post_delete dans les
+models.py de chaque application (`bump_user_version`, `bump_group_version`).
+
+Le décorateur `conditional_page` calcule l'ETag d'une page à partir de ces
+versions avant d'appeler la vue. Si le navigateur (ou le service worker)
+présente le même ETag dans If-None-Match, la réponse est un 304 : ni
+chargement de l'utilisateur, ni requête SQL de la vue, ni rendu de gabarit.
+Restent la lecture de la session et celle des versions (une lecture groupée
+dans le cache partagé).
+
+L'ETag couvre aussi l'URL complète (filtres de la query string), le jour
+(pages qui affichent le mois en cours ou les 7 derniers jours), le jeton CSRF
+de la session (formulaires de la page) et l'identifiant du déploiement
+(gabarits modifiés).
+
+Ces pages portent aussi l'en-tête X-Cache-Partition : le service worker ne
+met en cache que ces pages, par utilisateur (voir monnkap/pwa.py).
+
+Les versions sont lues et écrites directement dans le cache partagé (L2 du
+cache à deux niveaux) : une version périmée en L1 donnerait un 304 erroné
+juste après une écriture traitée par un autre worker. Une version absente
+(redémarrage, éviction) est recréée avec une nouvelle valeur : au pire la
+page est recalculée, jamais un 304 erroné.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from .pwa import CACHE_PARTITION_HEADER, cache_partition
+
+
+CONDITIONAL_PAGES_ENABLED = getattr(settings, 'CONDITIONAL_PAGES_ENABLED', True)
+CONDITIONAL_PAGES_RELEASE = getattr(settings, 'CONDITIONAL_PAGES_RELEASE', '')
+
+USER_VERSION_KEY = 'data_version:user:{}'
+GROUP_VERSION_KEY = 'data_version:group:{}'
+
+
+def _shared_cache():
+    # Cache à deux niveaux : les versions ne passent jamais par le L1
+    return getattr(cache, 'l2', cache)
+
+
+# ==================== VERSIONS ====================
+
+def get_versions(keys):
+    """Versions courantes des clés données (créées si absentes)."""
+    shared = _shared_cache()
+    versions = shared.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = time.time_ns()
+            if not shared.add(key, version, None):
+                version = shared.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def _bump(keys):
+    keys = list(keys)
+    if not keys:
+        return
+
+    def bump():
+        _shared_cache().set_many(dict.fromkeys(keys, time.time_ns()), None)
+
+    # Après validation : avant, un lecteur verrait la nouvelle version avec
+    # les anciennes données et mémoriserait un ETag faux
+    transaction.on_commit(bump)
+
+
+def bump_user_version(*user_ids):
+    """Change la version des données des utilisateurs (pages personnelles)."""
+    _bump(USER_VERSION_KEY.format(user_id) for user_id in set(user_ids) if user_id)
+
+
+def bump_group_version(*group_ids):
+    """Change la version des données des groupes (pages de groupe)."""
+    _bump(GROUP_VERSION_KEY.format(group_id) for group_id in set(group_ids) if group_id)
+
+
+# ==================== PAGES CONDITIONNELLES ====================
+
+def _session_user_id(request):
+    try:
+        return int(auth._get_user_session_key(request))
+    except (KeyError, ValueError):
+        return None
+
+
+def _page_etag(request, user_id, group_ids):
+    keys = [USER_VERSION_KEY.format(user_id)] + [GROUP_VERSION_KEY.format(pk) for pk in group_ids]
+    parts = [
+        CONDITIONAL_PAGES_RELEASE,
+        request.get_full_path(),
+        timezone.localdate().isoformat(),
+        request.META.get('CSRF_COOKIE', ''),
+        *map(str, get_versions(keys)),
+    ]
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_page(group_kwarg=None, user_groups=False):
+    """
+    Décorateur de vue : ETag fort dérivé des versions de données, 304 si
+    If-None-Match correspond. À placer au-dessus de @login_required : le 304
+    est décidé avec l'identifiant d'utilisateur de la session, sans le charger.
+
+    Args:
+        group_kwarg: Argument d'URL contenant l'identifiant du groupe affiché
+        user_groups: La page affiche les groupes de l'utilisateur (tableau de bord)
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            user_id = _session_user_id(request)
+            # Messages en attente : affichés une seule fois, la page doit être rendue
+            if (
+                not CONDITIONAL_PAGES_ENABLED
+                or request.method not in ('GET', 'HEAD')
+                or user_id is None
+                or len(get_messages(request))
+            ):
+                return view_func(request, *args, **kwargs)
+
+            group_ids = []
+            if group_kwarg is not None:
+                group_ids.append(kwargs[group_kwarg])
+            if user_groups:
+                from groups.access import get_group_ids_for_user
+                group_ids.extend(get_group_ids_for_user(user_id))
+
+            etag = _page_etag(request, user_id, group_ids)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = HttpResponseNotModified()
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            # Cache de pages du service worker propre à l'utilisateur (voir monnkap/pwa.py)
+            response[CACHE_PARTITION_HEADER] = cache_partition(user_id)
+            # Page privée, toujours revalidée
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,194 @@
+"""
+Métriques au format Prometheus, exposées sur /metrics (staff ou jeton).
+
+- Requêtes HTTP : histogramme de latence par route (nom d'URL), méthode et
+  classe de statut, nombre et durée des requêtes SQL par route.
+- Cache : évènements du cache à deux niveaux (hits L1/L2, miss...), le taux
+  de succès se calcule côté Prometheus.
+- Emails : latence d'envoi et résultats ; profondeur de l'outbox par statut
+  (lue en base au moment de la collecte).
+- Portefeuille : écritures (transactions, allocations) par type.
+
+Multiprocessus : si PROMETHEUS_MULTIPROC_DIR est défini (production, voir
+gunicorn.conf.py), chaque worker écrit ses valeurs dans un fichier mappé en
+mémoire de ce répertoire et /metrics agrège tous les workers. Sinon, les
+valeurs restent dans le processus courant (développement).
+
+Accès : utilisateur staff connecté, ou en-tête
+« Authorization: Bearer <METRICS_TOKEN> » pour le collecteur Prometheus.
+"""
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', True)
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'monnkap_http_request_duration_seconds',
+    'Durée de traitement des requêtes HTTP',
+    ['route', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter(
+    'monnkap_db_queries',
+    'Requêtes SQL exécutées pendant les requêtes HTTP',
+    ['route'],
+)
+DB_QUERY_SECONDS = Counter(
+    'monnkap_db_query_seconds',
+    'Temps passé en requêtes SQL pendant les requêtes HTTP',
+    ['route'],
+)
+CACHE_EVENTS = Counter(
+    'monnkap_cache_events',
+    'Évènements du cache à deux niveaux (l1_hits, l2_hits, misses...)',
+    ['event'],
+)
+EMAIL_SEND_SECONDS = Histogram(
+    'monnkap_email_send_duration_seconds',
+    'Durée des appels au fournisseur d\'emails (un message ou un lot)',
+    ['mode'],
+    buckets=LATENCY_BUCKETS,
+)
+EMAILS = Counter(
+    'monnkap_emails',
+    'Emails de l\'outbox traités',
+    ['result'],
+)
+WALLET_WRITES = Counter(
+    'monnkap_wallet_writes',
+    'Écritures du portefeuille',
+    ['kind'],
+)
+
+
+# ==================== ENREGISTREMENT ====================
+
+def record_cache_event(event, amount=1):
+    if amount:
+        CACHE_EVENTS.labels(event).inc(amount)
+
+
+def record_email_send(mode, seconds):
+    EMAIL_SEND_SECONDS.labels(mode).observe(seconds)
+
+
+def record_email_result(result):
+    EMAILS.labels(result).inc()
+
+
+def record_wallet_write(kind):
+    WALLET_WRITES.labels(kind).inc()
+
+
+class _QueryTimer:
+    """execute_wrapper : compte les requêtes SQL et leur durée."""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    # Nom d'URL plutôt que chemin : nombre de séries borné
+    return (match.view_name or match.route) if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Latence par route et requêtes SQL de chaque requête HTTP."""
+
+    def __init__(self, get_response):
+        if not METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        route = _route(request)
+        HTTP_REQUEST_SECONDS.labels(route, request.method, f'{response.status_code // 100}xx').observe(duration)
+        if timer.count:
+            DB_QUERIES.labels(route).inc(timer.count)
+            DB_QUERY_SECONDS.labels(route).inc(timer.seconds)
+        return response
+
+
+# ==================== COLLECTE ====================
+
+class OutboxCollector:
+    """Profondeur de l'outbox, lue en base à chaque collecte."""
+
+    def collect(self):
+        from django.db.models import Count
+
+        from accounts.models import OutboxEmail
+
+        gauge = GaugeMetricFamily('monnkap_outbox_emails', 'Emails de l\'outbox par statut', labels=['status'])
+        counts = dict(OutboxEmail.objects.order_by().values_list('status').annotate(total=Count('id')))
+        for status, _ in OutboxEmail.STATUS_CHOICES:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+
+def _registry():
+    registry = CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessRegistry())
+    registry.register(OutboxCollector())
+    return registry
+
+
+class _ProcessRegistry:
+    """Métriques du processus courant (sans mode multiprocessus)."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def _authorized(request):
+    authorization = request.headers.get('Authorization', '')
+    if METRICS_TOKEN and authorization.startswith('Bearer '):
+        return hmac.compare_digest(authorization[len('Bearer '):], METRICS_TOKEN)
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+@never_cache
+def metrics_view(request):
+    """Expose les métriques (format texte Prometheus)."""
+    if not _authorized(request):
+        return HttpResponse('Accès refusé', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,109 @@
+"""
+Profilage à la demande d'une requête, réservé au staff.
+
+    /dashboard/home/?profile=1        → rapport cProfile (texte, trié par temps cumulé)
+    /dashboard/home/?profile=folded   → piles échantillonnées au format « folded »,
+                                        lisible par speedscope ou flamegraph.pl
+
+La vue est exécutée normalement ; sa réponse est remplacée par le rapport.
+Sans paramètre `profile`, le middleware ne fait qu'une lecture de la query
+string.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+PROFILING_ENABLED = getattr(settings, 'PROFILING_ENABLED', True)
+PROFILING_SAMPLE_INTERVAL = getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.001)  # secondes
+PROFILING_REPORT_LINES = getattr(settings, 'PROFILING_REPORT_LINES', 80)
+
+
+class StackSampler:
+    """
+    Échantillonne la pile d'un thread à intervalle régulier (thread séparé).
+    Résultat au format folded : « frame;frame;frame nombre » par ligne.
+    """
+
+    def __init__(self, thread_id, interval=PROFILING_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        # Le thread échantillonneur doit obtenir le GIL à chaque intervalle
+        # (5 ms par défaut) : réglage global, rétabli à la fin
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common()) + '\n'
+
+
+def _cprofile_report(profiler, duration):
+    output = io.StringIO()
+    output.write(f'Durée totale : {duration * 1000:.1f} ms\n\n')
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(PROFILING_REPORT_LINES)
+    return output.getvalue()
+
+
+class RequestProfilingMiddleware:
+    """
+    `?profile=1` (cProfile) ou `?profile=folded` (échantillonnage) pour les
+    utilisateurs staff. À placer après le middleware d'authentification.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get('profile') if PROFILING_ENABLED else None
+        if mode not in ('1', 'folded') or not request.user.is_staff:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        if mode == 'folded':
+            with StackSampler(threading.get_ident()) as sampler:
+                self.get_response(request)
+            report, filename = sampler.folded(), 'profile.folded'
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                self.get_response(request)
+            finally:
+                profiler.disable()
+            report, filename = _cprofile_report(profiler, time.perf_counter() - started), 'profile.txt'
+
+        response = HttpResponse(report, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,178 @@
+"""
+Service worker de la PWA, servi à la racine (/sw.js) pour contrôler tout le
+site, avec son manifeste de précache.
+
+Le manifeste liste les fichiers mis en cache à l'installation (bundles de la
+mise en page, polices d'icônes, icônes, page hors ligne) avec leur URL
+empreintée par collectstatic. Sa version (hash des entrées) nomme le cache de
+précache : un déploiement qui change un fichier change sw.js, le navigateur
+installe le nouveau service worker et l'ancien précache est supprimé.
+
+    python manage.py build_precache_manifest   # après collectstatic (build.sh)
+
+En DEBUG (ou sans manifeste construit), il est calculé à la requête sur les
+fichiers sources.
+
+Pages HTML : seules celles qui portent l'en-tête X-Cache-Partition (pages
+décorées par conditional_page, voir monnkap/conditional.py) sont mises en
+cache par le service worker, dans un cache propre à l'utilisateur, vidé à la
+déconnexion. Stratégies et limites : voir static/sw.js.
+
+Formulaires hors ligne (décorateur offline_form) : la page du formulaire est
+mise en cache comme les pages personnelles ; envoyé sans réseau, il est mis
+en file par le service worker puis transmis à l'API de synchronisation
+(monnkap/sync.py) au retour du réseau.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import salted_hmac
+from django.views.decorators.http import etag
+
+from .assets import BUNDLES, bundle_available, bundle_path
+from .sync import SYNC_MAX_BATCH
+
+
+PWA_PAGES_CACHE_MAX_ENTRIES = getattr(settings, 'PWA_PAGES_CACHE_MAX_ENTRIES', 25)
+PWA_PAGES_CACHE_MAX_AGE = getattr(settings, 'PWA_PAGES_CACHE_MAX_AGE', 7 * 24 * 3600)  # secondes
+PWA_STATIC_CACHE_MAX_ENTRIES = getattr(settings, 'PWA_STATIC_CACHE_MAX_ENTRIES', 100)
+PWA_STATIC_CACHE_MAX_AGE = getattr(settings, 'PWA_STATIC_CACHE_MAX_AGE', 30 * 24 * 3600)  # secondes
+
+PRECACHE_MANIFEST_NAME = 'precache-manifest.json'
+CACHE_PARTITION_HEADER = 'X-Cache-Partition'
+
+# Formulaires mis en file hors ligne : nom d'URL → type d'opération (monnkap/sync.py)
+OFFLINE_FORMS = {
+    'expenses:create': 'expense',
+    'accounts:add_transaction': 'transaction',
+}
+
+# Fichiers statiques précachés, en plus des bundles (ou de leurs sources)
+PRECACHE_STATIC = [
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2',
+    'manifest.json',
+    'favicon.svg',
+    'icons/icon-192.png',
+]
+
+
+def cache_partition(user_id):
+    """Identifiant opaque du cache de pages d'un utilisateur."""
+    return salted_hmac('monnkap.pwa.cache_partition', str(user_id)).hexdigest()[:16]
+
+
+def offline_form(view_func):
+    """
+    Décorateur de vue : la page du formulaire (GET) porte l'en-tête de
+    partition, le service worker la garde pour la saisie hors ligne.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200 and request.user.is_authenticated:
+            response[CACHE_PARTITION_HEADER] = cache_partition(request.user.pk)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def _file_hash(path):
+    absolute = finders.find(path)
+    if absolute is None:
+        raise FileNotFoundError(f'Fichier statique introuvable : {path}')
+    with open(absolute, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _static_entry(path):
+    url = staticfiles_storage.url(path)
+    # URL empreintée (ManifestStaticFilesStorage) : elle change avec le contenu.
+    # Sinon la révision est le hash du fichier.
+    revision = None if os.path.basename(url) != os.path.basename(path) else _file_hash(path)
+    return {'url': url, 'revision': revision}
+
+
+def _page_entry(name, templates):
+    # Page anonyme (précachée sans cookies) : change avec ses gabarits et le déploiement
+    digest = hashlib.sha1(getattr(settings, 'CONDITIONAL_PAGES_RELEASE', '').encode('utf-8'))
+    for template in templates:
+        with open(get_template(template).origin.name, 'rb') as f:
+            digest.update(f.read())
+    return {'url': reverse(name), 'revision': digest.hexdigest()[:12]}
+
+
+def build_precache_manifest():
+    """Manifeste de précache : {'version': ..., 'entries': [{'url', 'revision'}]}."""
+    paths = []
+    for name in ('app.css', 'app.js'):
+        paths.extend([bundle_path(name)] if bundle_available(name) else BUNDLES[name])
+    entries = [_static_entry(path) for path in paths + PRECACHE_STATIC]
+    entries.append(_page_entry('offline', ['offline.html', 'base.html']))
+
+    version = hashlib.sha1(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return {'version': version, 'entries': entries}
+
+
+def load_precache_manifest():
+    """Manifeste construit par build_precache_manifest, sinon calculé."""
+    # En DEBUG, les fichiers sont servis depuis les sources : pas de manifeste figé
+    if not settings.DEBUG and settings.STATIC_ROOT:
+        try:
+            with open(os.path.join(settings.STATIC_ROOT, PRECACHE_MANIFEST_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return build_precache_manifest()
+
+
+def _service_worker_source():
+    manifest = load_precache_manifest()
+    config = {
+        'offlineUrl': reverse('offline'),
+        'loginUrl': reverse('accounts:login'),
+        'logoutUrl': reverse('accounts:logout'),
+        'staticUrl': settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}',
+        'partitionHeader': CACHE_PARTITION_HEADER,
+        'offlineForms': {reverse(name): kind for name, kind in OFFLINE_FORMS.items()},
+        'syncPushUrl': reverse('sync_push'),
+        'syncBatchSize': SYNC_MAX_BATCH,
+        'pages': {'maxEntries': PWA_PAGES_CACHE_MAX_ENTRIES, 'maxAgeSeconds': PWA_PAGES_CACHE_MAX_AGE},
+        'static': {'maxEntries': PWA_STATIC_CACHE_MAX_ENTRIES, 'maxAgeSeconds': PWA_STATIC_CACHE_MAX_AGE},
+    }
+    with open(finders.find('sw.js'), encoding='utf-8') as f:
+        source = f.read()
+    return (
+        f'self.__PRECACHE_MANIFEST = {json.dumps(manifest)};\n'
+        f'self.__SW_CONFIG = {json.dumps(config)};\n\n'
+        f'{source}'
+    )
+
+
+# Manifeste figé après le build : source calculée une fois par processus
+_cached_source = lru_cache(maxsize=None)(_service_worker_source)
+
+
+def service_worker_source():
+    return _service_worker_source() if settings.DEBUG else _cached_source()
+
+
+def _service_worker_etag(request):
+    return hashlib.sha1(service_worker_source().encode('utf-8')).hexdigest()
+
+
+@etag(_service_worker_etag)
+def service_worker_view(request):
+    """static/sw.js précédé du manifeste de précache, servi à la racine."""
+    response = HttpResponse(service_worker_source(), content_type='application/javascript; charset=utf-8')
+    # Toujours revalidé : le navigateur doit voir un nouveau manifeste au déploiement
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,214 @@
+"""
+Comptage des requêtes SQL par requête HTTP et détection des N+1.
+
+- `QueryRecorder` : gestionnaire de contexte qui enregistre chaque requête
+  SQL (toutes les connexions), sa forme (SQL sans paramètres, listes IN
+  repliées) et l'endroit du code ou du gabarit qui l'a déclenchée.
+  Une même forme répétée au moins QUERY_COUNT_N_PLUS_ONE_THRESHOLD fois
+  depuis le même endroit est un N+1 probable.
+- `QueryCountMiddleware` : actif seulement si QUERY_COUNT_ENABLED (par
+  défaut : DEBUG, lu au démarrage du middleware ; le test runner passe DEBUG
+  à False, les tests restent silencieux). Ajoute l'en-tête X-Query-Count et
+  journalise les N+1 probables et les dépassements de budget.
+- Budgets : nombre maximal de requêtes par nom d'URL (« espace:nom ») dans
+  QUERY_BUDGETS_FILE (query_budgets.json à la racine du projet).
+  `QueryBudgetMixin.assertWithinQueryBudget()` fait échouer un test (et donc
+  la CI) quand une vue dépasse son budget. Les budgets sont une base de
+  non-régression (nombres mesurés, N+1 connus compris), pas des objectifs.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+QUERY_COUNT_N_PLUS_ONE_THRESHOLD = getattr(settings, 'QUERY_COUNT_N_PLUS_ONE_THRESHOLD', 5)
+QUERY_BUDGETS_FILE = getattr(
+    settings, 'QUERY_BUDGETS_FILE', os.path.join(settings.BASE_DIR, 'query_budgets.json')
+)
+
+PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+# Modules d'instrumentation (execute_wrapper des middlewares) : jamais l'origine d'une requête
+INSTRUMENTATION_FILES = frozenset(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{name}.py')
+    for name in ('query_count', 'metrics', 'server_timing', 'slow_queries')
+)
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Forme d'une requête : paramètres, nombres et listes IN remplacés."""
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return SPACES_RE.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(PROJECT_DIR)
+        and 'site-packages' not in filename
+        and filename not in INSTRUMENTATION_FILES
+    )
+
+
+def code_location(frame):
+    """
+    Origine d'une requête : ligne de code du projet la plus proche et, si la
+    requête part d'un gabarit, le gabarit et la ligne de la balise.
+    """
+    code_line = template_line = None
+    while frame is not None and (code_line is None or template_line is None):
+        code = frame.f_code
+        if template_line is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_line = f'{origin.template_name}:{token.lineno}'
+        if code_line is None and _is_project_file(code.co_filename):
+            path = code.co_filename[len(PROJECT_DIR):]
+            code_line = f'{path}:{frame.f_lineno} ({code.co_name})'
+        frame = frame.f_back
+    return ' ← '.join(location for location in (code_line, template_line) if location) or '?'
+
+
+class QueryRecorder:
+    """Enregistre les requêtes SQL exécutées dans le bloc `with`."""
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.queries = []
+        self._wrappers = []
+
+    def __enter__(self):
+        for alias in self.aliases:
+            wrapper = connections[alias].execute_wrapper(self._record)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self._wrappers:
+            self._wrappers.pop().__exit__(*exc_info)
+
+    def _record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'shape': normalize_sql(sql),
+                'location': code_location(sys._getframe(1)),
+                'duration_ms': (time.perf_counter() - started) * 1000,
+            })
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def suspects(self, threshold=None):
+        """N+1 probables : [(nombre, forme, origine)], du plus répété au moins répété."""
+        threshold = threshold or QUERY_COUNT_N_PLUS_ONE_THRESHOLD
+        repeated = Counter((query['shape'], query['location']) for query in self.queries)
+        return [
+            (count, shape, location)
+            for (shape, location), count in repeated.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, limit=5):
+        """Résumé lisible : total et N+1 probables."""
+        lines = [f'{self.count} requête(s) SQL']
+        for count, shape, location in self.suspects()[:limit]:
+            lines.append(f'  N+1 probable ×{count} : {location}\n      {shape[:200]}')
+        return '\n'.join(lines)
+
+
+@lru_cache(maxsize=1)
+def _load_budgets(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_query_budgets():
+    """Budgets de requêtes par nom d'URL ({} si le fichier est absent)."""
+    try:
+        mtime = os.path.getmtime(QUERY_BUDGETS_FILE)
+    except OSError:
+        return {}
+    return _load_budgets(QUERY_BUDGETS_FILE, mtime)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+class QueryCountMiddleware:
+    """Compte les requêtes SQL de chaque requête HTTP (développement uniquement)."""
+
+    def __init__(self, get_response):
+        enabled = getattr(settings, 'QUERY_COUNT_ENABLED', None)
+        if not (settings.DEBUG if enabled is None else enabled):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(recorder.count)
+
+        view_name = _view_name(request)
+        budget = load_query_budgets().get(view_name)
+        if recorder.suspects():
+            logger.warning(f"{request.method} {request.path} ({view_name}) : {recorder.report()}")
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                f"{request.method} {request.path} ({view_name}) : "
+                f"{recorder.count} requêtes SQL pour un budget de {budget}"
+            )
+        return response
+
+
+class QueryBudgetMixin:
+    """
+    Pour les TestCase : vérifie le nombre de requêtes d'une vue contre son
+    budget dans query_budgets.json.
+
+        class MyTests(QueryBudgetMixin, TestCase):
+            def test_home(self):
+                self.assertWithinQueryBudget(reverse('dashboard:home'))
+    """
+
+    def assertWithinQueryBudget(self, url, client=None, **extra):
+        client = client or self.client
+        with QueryRecorder() as recorder:
+            response = client.get(url, **extra)
+        self.assertLess(response.status_code, 400, f'{url} : HTTP {response.status_code}')
+
+        view_name = response.resolver_match.view_name if response.resolver_match else url
+        budget = load_query_budgets().get(view_name)
+        if budget is None:
+            self.fail(
+                f'Pas de budget de requêtes pour « {view_name} » dans {QUERY_BUDGETS_FILE} '
+                f'({recorder.count} requête(s) mesurée(s))'
+            )
+        if recorder.count > budget:
+            self.fail(
+                f'« {view_name} » : {recorder.count} requêtes SQL pour un budget de {budget}\n'
+                f'{recorder.report()}'
+            )
+        return response
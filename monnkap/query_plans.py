@@ -0,0 +1,59 @@
+"""
+Plans d'exécution des requêtes chaudes, pour les tests.
+
+`QueryPlanMixin.assertUsesIndex(queryset, index_name)` lance EXPLAIN sur le
+queryset et échoue si le plan n'utilise pas l'index attendu ou parcourt la
+table entière (Seq Scan sous PostgreSQL, SCAN sans index sous SQLite).
+
+Sous PostgreSQL, les parcours séquentiels sont désactivés le temps de
+l'EXPLAIN : sur les petites tables des tests, le planificateur les préfère
+toujours. Le test vérifie donc que l'index reste utilisable par la requête
+(index supprimé, colonne enveloppée dans une fonction, ordre des colonnes
+changé...), pas le choix du planificateur sur les volumes de production.
+"""
+import re
+
+from django.db import connections
+
+
+def _full_scan_re(vendor, table):
+    if vendor == 'postgresql':
+        return re.compile(rf'Seq Scan on "?{table}"?\b')
+    # SQLite : « SCAN table » sans index (« SCAN table USING INDEX » parcourt
+    # l'index entier, ce qui reste un parcours complet)
+    return re.compile(rf'\bSCAN "?{table}"?\b')
+
+
+def explain_queryset(queryset):
+    """EXPLAIN d'un queryset, parcours séquentiels désactivés sous PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        try:
+            return queryset.explain()
+        finally:
+            cursor.execute('RESET enable_seqscan')
+
+
+class QueryPlanMixin:
+    """
+    Pour les TestCase : vérifie qu'une requête utilise un index.
+
+        class MyTests(QueryPlanMixin, TestCase):
+            def test_expenses_by_month(self):
+                queryset = Expense.objects.filter(user=self.user, date__gte=start)
+                self.assertUsesIndex(queryset, 'expenses_user_date_idx')
+    """
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = explain_queryset(queryset)
+        vendor = connections[queryset.db].vendor
+        table = queryset.model._meta.db_table
+        message = f'\nRequête : {queryset.query}\nPlan :\n{plan}'
+        if _full_scan_re(vendor, table).search(plan):
+            self.fail(f'Parcours complet de {table} au lieu de l\'index {index_name}{message}')
+        if not re.search(rf'\b{index_name}\b', plan):
+            self.fail(f'L\'index {index_name} n\'est pas utilisé{message}')
+        return plan
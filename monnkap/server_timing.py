@@ -0,0 +1,118 @@
+"""
+En-tête Server-Timing : répartition du temps de chaque requête, visible dans
+l'onglet Réseau des outils de développement du navigateur.
+
+    Server-Timing: db;dur=12.4;desc="9 SQL", cache;dur=0.6,
+                   template;dur=31.0, view;dur=18.2, total;dur=49.2
+
+- db : requêtes SQL (execute_wrapper)
+- cache : opérations du cache à deux niveaux (monnkap/cache_backend.py),
+  requêtes SQL du cache partagé en base comprises
+- template : rendu des gabarits, requêtes SQL déclenchées par le gabarit
+  comprises (querysets évalués paresseusement)
+- view : total moins template (code Python de la vue et des middlewares)
+- total : toute la pile de middlewares
+
+Les durées sont accumulées dans une variable de contexte propre à la
+requête : `add_timing()` ne coûte rien hors d'une requête.
+
+L'en-tête révèle le détail du traitement côté serveur : en production, il
+est désactivé par défaut (SERVER_TIMING_ENABLED) et, une fois activé,
+réservé au staff (SERVER_TIMING_STAFF_ONLY), comme le profilage.
+"""
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+SERVER_TIMING_ENABLED = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+SERVER_TIMING_STAFF_ONLY = getattr(settings, 'SERVER_TIMING_STAFF_ONLY', False)
+
+_timings = ContextVar('server_timings', default=None)
+
+
+def add_timing(name, seconds):
+    """Ajoute une durée à la métrique `name` de la requête en cours."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] += seconds
+
+
+def timed(name):
+    """Décorateur : ajoute la durée de chaque appel à la métrique `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _timings.get() is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_timing(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _install_template_timing():
+    """Mesure le rendu des gabarits (appel de premier niveau uniquement)."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'server_timing', False):
+        return
+    Template.render = timed('template')(Template.render)
+    Template.render.server_timing = True
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            add_timing('db', time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """Ajoute l'en-tête Server-Timing à chaque réponse (au staff seulement si SERVER_TIMING_STAFF_ONLY)."""
+
+    def __init__(self, get_response):
+        if not SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        _install_template_timing()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = defaultdict(float)
+        token = _timings.set(timings)
+        queries = _QueryTimer()
+        started = time.perf_counter()
+        try:
+            with connections['default'].execute_wrapper(queries):
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        total = time.perf_counter() - started
+
+        # request.user est posé plus bas dans la pile (AuthenticationMiddleware)
+        user = getattr(request, 'user', None)
+        if SERVER_TIMING_STAFF_ONLY and not (user is not None and user.is_staff):
+            return response
+
+        entries = [f'db;dur={timings["db"] * 1000:.1f};desc="{queries.count} SQL"']
+        if 'cache' in timings:
+            entries.append(f'cache;dur={timings["cache"] * 1000:.1f}')
+        entries.append(f'template;dur={timings["template"] * 1000:.1f}')
+        entries.append(f'view;dur={(total - timings["template"]) * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entries)
+        return response
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,10 +62,23 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Journal des requêtes SQL lentes (voir monnkap/slow_queries.py) ;
+    # placé avant les métriques pour ne pas compter ses propres requêtes
+    'monnkap.slow_queries.SlowQueryMiddleware',
+    # Métriques Prometheus : latence par route, requêtes SQL (voir monnkap/metrics.py)
+    'monnkap.metrics.MetricsMiddleware',
+    # En-tête Server-Timing : db, cache, template, view (voir monnkap/server_timing.py)
+    'monnkap.server_timing.ServerTimingMiddleware',
+    # Comptage des requêtes SQL et N+1 (actif seulement en DEBUG, voir monnkap/query_count.py)
+    'monnkap.query_count.QueryCountMiddleware',
+    # SessionMiddleware qui regroupe les écritures de session (voir accounts/session_backend.py)
+    'accounts.middleware.SessionWriteCoalescingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware qui charge profil et portefeuille avec l'utilisateur
+    'accounts.middleware.UserContextMiddleware',
+    # ?profile=1 (cProfile) ou ?profile=folded (flamegraph) pour le staff (voir monnkap/profiling.py)
+    'monnkap.profiling.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # Django-allauth
@@ -122,6 +136,22 @@ DATABASES = {
 }
 
 
+# Password hashing
+# Argon2 réglé (accounts/hashers.py) si argon2-cffi est installé, sinon PBKDF2.
+# Les anciens hachages restent valides et sont convertis à la connexion.
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if importlib.util.find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, 'accounts.hashers.TunedArgon2PasswordHasher')
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 19456  # Kio (19 Mio)
+PASSWORD_ARGON2_PARALLELISM = 1
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -217,7 +247,14 @@ SESSION_COOKIE_AGE = 86400  # 24 heures
 SESSION_COOKIE_SECURE = False  # Mettre True en production avec HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Protection XSS
 SESSION_COOKIE_SAMESITE = 'Lax'  # Protection CSRF
-SESSION_SAVE_EVERY_REQUEST = True
+# Expiration glissante sans écriture à chaque requête : la session n'est
+# réenregistrée que si elle change ou si son expiration a avancé de plus de
+# SESSION_REFRESH_FRACTION × SESSION_COOKIE_AGE (voir accounts/session_backend.py)
+SESSION_ENGINE = 'accounts.session_backend'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = 0.01  # ~15 min pour 24 h
+SESSION_L1_TIMEOUT = 30  # secondes dans le cache local de chaque processus
+SESSION_L1_MAX_ENTRIES = 10000
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
 # Cookie Security
@@ -279,3 +316,124 @@ ACCOUNT_SESSION_REMEMBER = True
 
 # Rate Limiting (à implémenter avec django-ratelimit)
 # Pour limiter les tentatives de connexion et autres actions sensibles
+
+# ==================== GROUPES ====================
+
+# Durée de conservation (secondes) des adhésions en cache (voir groups/access.py)
+GROUP_MEMBERSHIP_CACHE_TIMEOUT = 60
+
+# Diffusion des événements en direct des groupes (voir groups/live.py)
+# LocalEventBackend : en mémoire, un seul processus (développement)
+GROUP_EVENTS_BACKEND = 'groups.live.LocalEventBackend'
+
+# Intervalle (secondes) des battements de cœur du flux SSE
+GROUP_EVENTS_HEARTBEAT = 15
+# Adresse du processus d'événements (monnkap/asgi_events.py) s'il n'est pas
+# servi sur le même domaine ; vide : chemin relatif (proxy ou même serveur)
+GROUP_EVENTS_URL = ''
+GROUP_EVENTS_TOKEN_MAX_AGE = 24 * 3600  # secondes de validité du jeton du flux
+
+# Recherche d'utilisateurs (voir groups/search.py)
+USER_SEARCH_CACHE_TIMEOUT = 30  # secondes
+USER_SEARCH_RATE = '60/m'  # requêtes par utilisateur
+
+# ==================== OUTBOX DES EMAILS ====================
+
+# Les emails transactionnels sont envoyés par `python manage.py send_outbox_emails`
+# (voir accounts/outbox.py). Backend utilisé par le worker (défaut : EMAIL_BACKEND) ;
+# 'accounts.email_backend.FakeEmailBackend' permet de tester hors ligne.
+EMAIL_OUTBOX_BACKEND = None
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_BASE_DELAY = 30  # secondes, doublé à chaque tentative
+
+# API Resend (voir accounts/email_backend.py et accounts/resend_stub.py)
+RESEND_API_URL = os.environ.get('RESEND_API_URL', 'https://api.resend.com')
+RESEND_MAX_CONCURRENCY = 4  # requêtes simultanées (taille du pool de connexions)
+RESEND_MAX_RETRIES = 3
+RESEND_REQUESTS_PER_SECOND = 2  # quota par défaut d'un compte Resend
+
+# ==================== ALERTES ====================
+
+# Alertes de solde bas et de budget (voir accounts/alerts.py). Le seuil de solde
+# bas se règle par utilisateur dans le profil ; valeur utilisée sans profil :
+ALERT_LOW_BALANCE_DEFAULT_THRESHOLD = 50000  # FCFA
+ALERT_LOW_BALANCE_REARM_MARGIN = 0.1  # le solde doit repasser 10 % au-dessus du seuil
+# Délai minimal (secondes) entre deux alertes du même type après un réarmement
+ALERT_COOLDOWNS = {
+    'low_balance': 24 * 3600,
+    'budget': 24 * 3600,
+}
+
+# ==================== AVATARS ====================
+
+# Au-delà de 256 Ko, un fichier envoyé est écrit sur disque au fil de la
+# réception (TemporaryFileUploadHandler) au lieu d'être gardé en mémoire
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Miniatures carrées générées pour chaque avatar (voir accounts/avatars.py)
+AVATAR_THUMBNAIL_SIZES = (64, 256)  # pixels
+AVATAR_WEBP_QUALITY = 80
+AVATAR_JPEG_QUALITY = 82
+
+# ==================== REQUÊTES SQL ====================
+
+# Comptage des requêtes SQL par requête HTTP et détection des N+1
+# (voir monnkap/query_count.py). Budgets par nom d'URL : query_budgets.json
+QUERY_COUNT_ENABLED = None  # None : suit DEBUG au démarrage (désactivé sous le test runner)
+QUERY_COUNT_N_PLUS_ONE_THRESHOLD = 5  # même requête répétée depuis le même endroit
+QUERY_BUDGETS_FILE = BASE_DIR / 'query_budgets.json'
+
+# ==================== MÉTRIQUES ====================
+
+# Métriques Prometheus sur /metrics (voir monnkap/metrics.py). Accès : staff
+# connecté, ou « Authorization: Bearer <METRICS_TOKEN> » si le jeton est défini
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# ==================== PROFILAGE ====================
+
+# En-tête Server-Timing sur chaque réponse (voir monnkap/server_timing.py)
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_STAFF_ONLY = False  # True : en-tête envoyé au staff seulement
+# Profilage d'une requête par le staff : ?profile=1 ou ?profile=folded (voir monnkap/profiling.py)
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_INTERVAL = 0.001  # secondes entre deux échantillons (mode folded)
+
+# ==================== REQUÊTES LENTES ====================
+
+# Journal des requêtes SQL lentes, agrégées par empreinte dans
+# accounts.SlowQuery (voir monnkap/slow_queries.py et `manage.py slow_queries`)
+SLOW_QUERY_ENABLED = True
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_EXPLAIN_INTERVAL = 3600  # secondes entre deux plans d'une même requête (slow_queries --capture-plans)
+
+# ==================== REQUÊTES CONDITIONNELLES ====================
+
+# ETag et 304 pour les pages personnelles et de groupe, à partir des versions
+# de données des utilisateurs et des groupes (voir monnkap/conditional.py)
+CONDITIONAL_PAGES_ENABLED = True
+# Identifiant du déploiement : les gabarits changent, les ETags aussi
+CONDITIONAL_PAGES_RELEASE = os.environ.get('RENDER_GIT_COMMIT', '')
+
+# ==================== BUNDLES CSS / JS ====================
+
+# Bundles minifiés de la mise en page (`manage.py build_assets`, voir
+# monnkap/assets.py) ; désactivés ou non construits : fichiers sources un par un
+ASSET_BUNDLES_ENABLED = not DEBUG
+
+# ==================== SERVICE WORKER ====================
+
+# Limites des caches runtime du service worker (voir monnkap/pwa.py et static/sw.js) :
+# pages personnelles (par utilisateur) et fichiers statiques hors précache
+PWA_PAGES_CACHE_MAX_ENTRIES = 25
+PWA_PAGES_CACHE_MAX_AGE = 7 * 24 * 3600  # secondes
+PWA_STATIC_CACHE_MAX_ENTRIES = 100
+PWA_STATIC_CACHE_MAX_AGE = 30 * 24 * 3600  # secondes sans utilisation
+
+# ==================== SYNCHRONISATION PWA ====================
+
+# API de synchronisation et saisie hors ligne (voir monnkap/sync.py)
+SYNC_PAGE_SIZE = 500  # changements par réponse
+SYNC_MAX_BATCH = 100  # opérations par envoi
+SYNC_SETTLE_SECONDS = 5  # changements plus récents renvoyés au passage suivant
+SYNC_RETENTION_DAYS = 30  # suppressions et clés d'idempotence (`manage.py prune_sync_changes`)
+SYNC_PUSH_RATE = '30/m'
@@ -9,6 +9,8 @@ import os
 
 # SÉCURITÉ
 DEBUG = config('DEBUG', default=False, cast=bool)
+# Comptage des requêtes SQL (voir monnkap/query_count.py) : jamais en production
+QUERY_COUNT_ENABLED = False
 SECRET_KEY = config('SECRET_KEY')
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
 
@@ -26,6 +28,8 @@ MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATIC_URL = '/static/'
+# Bundles construits par build.sh (DEBUG redéfini ci-dessus)
+ASSET_BUNDLES_ENABLED = config('ASSET_BUNDLES_ENABLED', default=not DEBUG, cast=bool)
 
 # Fichiers média
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -74,19 +78,49 @@ LOGGING = {
             'level': config('DJANGO_LOG_LEVEL', default='INFO'),
             'propagate': False,
         },
+        # Requêtes SQL lentes (voir monnkap/slow_queries.py)
+        'monnkap.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
-# Cache (optionnel, améliore les performances)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=int)
+
+# En-tête Server-Timing (voir monnkap/server_timing.py) : désactivé par défaut,
+# réservé au staff une fois activé
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=False, cast=bool)
+SERVER_TIMING_STAFF_ONLY = config('SERVER_TIMING_STAFF_ONLY', default=True, cast=bool)
+
+# Cache à deux niveaux : mémoire locale de chaque worker devant le cache
+# partagé en base (voir monnkap/cache_backend.py). Les compteurs (limites de
+# débit) vont toujours directement au cache partagé.
 CACHES = {
     'default': {
+        'BACKEND': 'monnkap.cache_backend.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_TIMEOUT': config('CACHE_L1_TIMEOUT', default=5, cast=int),  # secondes
+            'L1_MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
+    'shared': {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'cache_table',
-    }
+    },
 }
 
+# Événements en direct des groupes : diffusion entre workers via PostgreSQL LISTEN/NOTIFY
+GROUP_EVENTS_BACKEND = config(
+    'GROUP_EVENTS_BACKEND', default='groups.live.PostgresEventBackend'
+)
+# Flux SSE servi par le processus `events` du Procfile (ASGI), le site restant en WSGI
+GROUP_EVENTS_URL = config('GROUP_EVENTS_URL', default='')
+
 # Session
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_ENGINE = 'accounts.session_backend'  # base + cache local, écritures regroupées
 SESSION_COOKIE_AGE = 1209600  # 2 semaines
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
@@ -103,3 +137,15 @@ AXES_ENABLED = True
 AXES_FAILURE_LIMIT = 5
 AXES_COOLOFF_TIME = 1  # heure
 AXES_RESET_ON_SUCCESS = True
+
+# ==================== MÉTRIQUES ====================
+
+# Mode multiprocessus de prometheus_client : un fichier par worker gunicorn
+# dans ce répertoire, agrégés par /metrics. Doit être défini avant le premier
+# import de prometheus_client ; gunicorn.conf.py le vide au démarrage.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    config('PROMETHEUS_MULTIPROC_DIR', default='/tmp/monnkap-metrics'),
+)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
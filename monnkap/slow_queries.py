@@ -0,0 +1,217 @@
+"""
+Journal des requêtes SQL lentes.
+
+Chaque requête SQL plus longue que SLOW_QUERY_THRESHOLD_MS est :
+- journalisée (logger « monnkap.slow_queries ») avec la vue et l'endroit du
+  code ou du gabarit qui l'a déclenchée ;
+- agrégée en base (accounts.SlowQuery) par empreinte : forme normalisée de
+  la requête (voir monnkap/query_count.normalize_sql), nombre, durées
+  cumulée et maximale ;
+- pour la plus lente de la requête HTTP, quand elle bat le maximum connu ou
+  que son plan a plus de SLOW_QUERY_EXPLAIN_INTERVAL secondes (limite par
+  empreinte) : requête notée avec ses paramètres liés (SlowQuery.plan_sql).
+
+Le plan d'exécution n'est jamais capturé pendant la requête HTTP (EXPLAIN
+ANALYZE réexécuterait une requête déjà lente) : `capture_pending_plans()`,
+appelée par `manage.py slow_queries --capture-plans` (tâche planifiée),
+traite les requêtes notées. PostgreSQL : EXPLAIN (ANALYZE, BUFFERS) pour un
+SELECT (la requête est réexécutée), EXPLAIN simple sinon. SQLite : EXPLAIN
+QUERY PLAN.
+
+Les requêtes de l'enregistrement lui-même ne sont pas mesurées : le
+middleware est placé avant les middlewares de métriques.
+
+    python manage.py slow_queries                    # requêtes les plus coûteuses
+    python manage.py slow_queries --capture-plans    # plans en attente
+"""
+import hashlib
+import logging
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .query_count import code_location, normalize_sql
+
+logger = logging.getLogger(__name__)
+
+
+SLOW_QUERY_ENABLED = getattr(settings, 'SLOW_QUERY_ENABLED', True)
+SLOW_QUERY_THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+SLOW_QUERY_EXPLAIN_INTERVAL = getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 3600)  # secondes
+
+
+def fingerprint(sql):
+    """Empreinte d'une requête : SHA-1 de sa forme normalisée."""
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()
+
+
+def explain(sql, params=None, using='default'):
+    """Plan d'exécution d'une requête, en texte ('' si indisponible)."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        # ANALYZE réexécute la requête : réservé aux lectures
+        analyze = sql.lstrip()[:6].upper() == 'SELECT'
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        logger.info(f"EXPLAIN impossible : {e}")
+        return ''
+
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail) : arbre indenté selon le parent
+        depths = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depths[node_id] = depths.get(parent, -1) + 1
+            lines.append('  ' * depths[node_id] + detail)
+        return '\n'.join(lines)
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+class _SlowQueryCollector:
+    """execute_wrapper : garde les requêtes plus lentes que le seuil."""
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold_ms:
+                self.queries.append({
+                    'sql': sql,
+                    # executemany : pas de plan (une liste de paramètres)
+                    'bound_sql': None if many else _bound_sql(context, sql, params),
+                    'duration_ms': duration_ms,
+                    'location': code_location(sys._getframe(1)),
+                })
+
+
+def _bound_sql(context, sql, params):
+    """Requête exécutée, paramètres liés (psycopg2 : texte envoyé au serveur)."""
+    try:
+        return context['connection'].ops.last_executed_query(context['cursor'], sql, params)
+    except Exception:
+        return None
+
+
+def record_slow_queries(queries, view=''):
+    """Agrège les requêtes lentes et note la plus lente pour la capture de son plan."""
+    from accounts.models import SlowQuery
+
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=SLOW_QUERY_EXPLAIN_INTERVAL)
+    plan_noted = False
+
+    for query in sorted(queries, key=lambda q: q['duration_ms'], reverse=True):
+        duration_ms = query['duration_ms']
+        key = fingerprint(query['sql'])
+        logger.warning(
+            f"Requête lente {duration_ms:.0f} ms ({view or '?'}) {query['location']} : "
+            f"{normalize_sql(query['sql'])[:500]}"
+        )
+        # Une requête notée par requête HTTP, la plus lente
+        wants_plan = not plan_noted and bool(query['bound_sql'])
+
+        known = SlowQuery.objects.filter(fingerprint=key).values('max_ms', 'explained_at').first()
+        if known is None:
+            try:
+                with transaction.atomic():
+                    SlowQuery.objects.create(
+                        fingerprint=key, sql=normalize_sql(query['sql']), count=1,
+                        total_ms=duration_ms, max_ms=duration_ms, view=view,
+                        location=query['location'], last_seen=now,
+                        plan_sql=query['bound_sql'] if wants_plan else '',
+                    )
+                plan_noted = plan_noted or wants_plan
+            except IntegrityError:
+                # Créée entre-temps par un autre worker
+                known = {'max_ms': duration_ms, 'explained_at': now}
+        if known is not None:
+            is_new_max = duration_ms > known['max_ms']
+            is_stale = known['explained_at'] is None or known['explained_at'] < stale_before
+            updates = {
+                'count': F('count') + 1,
+                'total_ms': F('total_ms') + duration_ms,
+                'max_ms': Greatest('max_ms', Value(duration_ms)),
+                'last_seen': now,
+            }
+            if is_new_max:
+                # Vue et origine de l'exécution la plus lente
+                updates.update(view=view, location=query['location'])
+            if wants_plan and (is_new_max or is_stale):
+                updates['plan_sql'] = query['bound_sql']
+                plan_noted = True
+            SlowQuery.objects.filter(fingerprint=key).update(**updates)
+
+
+def capture_pending_plans(limit=None, using='default'):
+    """
+    Capture les plans des requêtes notées (hors requête HTTP), des plus
+    lentes aux moins lentes.
+
+    Returns:
+        (plans capturés, échecs)
+    """
+    from accounts.models import SlowQuery
+
+    pending = SlowQuery.objects.exclude(plan_sql='').order_by('-max_ms').values_list('pk', 'plan_sql')
+    captured = failed = 0
+    for pk, plan_sql in pending[:limit]:
+        plan = explain(plan_sql, using=using)
+        updates = {'plan_sql': '', 'explained_at': timezone.now()}
+        if plan:
+            updates['explain'] = plan
+            captured += 1
+        else:
+            # Échec : pas de nouvel essai avant SLOW_QUERY_EXPLAIN_INTERVAL
+            failed += 1
+        # Requête notée entre-temps (plus lente) : gardée pour le prochain passage
+        SlowQuery.objects.filter(pk=pk, plan_sql=plan_sql).update(**updates)
+    return captured, failed
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else ''
+
+
+class SlowQueryMiddleware:
+    """Journalise et agrège les requêtes SQL lentes de chaque requête HTTP."""
+
+    def __init__(self, get_response):
+        if not SLOW_QUERY_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = _SlowQueryCollector(SLOW_QUERY_THRESHOLD_MS)
+        with connections['default'].execute_wrapper(collector):
+            response = self.get_response(request)
+
+        if collector.queries:
+            try:
+                record_slow_queries(collector.queries, view=_view_name(request))
+            except DatabaseError:
+                # Le journal ne doit jamais faire échouer la requête
+                logger.exception("Enregistrement des requêtes lentes impossible")
+        return response
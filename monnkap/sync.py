@@ -0,0 +1,399 @@
+"""
+Synchronisation de la PWA : changements depuis un curseur et envoi groupé
+des créations faites hors ligne.
+
+    GET  /api/sync/changes/?cursor=...   dépenses, transactions, objectifs et
+                                         catégories modifiés ou supprimés
+    POST /api/sync/push/                 {"partition", "operations": [{"key", "type", "data"}]}
+
+Journal des changements (accounts.SyncChange) : les signaux post_save /
+post_delete des modèles synchronisés remplacent la ligne de l'objet par une
+nouvelle, d'identifiant plus grand. Le curseur est le dernier identifiant vu
+(et sa date d'émission) : une synchronisation depuis le curseur vide renvoie
+toutes les données, la suivante seulement ce qui a changé. Les lignes des
+SYNC_SETTLE_SECONDS dernières secondes sont renvoyées au passage suivant :
+une transaction SQL encore ouverte peut valider un identifiant plus petit.
+Dans `collect_changes()` (envoi groupé), les lignes sont regroupées et
+écrites en fin de lot : une suppression et une insertion pour tout le lot.
+
+Les suppressions (lignes « deleted ») sont purgées après
+SYNC_RETENTION_DAYS (`manage.py prune_sync_changes`) : un curseur plus
+ancien renvoie « reset » et tout est renvoyé depuis le début.
+
+Envoi : chaque opération porte une clé d'idempotence (accounts.SyncOperation).
+Le lot est validé avec les formulaires des vues (ExpenseForm,
+WalletTransactionForm) et appliqué dans une seule transaction ; une
+opération déjà appliquée est signalée « duplicate » sans être rejouée, une
+opération invalide « rejected » avec ses erreurs. « partition » (facultatif,
+voir monnkap/pwa.py) est celle de l'utilisateur qui a saisi le lot : un lot
+saisi sous un autre compte est refusé (403) et reste dans la file du client.
+"""
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET, require_POST
+from django_ratelimit.decorators import ratelimit
+
+
+SYNC_PAGE_SIZE = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+SYNC_MAX_BATCH = getattr(settings, 'SYNC_MAX_BATCH', 100)
+SYNC_SETTLE_SECONDS = getattr(settings, 'SYNC_SETTLE_SECONDS', 5)
+SYNC_RETENTION_DAYS = getattr(settings, 'SYNC_RETENTION_DAYS', 30)
+SYNC_PUSH_RATE = getattr(settings, 'SYNC_PUSH_RATE', '30/m')
+
+KINDS = ('expense', 'transaction', 'goal', 'category')
+
+_pending_changes = ContextVar('sync_pending_changes', default=None)
+
+
+# ==================== JOURNAL DES CHANGEMENTS ====================
+
+def record_change(kind, object_id, user_id, deleted=False):
+    """
+    Remplace la ligne de l'objet dans le journal (nouvel identifiant) ;
+    dans collect_changes(), seulement à la fin du lot.
+    """
+    pending = _pending_changes.get()
+    if pending is not None:
+        # Dernier changement de l'objet dans le lot
+        pending[(kind, object_id)] = (user_id, deleted)
+        return
+    _write_changes({(kind, object_id): (user_id, deleted)})
+
+
+def _write_changes(changes):
+    """Remplace les lignes des objets donnés : une suppression, une insertion."""
+    from accounts.models import SyncChange
+
+    ids_by_kind = {}
+    for kind, object_id in changes:
+        ids_by_kind.setdefault(kind, []).append(object_id)
+    SyncChange.objects.filter(
+        reduce(or_, (Q(kind=kind, object_id__in=ids) for kind, ids in ids_by_kind.items()))
+    ).delete()
+    SyncChange.objects.bulk_create([
+        SyncChange(kind=kind, object_id=object_id, user_id=user_id, deleted=deleted)
+        for (kind, object_id), (user_id, deleted) in changes.items()
+    ])
+
+
+@contextmanager
+def collect_changes():
+    """
+    Regroupe les changements enregistrés dans le bloc et les écrit à sa
+    sortie (à placer dans la transaction du lot). Sans effet si un bloc
+    englobant regroupe déjà.
+    """
+    if _pending_changes.get() is not None:
+        yield
+        return
+    pending = {}
+    token = _pending_changes.set(pending)
+    try:
+        yield
+    finally:
+        _pending_changes.reset(token)
+    # Sortie normale seulement : après une exception, la transaction du lot est annulée
+    if pending:
+        _write_changes(pending)
+
+
+def _is_user_deletion(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is User
+    return isinstance(origin, User)
+
+
+def record_signal_change(kind, instance, signal, user_id, origin=None):
+    """Pour les receivers post_save / post_delete des modèles synchronisés."""
+    deleted = signal is post_delete
+    # Suppression du compte : ses lignes du journal partent avec lui
+    if deleted and _is_user_deletion(origin):
+        return
+    record_change(kind, instance.pk, user_id, deleted)
+
+
+# ==================== CHANGEMENTS DEPUIS UN CURSEUR ====================
+
+def _decimal(value):
+    return str(value) if value is not None else None
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _serialize_expense(expense):
+    return {
+        'id': expense.pk,
+        'amount': _decimal(expense.amount),
+        'description': expense.description,
+        'notes': expense.notes or '',
+        'date': _date(expense.date),
+        'category_id': expense.category_id,
+        'created_at': _date(expense.created_at),
+        'updated_at': _date(expense.updated_at),
+    }
+
+
+def _serialize_transaction(wallet_transaction):
+    return {
+        'id': wallet_transaction.pk,
+        'type': wallet_transaction.transaction_type,
+        'amount': _decimal(wallet_transaction.amount),
+        'description': wallet_transaction.description,
+        'date': _date(wallet_transaction.date),
+        'category_id': wallet_transaction.category_id,
+        'expense_id': wallet_transaction.expense_id,
+        'created_at': _date(wallet_transaction.created_at),
+    }
+
+
+def _serialize_goal(goal):
+    return {
+        'id': goal.pk,
+        'title': goal.title,
+        'description': goal.description or '',
+        'target_amount': _decimal(goal.target_amount),
+        'current_amount': _decimal(goal.current_amount),
+        'deadline': _date(goal.deadline),
+        'status': goal.status,
+        'updated_at': _date(goal.updated_at),
+    }
+
+
+def _serialize_category(category):
+    return {
+        'id': category.pk,
+        'name': category.name,
+        'icon': category.icon,
+        'color': category.color,
+    }
+
+
+def _objects(kind, user, ids):
+    """Objets de l'utilisateur parmi `ids`, sérialisés."""
+    from accounts.models import WalletTransaction
+    from expenses.models import Category, Expense
+    from goals.models import Goal
+
+    if kind == 'expense':
+        queryset, serialize = Expense.objects.filter(user=user), _serialize_expense
+    elif kind == 'transaction':
+        queryset, serialize = WalletTransaction.objects.filter(wallet__user=user), _serialize_transaction
+    elif kind == 'goal':
+        queryset, serialize = Goal.objects.filter(user=user), _serialize_goal
+    else:
+        queryset, serialize = Category.objects.all(), _serialize_category
+    return [serialize(obj) for obj in queryset.filter(pk__in=ids).order_by('pk')]
+
+
+def encode_cursor(change_id, issued_at):
+    return f'{change_id}.{int(issued_at)}'
+
+
+def parse_cursor(value):
+    """(dernier identifiant, date d'émission) ou None si absent ou invalide."""
+    try:
+        change_id, issued_at = (int(part) for part in (value or '').split('.'))
+    except ValueError:
+        return None
+    return change_id, issued_at
+
+
+def get_changes(user, cursor=None, limit=SYNC_PAGE_SIZE):
+    """
+    Changements visibles par `user` après le curseur.
+
+    Returns:
+        dict: changes (objets par type), deleted (identifiants par type),
+        cursor (à renvoyer au prochain appel), has_more, reset (le client
+        doit effacer ses données avant d'appliquer ce lot)
+    """
+    from accounts.models import SyncChange
+
+    now = time.time()
+    parsed = parse_cursor(cursor)
+    reset = parsed is None or parsed[1] < now - SYNC_RETENTION_DAYS * 86400
+    after = 0 if reset else parsed[0]
+
+    settled = timezone.now() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    rows = list(
+        SyncChange.objects
+        .filter(Q(user=user) | Q(user__isnull=True), id__gt=after, changed_at__lte=settled)
+        .order_by('id')
+        .values_list('id', 'kind', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    updated = {kind: [] for kind in KINDS}
+    deleted = {kind: [] for kind in KINDS}
+    for _, kind, object_id, is_deleted in rows:
+        (deleted if is_deleted else updated)[kind].append(object_id)
+
+    return {
+        'changes': {kind: _objects(kind, user, ids) if ids else [] for kind, ids in updated.items()},
+        'deleted': deleted,
+        # Tout ce qui précède `settled` a été vu : la date d'émission repart de là
+        'cursor': encode_cursor(rows[-1][0] if rows else after, settled.timestamp()),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+# ==================== ENVOI GROUPÉ ====================
+
+def _create_expense(user, data):
+    from expenses.forms import ExpenseForm
+
+    form = ExpenseForm(data)
+    if not form.is_valid():
+        return None, form.errors.get_json_data()
+    expense = form.save(commit=False)
+    expense.user = user
+    expense.save()
+    return _serialize_expense(expense), None
+
+
+def _create_transaction(user, data):
+    from accounts.wallet_forms import WalletTransactionForm
+    from accounts.wallet_models import Wallet
+    from expenses.models import Expense
+
+    form = WalletTransactionForm(data)
+    if not form.is_valid():
+        return None, form.errors.get_json_data()
+    wallet_transaction = form.save(commit=False)
+    if wallet_transaction.transaction_type == 'expense':
+        # Sortie : la dépense liée crée la transaction (signal de Expense),
+        # même résultat que add_transaction_view
+        expense = Expense.objects.create(
+            user=user,
+            amount=wallet_transaction.amount,
+            category=wallet_transaction.category,
+            description=wallet_transaction.description,
+            date=wallet_transaction.date,
+        )
+        wallet_transaction = expense.wallet_transaction
+    else:
+        wallet_transaction.wallet, _ = Wallet.objects.get_or_create(user=user)
+        wallet_transaction.save()
+    return _serialize_transaction(wallet_transaction), None
+
+
+OPERATIONS = {
+    'expense': _create_expense,
+    'transaction': _create_transaction,
+}
+
+
+def apply_operations(user, operations):
+    """
+    Applique un lot d'opérations dans une seule transaction.
+
+    Raises:
+        IntegrityError: lot envoyé deux fois en parallèle (à renvoyer plus tard)
+    """
+    from accounts.models import SyncOperation
+
+    keys = [op.get('key') for op in operations if isinstance(op, dict)]
+    applied = dict(
+        SyncOperation.objects.filter(user=user, key__in=[key for key in keys if isinstance(key, str)])
+        .values_list('key', 'object_id')
+    )
+
+    results = []
+    created = []
+    with transaction.atomic(), collect_changes():
+        for op in operations:
+            op = op if isinstance(op, dict) else {}
+            key, kind, data = op.get('key'), op.get('type'), op.get('data')
+            if not isinstance(key, str) or not 0 < len(key) <= 64:
+                results.append({'key': key, 'status': 'rejected', 'errors': {'key': 'Clé d\'idempotence invalide'}})
+                continue
+            if key in applied:
+                results.append({'key': key, 'status': 'duplicate', 'type': kind, 'id': applied[key]})
+                continue
+            if kind not in OPERATIONS or not isinstance(data, dict):
+                results.append({'key': key, 'status': 'rejected', 'errors': {'type': 'Opération inconnue'}})
+                continue
+
+            obj, errors = OPERATIONS[kind](user, data)
+            if errors is not None:
+                results.append({'key': key, 'status': 'rejected', 'type': kind, 'errors': errors})
+                continue
+            created.append(SyncOperation(user=user, key=key, kind=kind, object_id=obj['id']))
+            applied[key] = obj['id']
+            results.append({'key': key, 'status': 'applied', 'type': kind, 'id': obj['id'], 'object': obj})
+        SyncOperation.objects.bulk_create(created)
+    return results
+
+
+def prune_sync_log(now=None):
+    """Supprime les suppressions et clés d'idempotence plus anciennes que la rétention."""
+    from accounts.models import SyncChange, SyncOperation
+
+    before = (now or timezone.now()) - timedelta(days=SYNC_RETENTION_DAYS)
+    changes, _ = SyncChange.objects.filter(deleted=True, changed_at__lt=before).delete()
+    operations, _ = SyncOperation.objects.filter(created_at__lt=before).delete()
+    return changes, operations
+
+
+# ==================== API ====================
+
+@login_required
+@require_GET
+def sync_changes_api(request):
+    """Changements depuis `cursor` (tout si absent), par pages de `limit`."""
+    try:
+        limit = min(max(int(request.GET.get('limit', SYNC_PAGE_SIZE)), 1), SYNC_PAGE_SIZE)
+    except ValueError:
+        limit = SYNC_PAGE_SIZE
+    return JsonResponse(get_changes(request.user, request.GET.get('cursor'), limit))
+
+
+@login_required
+@require_POST
+@ratelimit(key='user', rate=SYNC_PUSH_RATE, method='POST', block=False)
+def sync_push_api(request):
+    """Lot d'opérations créées hors ligne (voir apply_operations)."""
+    if getattr(request, 'limited', False):
+        return JsonResponse({'error': 'Trop de synchronisations, veuillez patienter.'}, status=429)
+
+    from .pwa import cache_partition
+
+    try:
+        payload = json.loads(request.body)
+        operations, partition = payload.get('operations'), payload.get('partition')
+    except (ValueError, AttributeError):
+        operations = partition = None
+    if not isinstance(operations, list) or len(operations) > SYNC_MAX_BATCH:
+        return JsonResponse(
+            {'error': f'Corps attendu : {{"operations": [...]}}, {SYNC_MAX_BATCH} opérations au plus.'},
+            status=400,
+        )
+
+    # Saisies d'un autre compte sur ce navigateur : conservées par le client
+    if partition is not None and not constant_time_compare(str(partition), cache_partition(request.user.pk)):
+        return JsonResponse({'error': 'Opérations saisies par un autre utilisateur.'}, status=403)
+
+    try:
+        results = apply_operations(request.user, operations)
+    except IntegrityError:
+        return JsonResponse({'error': 'Lot en cours de traitement, réessayez.'}, status=409)
+    return JsonResponse({'results': results})
@@ -15,21 +15,34 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
+from accounts.views import serve_avatar_view
+from monnkap.metrics import metrics_view
+from monnkap.pwa import service_worker_view
+from monnkap.sync import sync_changes_api, sync_push_api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', TemplateView.as_view(template_name='landing.html'), name='landing'),
     path('offline/', TemplateView.as_view(template_name='offline.html'), name='offline'),
+    # Service worker à la racine : sa portée couvre tout le site
+    path('sw.js', service_worker_view, name='service_worker'),
+    # Synchronisation de la PWA : changements depuis un curseur, envoi des saisies hors ligne
+    path('api/sync/changes/', sync_changes_api, name='sync_changes'),
+    path('api/sync/push/', sync_push_api, name='sync_push'),
     path('dashboard/', include('dashboard.urls')),
     path('accounts/', include('accounts.urls')),
     path('accounts/', include('allauth.urls')),  # Django-allauth URLs
     path('expenses/', include('expenses.urls')),
     path('goals/', include('goals.urls')),
     path('groups/', include('groups.urls')),
+    # Métriques Prometheus (staff ou jeton METRICS_TOKEN)
+    path('metrics', metrics_view, name='metrics'),
+    # Avatars adressés par contenu, servis avec des en-têtes de cache immuables
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<name>avatars/.+)$', serve_avatar_view, name='avatar'),
 ]
 
 # Pages d'erreur personnalisées
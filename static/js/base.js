@@ -0,0 +1,517 @@
+/**
+ * MonNkap - Scripts de la mise en page commune (templates/base.html)
+ * Thème, page loader, lien actif de la navigation, PWA (service worker,
+ * installation) et modal de soutien.
+ *
+ * Les valeurs du serveur sont lues sur <html> : data-server-theme (thème du
+ * profil) et data-profile-url.
+ */
+
+// ==================== GESTION DU THÈME (TOGGLE UNIQUEMENT) ====================
+
+// Fonction helper pour récupérer le thème local
+function getLocalTheme() {
+    try {
+        return localStorage.getItem('monnkap-theme');
+    } catch(e) {
+        return null;
+    }
+}
+
+// Toggle du thème
+document.addEventListener('DOMContentLoaded', function() {
+    const themeToggle = document.getElementById('themeToggle');
+
+    if (themeToggle) {
+        themeToggle.addEventListener('click', function() {
+            const isDark = document.documentElement.getAttribute('data-theme') === 'dark';
+            const newTheme = isDark ? 'light' : 'dark';
+
+            // Appliquer le thème
+            if (newTheme === 'dark') {
+                document.documentElement.setAttribute('data-theme', 'dark');
+            } else {
+                document.documentElement.removeAttribute('data-theme');
+            }
+
+            // Sauvegarder dans localStorage
+            try {
+                localStorage.setItem('monnkap-theme', newTheme);
+            } catch(e) {}
+
+            // Animation du toggle
+            this.style.transform = 'rotate(360deg)';
+            setTimeout(() => {
+                this.style.transform = 'rotate(0deg)';
+            }, 300);
+
+            // Afficher un message indiquant que c'est temporaire
+            const toastHtml = `
+                <div class="toast-container position-fixed top-0 end-0 p-3" style="z-index: 11000;">
+                    <div class="toast show" role="alert" style="min-width: 300px;">
+                        <div class="toast-header bg-primary text-white">
+                            <i class="bi bi-info-circle me-2"></i>
+                            <strong class="me-auto">Thème modifié</strong>
+                            <button type="button" class="btn-close btn-close-white" data-bs-dismiss="toast"></button>
+                        </div>
+                        <div class="toast-body">
+                            Thème changé temporairement. Pour sauvegarder définitivement, modifiez votre 
+                            <a href="${document.documentElement.dataset.profileUrl}" class="alert-link">profil</a>.
+                        </div>
+                    </div>
+                </div>
+            `;
+
+            // Ajouter le toast s'il n'existe pas déjà
+            if (!document.querySelector('.toast-container')) {
+                document.body.insertAdjacentHTML('beforeend', toastHtml);
+
+                // Auto-fermer après 5 secondes
+                setTimeout(() => {
+                    const toastContainer = document.querySelector('.toast-container');
+                    if (toastContainer) {
+                        toastContainer.remove();
+                    }
+                }, 5000);
+            }
+        });
+    }
+});
+
+// Détecter les changements de préférence système (seulement en mode auto)
+const serverTheme = document.documentElement.dataset.serverTheme || 'auto';
+if (window.matchMedia && serverTheme === 'auto') {
+    window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', e => {
+        const localTheme = getLocalTheme();
+        if (!localTheme) {
+            document.documentElement.setAttribute('data-theme', e.matches ? 'dark' : 'light');
+        }
+    });
+}
+
+// ==================== PAGE LOADER ====================
+
+// Page loader au chargement initial
+window.addEventListener('load', function() {
+    const pageLoader = document.getElementById('pageLoader');
+    if (pageLoader) {
+        setTimeout(() => {
+            pageLoader.classList.remove('active');
+        }, 500);
+    }
+});
+
+// Activer le page loader au démarrage
+document.addEventListener('DOMContentLoaded', function() {
+    const pageLoader = document.getElementById('pageLoader');
+    if (pageLoader) {
+        pageLoader.classList.add('active');
+    }
+});
+
+// Loader pour les formulaires de connexion/inscription
+const loginForm = document.querySelector('form');
+const loginBtn = document.getElementById('loginBtn') || document.getElementById('registerBtn');
+
+if (loginForm && loginBtn) {
+    loginForm.addEventListener('submit', function(e) {
+        // Vérifier que le formulaire est valide avant d'afficher le loader
+        if (loginForm.checkValidity()) {
+            loginBtn.classList.add('loading');
+            loginBtn.disabled = true;
+        }
+    });
+}
+
+// Smooth scroll pour les ancres
+document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+    anchor.addEventListener('click', function (e) {
+        const href = this.getAttribute('href');
+        if (href !== '#' && href !== '#!') {
+            e.preventDefault();
+            const target = document.querySelector(href);
+            if (target) {
+                target.scrollIntoView({
+                    behavior: 'smooth',
+                    block: 'start'
+                });
+            }
+        }
+    });
+});
+
+// Animation des cartes au scroll (si IntersectionObserver est disponible)
+if ('IntersectionObserver' in window) {
+    const cards = document.querySelectorAll('.card, .feature-card, .stat-card');
+
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                entry.target.style.opacity = '0';
+                entry.target.style.transform = 'translateY(20px)';
+
+                setTimeout(() => {
+                    entry.target.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
+                    entry.target.style.opacity = '1';
+                    entry.target.style.transform = 'translateY(0)';
+                }, 100);
+
+                observer.unobserve(entry.target);
+            }
+        });
+    }, { threshold: 0.1 });
+
+    cards.forEach(card => observer.observe(card));
+}
+
+// ==================== ACTIVE NAV LINK ====================
+// Marquer automatiquement le lien de navigation actif
+document.addEventListener('DOMContentLoaded', function() {
+    const currentPath = window.location.pathname;
+    const navLinks = document.querySelectorAll('.navbar-nav .nav-link:not(.dropdown-toggle)');
+
+    console.log('🔍 Current path:', currentPath);
+
+    // Retirer tous les .active d'abord
+    navLinks.forEach(link => link.classList.remove('active'));
+
+    // Trouver et marquer le lien actif
+    let found = false;
+    navLinks.forEach(link => {
+        try {
+            const linkPath = new URL(link.href).pathname;
+
+            // Correspondance exacte en priorité
+            if (currentPath === linkPath) {
+                link.classList.add('active');
+                console.log('✅ Exact match:', linkPath);
+                found = true;
+            }
+            // Correspondance partielle (sauf pour home)
+            else if (linkPath !== '/' && currentPath.startsWith(linkPath)) {
+                if (!found) {
+                    link.classList.add('active');
+                    console.log('✅ Partial match:', linkPath);
+                    found = true;
+                }
+            }
+        } catch(e) {
+            console.error('❌ Error processing link:', link.href, e);
+        }
+    });
+
+    if (!found) {
+        console.log('⚠️ No active link found');
+    }
+});
+
+// ==================== PWA SERVICE WORKER ====================
+
+// Enregistrer le service worker si supporté
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        // Ancien enregistrement (/static/sw.js, portée limitée à /static/)
+        navigator.serviceWorker.getRegistrations().then(registrations => {
+            registrations
+                .filter(registration => registration.scope.endsWith('/static/'))
+                .forEach(registration => registration.unregister());
+        });
+
+        // Servi par Django à la racine (monnkap/pwa.py) : portée sur tout le site
+        navigator.serviceWorker.register('/sw.js')
+            .then(registration => {
+                console.log('✅ [PWA] Service Worker enregistré:', registration.scope);
+
+                // Vérifier les mises à jour
+                registration.addEventListener('updatefound', () => {
+                    const newWorker = registration.installing;
+                    console.log('🔄 [PWA] Nouvelle version du Service Worker détectée');
+
+                    newWorker.addEventListener('statechange', () => {
+                        if (newWorker.state === 'installed' && navigator.serviceWorker.controller) {
+                            console.log('💡 [PWA] Nouvelle version disponible - rechargez la page');
+                            // Optionnel : notifier l'utilisateur
+                            // alert('Une nouvelle version est disponible. Rafraîchissez la page.');
+                        }
+                    });
+                });
+            })
+            .catch(error => {
+                console.error('❌ [PWA] Échec enregistrement Service Worker:', error);
+            });
+    });
+
+    // Gérer les messages du service worker
+    navigator.serviceWorker.addEventListener('message', event => {
+        console.log('📩 [PWA] Message reçu du SW:', event.data);
+
+        if (event.data.type === 'CACHE_UPDATED') {
+            console.log('✅ [PWA] Cache mis à jour:', event.data.url);
+        }
+
+        // Saisies hors ligne envoyées au serveur (voir static/sw.js)
+        if (event.data.type === 'OFFLINE_WRITES_SYNCED' && window.Toast) {
+            if (event.data.applied) {
+                window.Toast.success(`${event.data.applied} saisie(s) hors ligne synchronisée(s)`);
+            }
+            if (event.data.rejected) {
+                window.Toast.error(`${event.data.rejected} saisie(s) hors ligne refusée(s) (données invalides)`);
+            }
+        }
+    });
+
+    // Envoyer les saisies hors ligne en attente (chargement, retour du réseau),
+    // avec le jeton CSRF courant de la page
+    const flushOfflineWrites = () => {
+        navigator.serviceWorker.ready.then(registration => {
+            if (!registration.active) return;
+            const cookie = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+            const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+            registration.active.postMessage({
+                type: 'FLUSH_OFFLINE_WRITES',
+                csrfToken: cookie ? decodeURIComponent(cookie[1]) : (input ? input.value : null),
+            });
+        });
+    };
+    window.addEventListener('load', flushOfflineWrites);
+    window.addEventListener('online', flushOfflineWrites);
+} else {
+    console.log('⚠️ [PWA] Service Workers non supportés dans ce navigateur');
+}
+
+// Détecter si l'app est installée
+window.addEventListener('DOMContentLoaded', () => {
+    if (window.matchMedia('(display-mode: standalone)').matches || window.navigator.standalone) {
+        console.log('📱 [PWA] Application en mode standalone (installée)');
+        document.documentElement.classList.add('pwa-installed');
+    } else {
+        console.log('🌐 [PWA] Application en mode navigateur');
+    }
+});
+
+// Écouter l'événement d'installation
+let deferredPrompt;
+window.addEventListener('beforeinstallprompt', (e) => {
+    console.log('💾 [PWA] Prompt d\'installation disponible');
+    e.preventDefault();
+    deferredPrompt = e;
+
+    // Afficher le bouton d'installation
+    showInstallButton();
+});
+
+// Confirmation d'installation
+window.addEventListener('appinstalled', () => {
+    console.log('🎉 [PWA] Application installée avec succès!');
+    deferredPrompt = null;
+    // Masquer le bouton d'installation
+    const installBtn = document.getElementById('pwa-install-btn');
+    if (installBtn) installBtn.style.display = 'none';
+});
+
+// Fonction pour afficher le bouton d'installation
+function showInstallButton() {
+    const installBtn = document.getElementById('pwa-install-btn');
+    if (installBtn) {
+        installBtn.style.display = 'inline-block';
+        installBtn.onclick = async () => {
+            if (!deferredPrompt) return;
+            deferredPrompt.prompt();
+            const { outcome } = await deferredPrompt.userChoice;
+            console.log(`[PWA] Résultat installation: ${outcome}`);
+            deferredPrompt = null;
+            installBtn.style.display = 'none';
+        };
+    }
+}
+
+// Afficher le bouton si le prompt est disponible
+if (deferredPrompt) {
+    showInstallButton();
+}
+
+// ==================== MODAL NOUVEAUTÉS PWA ====================
+// Variable globale pour coordonner l'affichage des modals
+let pwaModalWillShow = false;
+
+// Afficher le modal une seule fois si l'utilisateur ne l'a pas vu
+window.addEventListener('DOMContentLoaded', () => {
+    const hasSeenPwaAnnouncement = localStorage.getItem('monnkap-pwa-announcement-seen');
+    const isStandalone = window.matchMedia('(display-mode: standalone)').matches || window.navigator.standalone;
+
+    // Afficher seulement si: jamais vu + pas déjà installé
+    if (!hasSeenPwaAnnouncement && !isStandalone) {
+        pwaModalWillShow = true;
+
+        // Attendre 2 secondes après le chargement pour ne pas gêner
+        setTimeout(() => {
+            const modal = new bootstrap.Modal(document.getElementById('pwaAnnouncementModal'));
+            modal.show();
+
+            // Détecter la plateforme et ouvrir l'accordéon approprié
+            const isIOS = /iPad|iPhone|iPod/.test(navigator.userAgent) && !window.MSStream;
+            const isAndroid = /Android/.test(navigator.userAgent);
+
+            if (isIOS) {
+                // Ouvrir automatiquement l'accordéon iOS
+                const iOSAccordion = document.getElementById('collapseiOS');
+                if (iOSAccordion) {
+                    const bsCollapse = new bootstrap.Collapse(iOSAccordion, { show: true });
+                }
+            } else if (isAndroid) {
+                // Ouvrir automatiquement l'accordéon Android
+                const androidAccordion = document.getElementById('collapseAndroid');
+                if (androidAccordion) {
+                    const bsCollapse = new bootstrap.Collapse(androidAccordion, { show: true });
+                }
+            }
+
+            // Marquer comme vu
+            localStorage.setItem('monnkap-pwa-announcement-seen', 'true');
+
+            // Écouter la fermeture du modal pour déclencher le modal donation
+            document.getElementById('pwaAnnouncementModal').addEventListener('hidden.bs.modal', function() {
+                console.log('📱 [PWA] Modal fermé, vérification modal donation...');
+                // Déclencher l'événement pour afficher le modal donation si nécessaire
+                window.dispatchEvent(new Event('pwaModalClosed'));
+            }, { once: true });
+        }, 2000);
+    }
+});
+
+// Bouton d'installation depuis le modal
+document.getElementById('installFromModal')?.addEventListener('click', () => {
+    if (deferredPrompt) {
+        // Fermer le modal
+        const modal = bootstrap.Modal.getInstance(document.getElementById('pwaAnnouncementModal'));
+        modal.hide();
+
+        // Déclencher l'installation
+        deferredPrompt.prompt();
+        deferredPrompt.userChoice.then((choiceResult) => {
+            if (choiceResult.outcome === 'accepted') {
+                console.log('✅ [PWA] Utilisateur a accepté l\'installation');
+            } else {
+                console.log('❌ [PWA] Utilisateur a refusé l\'installation');
+            }
+            deferredPrompt = null;
+        });
+    } else {
+        // Si pas de prompt disponible, ouvrir l'accordéon approprié
+        const isIOS = /iPad|iPhone|iPod/.test(navigator.userAgent) && !window.MSStream;
+
+        if (isIOS) {
+            // Ouvrir l'accordéon iOS
+            const iOSAccordion = document.getElementById('collapseiOS');
+            if (iOSAccordion) {
+                const bsCollapse = new bootstrap.Collapse(iOSAccordion, { show: true });
+            }
+        } else {
+            // Ouvrir l'accordéon Android
+            const androidAccordion = document.getElementById('collapseAndroid');
+            if (androidAccordion) {
+                const bsCollapse = new bootstrap.Collapse(androidAccordion, { show: true });
+            }
+        }
+    }
+});
+
+// ==================== MODAL DONATION PÉRIODIQUE ====================
+window.addEventListener('DOMContentLoaded', () => {
+    const DONATION_MODAL_KEY = 'monnkap-donation-modal-last-shown';
+    const SNOOZE_KEY = 'monnkap-donation-modal-snoozed-until';
+    const DAYS_BETWEEN_SHOWS = 7; // Afficher tous les 7 jours
+
+    // Vérifier si on doit afficher le modal
+    function shouldShowDonationModal() {
+        // Vérifier le snooze (30 jours)
+        const snoozedUntil = localStorage.getItem(SNOOZE_KEY);
+        if (snoozedUntil) {
+            const snoozedDate = new Date(snoozedUntil);
+            if (new Date() < snoozedDate) {
+                console.log('💤 [Donation] Modal snoozé jusqu\'au', snoozedDate);
+                return false;
+            }
+        }
+
+        // Vérifier la dernière date d'affichage
+        const lastShown = localStorage.getItem(DONATION_MODAL_KEY);
+        if (!lastShown) {
+            return true; // Première fois
+        }
+
+        const lastShownDate = new Date(lastShown);
+        const daysSinceLastShown = (new Date() - lastShownDate) / (1000 * 60 * 60 * 24);
+
+        console.log(`🕐 [Donation] Dernière affichage il y a ${daysSinceLastShown.toFixed(1)} jours`);
+        return daysSinceLastShown >= DAYS_BETWEEN_SHOWS;
+    }
+
+    // Afficher le modal de donation
+    function showDonationModal() {
+        const donationModal = new bootstrap.Modal(document.getElementById('donationModal'));
+        donationModal.show();
+
+        // Enregistrer la date d'affichage
+        localStorage.setItem(DONATION_MODAL_KEY, new Date().toISOString());
+        console.log('💝 [Donation] Modal affiché');
+    }
+
+    if (shouldShowDonationModal()) {
+        // Si le modal PWA va s'afficher, attendre qu'il soit fermé
+        if (pwaModalWillShow) {
+            console.log('⏳ [Donation] Attente fermeture modal PWA...');
+            window.addEventListener('pwaModalClosed', () => {
+                // Attendre 2 secondes après la fermeture du modal PWA
+                setTimeout(showDonationModal, 2000);
+            }, { once: true });
+        } else {
+            // Pas de modal PWA, afficher après 5 secondes normalement
+            setTimeout(showDonationModal, 5000);
+        }
+    }
+
+    // Bouton copier numéro Orange Money
+    document.getElementById('copyOrangeMoneyBtn')?.addEventListener('click', () => {
+        const number = document.getElementById('orangeMoneyNumber').value;
+        navigator.clipboard.writeText(number).then(() => {
+            const btn = document.getElementById('copyOrangeMoneyBtn');
+            const originalHTML = btn.innerHTML;
+            btn.innerHTML = '<i class="bi bi-check-lg"></i>';
+            btn.classList.add('btn-success');
+            btn.classList.remove('btn-outline-primary');
+
+            setTimeout(() => {
+                btn.innerHTML = originalHTML;
+                btn.classList.remove('btn-success');
+                btn.classList.add('btn-outline-primary');
+            }, 2000);
+        });
+    });
+
+    // Bouton copier et fermer
+    document.getElementById('copyAndCloseBtn')?.addEventListener('click', () => {
+        const number = document.getElementById('orangeMoneyNumber').value;
+        navigator.clipboard.writeText(number).then(() => {
+            // Afficher toast de confirmation
+            alert('✅ Numéro Orange Money copié: ' + number + '\n\nMerci pour votre soutien ! 💚');
+
+            // Fermer le modal
+            const modal = bootstrap.Modal.getInstance(document.getElementById('donationModal'));
+            modal.hide();
+        });
+    });
+
+    // Bouton snooze 30 jours
+    document.getElementById('snooze30DaysBtn')?.addEventListener('click', () => {
+        const snoozeUntil = new Date();
+        snoozeUntil.setDate(snoozeUntil.getDate() + 30);
+        localStorage.setItem(SNOOZE_KEY, snoozeUntil.toISOString());
+
+        console.log('💤 [Donation] Snoozé jusqu\'au', snoozeUntil);
+
+        // Fermer le modal
+        const modal = bootstrap.Modal.getInstance(document.getElementById('donationModal'));
+        modal.hide();
+    });
+});
@@ -1,99 +1,456 @@
 // Service Worker pour MonNkap PWA
-// Version 1.0.0
-
-const CACHE_NAME = 'monnkap-v1';
-const OFFLINE_URL = '/offline/';
-
-// Ressources essentielles à mettre en cache
-const ESSENTIAL_RESOURCES = [
-    '/',
-    '/dashboard/home/',
-    '/static/css/custom-design.css',
-    '/static/manifest.json',
-    '/static/favicon.svg',
-    '/static/icons/icon-192.png',
-    OFFLINE_URL
-];
-
-// Installation du Service Worker
+//
+// Servi par /sw.js (monnkap/pwa.py), précédé de :
+// - self.__PRECACHE_MANIFEST : { version, entries: [{ url, revision }] }, généré au build
+// - self.__SW_CONFIG : URLs du site et limites des caches runtime
+//
+// Stratégies :
+// - précache (bundles, polices, icônes, page hors ligne) : cache-first, cache
+//   nommé d'après la version du manifeste, remplacé à chaque déploiement ;
+// - fichiers statiques empreintés et avatars : cache-first (contenu immuable) ;
+//   autres fichiers statiques : stale-while-revalidate ;
+// - pages HTML avec l'en-tête de partition (pages personnelles) :
+//   stale-while-revalidate dans un cache par utilisateur, vidé à la
+//   déconnexion ; réseau d'abord après une écriture ;
+// - le reste (formulaires, JSON, admin) : réseau uniquement, page hors ligne
+//   pour les navigations.
+// Caches runtime : LRU (nombre d'entrées et âge maximal).
+//
+// Saisie hors ligne : un formulaire de CONFIG.offlineForms envoyé sans réseau
+// est mis en file (IndexedDB) avec une clé d'idempotence, puis transmis par
+// lots à l'API de synchronisation (monnkap/sync.py) au retour du réseau :
+// Background Sync si disponible, sinon à la prochaine navigation.
+
+const MANIFEST = self.__PRECACHE_MANIFEST || { version: 'dev', entries: [] };
+const CONFIG = self.__SW_CONFIG || {
+    offlineUrl: '/offline/',
+    offlineForms: {},
+    syncPushUrl: '/api/sync/push/',
+    syncBatchSize: 100,
+    loginUrl: '/accounts/login/',
+    logoutUrl: '/accounts/logout/',
+    staticUrl: '/static/',
+    partitionHeader: 'X-Cache-Partition',
+    pages: { maxEntries: 25, maxAgeSeconds: 7 * 24 * 3600 },
+    static: { maxEntries: 100, maxAgeSeconds: 30 * 24 * 3600 },
+};
+
+const CACHE_PREFIX = 'monnkap-';
+const PRECACHE = `${CACHE_PREFIX}precache-${MANIFEST.version}`;
+const STATIC_CACHE = `${CACHE_PREFIX}static`;
+const META_CACHE = `${CACHE_PREFIX}meta`;
+const PAGES_PREFIX = `${CACHE_PREFIX}pages-`;
+
+// En-tête ajouté aux réponses des caches runtime : date du dernier usage (LRU)
+const CACHED_AT = 'sw-cached-at';
+const LAST_WRITE_KEY = '/__sw/last-write';
+// Un accès ne rafraîchit la date LRU qu'au plus une fois par heure
+const TOUCH_INTERVAL_MS = 3600 * 1000;
+
+const SYNC_TAG = 'sync-offline-writes';
+const QUEUE_DB = 'monnkap-sync';
+const QUEUE_STORE = 'queue';
+
+// Noms empreintés par collectstatic : app.min.3b0c1f3df0de.js
+const FINGERPRINTED_RE = /\.[0-9a-f]{12}\.[a-z0-9]+$/;
+const AVATARS_PATH = '/media/avatars/';
+
+// ==================== INSTALLATION / ACTIVATION ====================
+
 self.addEventListener('install', (event) => {
-    console.log('[SW] Installation...');
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then((cache) => {
-                console.log('[SW] Mise en cache des ressources essentielles');
-                return cache.addAll(ESSENTIAL_RESOURCES);
-            })
-            .catch((error) => {
-                console.error('[SW] Erreur lors de la mise en cache:', error);
-            })
+        caches.open(PRECACHE).then((cache) => cache.addAll(
+            // Sans cookies (page hors ligne anonyme) et sans cache HTTP
+            MANIFEST.entries.map((entry) => new Request(entry.url, { credentials: 'omit', cache: 'reload' }))
+        ))
     );
-    // Forcer l'activation immédiate
     self.skipWaiting();
 });
 
-// Activation du Service Worker
 self.addEventListener('activate', (event) => {
-    console.log('[SW] Activation...');
     event.waitUntil(
-        caches.keys().then((cacheNames) => {
-            return Promise.all(
-                cacheNames.map((cacheName) => {
-                    if (cacheName !== CACHE_NAME) {
-                        console.log('[SW] Suppression ancien cache:', cacheName);
-                        return caches.delete(cacheName);
-                    }
-                })
-            );
-        })
+        caches.keys().then((names) => Promise.all(names.map((name) => {
+            // Ancien précache, pages du déploiement précédent (elles référencent
+            // les bundles de l'ancien précache) et caches de l'ancienne version
+            const keep = name === PRECACHE || name === STATIC_CACHE || name === META_CACHE;
+            if (!keep) {
+                console.log('[SW] Suppression du cache:', name);
+                return caches.delete(name);
+            }
+        }))).then(() => self.clients.claim())
     );
-    // Prendre le contrôle immédiatement
-    return self.clients.claim();
 });
 
-// Stratégie de fetch: Network First, fallback Cache
+// ==================== CACHES RUNTIME (LRU) ====================
+
+function cachedAt(response) {
+    return Number(response.headers.get(CACHED_AT)) || 0;
+}
+
+function isExpired(response, limits) {
+    return Date.now() - cachedAt(response) > limits.maxAgeSeconds * 1000;
+}
+
+async function putWithTimestamp(cache, key, response) {
+    const headers = new Headers(response.headers);
+    headers.set(CACHED_AT, String(Date.now()));
+    const body = await response.blob();
+    // put() remplace l'entrée et la place en dernier : ordre des clés = ordre LRU
+    await cache.put(key, new Response(body, {
+        status: response.status,
+        statusText: response.statusText,
+        headers,
+    }));
+}
+
+async function trimCache(cacheName, limits) {
+    const cache = await caches.open(cacheName);
+    const keys = await cache.keys();
+    let count = keys.length;
+    for (const request of keys) {
+        const response = await cache.match(request);
+        if (count > limits.maxEntries || !response || isExpired(response, limits)) {
+            await cache.delete(request);
+            count -= 1;
+        }
+    }
+}
+
+async function touch(cacheName, key, response, limits) {
+    if (Date.now() - cachedAt(response) > TOUCH_INTERVAL_MS) {
+        const cache = await caches.open(cacheName);
+        await putWithTimestamp(cache, key, response.clone());
+        await trimCache(cacheName, limits);
+    }
+}
+
+// ==================== FICHIERS STATIQUES ====================
+
+async function precached(request) {
+    const cache = await caches.open(PRECACHE);
+    // Les polices sont demandées avec une query string (?e348...) par le CSS
+    return cache.match(request, { ignoreSearch: true, ignoreVary: true });
+}
+
+async function cacheFirst(event, limits) {
+    const { request } = event;
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(request, { ignoreVary: true });
+    if (cached && !isExpired(cached, limits)) {
+        event.waitUntil(touch(STATIC_CACHE, request, cached.clone(), limits));
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok && response.type === 'basic') {
+        event.waitUntil(
+            putWithTimestamp(cache, request, response.clone()).then(() => trimCache(STATIC_CACHE, limits))
+        );
+    }
+    return response;
+}
+
+async function staleWhileRevalidateStatic(event, limits) {
+    const { request } = event;
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(request, { ignoreVary: true });
+    const network = fetch(request).then(async (response) => {
+        if (response.ok && response.type === 'basic') {
+            await putWithTimestamp(cache, request, response.clone());
+            await trimCache(STATIC_CACHE, limits);
+        }
+        return response;
+    });
+    if (cached && !isExpired(cached, limits)) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    return network.catch(() => cached || Response.error());
+}
+
+async function handleStatic(event, url) {
+    const hit = await precached(event.request);
+    if (hit) {
+        return hit;
+    }
+    if (FINGERPRINTED_RE.test(url.pathname) || url.pathname.startsWith(AVATARS_PATH)) {
+        return cacheFirst(event, CONFIG.static);
+    }
+    return staleWhileRevalidateStatic(event, CONFIG.static);
+}
+
+// ==================== PAGES HTML (PAR UTILISATEUR) ====================
+
+let currentPartition = null;
+let lastWriteAt = null;
+
+async function pagesCacheName() {
+    if (currentPartition === null) {
+        // Service worker redémarré : un seul cache de pages existe à la fois
+        const names = await caches.keys();
+        const name = names.find((n) => n.startsWith(PAGES_PREFIX));
+        currentPartition = name ? name.slice(PAGES_PREFIX.length) : '';
+    }
+    return currentPartition ? PAGES_PREFIX + currentPartition : null;
+}
+
+async function clearPages(exceptPartition) {
+    const names = await caches.keys();
+    await Promise.all(names
+        .filter((name) => name.startsWith(PAGES_PREFIX) && name !== PAGES_PREFIX + exceptPartition)
+        .map((name) => caches.delete(name)));
+    currentPartition = exceptPartition || '';
+}
+
+async function getLastWriteAt() {
+    if (lastWriteAt === null) {
+        const cache = await caches.open(META_CACHE);
+        const response = await cache.match(LAST_WRITE_KEY);
+        lastWriteAt = response ? Number(await response.text()) : 0;
+    }
+    return lastWriteAt;
+}
+
+async function markWrite() {
+    lastWriteAt = Date.now();
+    const cache = await caches.open(META_CACHE);
+    await cache.put(LAST_WRITE_KEY, new Response(String(lastWriteAt)));
+}
+
+function pageKey(url) {
+    url.hash = '';
+    return url.href;
+}
+
+async function storePage(key, response) {
+    const partition = response.headers.get(CONFIG.partitionHeader);
+    const path = new URL(response.url || key).pathname;
+
+    if (path.startsWith(CONFIG.loginUrl) || path.startsWith(CONFIG.logoutUrl)) {
+        // Déconnecté (ou session expirée) : plus aucune page personnelle
+        await clearPages('');
+        return;
+    }
+    // Seules les pages personnelles (en-tête de partition) sont mises en cache ;
+    // une réponse après redirection ne peut pas servir une navigation
+    if (!partition || !response.ok || response.redirected || response.type !== 'basic') {
+        return;
+    }
+    if (partition !== currentPartition) {
+        // Autre utilisateur sur ce navigateur
+        await clearPages(partition);
+    }
+    const name = PAGES_PREFIX + partition;
+    await putWithTimestamp(await caches.open(name), key, response);
+    await trimCache(name, CONFIG.pages);
+}
+
+async function handleNavigation(event, url) {
+    const key = pageKey(url);
+    const name = await pagesCacheName();
+    const cached = name ? await (await caches.open(name)).match(key, { ignoreVary: true }) : undefined;
+
+    const network = fetch(event.request).then((response) => {
+        // Réseau disponible : envoyer les saisies hors ligne en attente, une fois
+        // l'utilisateur de la page connu
+        event.waitUntil(storePage(key, response.clone()).then(() => flushQueue()).catch(() => undefined));
+        return response;
+    });
+
+    // Stale-while-revalidate, sauf si des données ont changé depuis la mise en cache
+    const fresh = cached && !isExpired(cached, CONFIG.pages) && cachedAt(cached) > await getLastWriteAt();
+    if (fresh) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (error) {
+        console.log('[SW] Hors ligne:', url.pathname);
+        return cached || (await caches.match(CONFIG.offlineUrl, { cacheName: PRECACHE, ignoreVary: true })) || Response.error();
+    }
+}
+
+// ==================== SAISIE HORS LIGNE ====================
+
+let queueDb = null;
+let flushing = null;
+let latestCsrfToken = null;
+
+function openQueue() {
+    if (!queueDb) {
+        queueDb = new Promise((resolve, reject) => {
+            const open = indexedDB.open(QUEUE_DB, 1);
+            open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'key' });
+            open.onsuccess = () => resolve(open.result);
+            open.onerror = () => reject(open.error);
+        });
+    }
+    return queueDb;
+}
+
+async function queueTransaction(mode, work) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(QUEUE_STORE, mode);
+        const result = work(tx.objectStore(QUEUE_STORE));
+        tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+async function notifyClients(message) {
+    const windows = await self.clients.matchAll({ type: 'window' });
+    windows.forEach((client) => client.postMessage(message));
+}
+
+async function queueForm(request, kind, partition) {
+    const form = await request.formData();
+    const data = {};
+    for (const [name, value] of form.entries()) {
+        if (name !== 'csrfmiddlewaretoken' && typeof value === 'string') {
+            data[name] = value;
+        }
+    }
+    const operation = {
+        key: self.crypto.randomUUID(),
+        // Utilisateur qui a saisi l'opération : vérifié par le serveur à l'envoi
+        partition,
+        type: kind,
+        data,
+        csrfToken: form.get('csrfmiddlewaretoken'),
+        queuedAt: Date.now(),
+    };
+    await queueTransaction('readwrite', (store) => store.put(operation));
+    if (self.registration.sync) {
+        await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+    }
+    const pending = await queueTransaction('readonly', (store) => store.count());
+    await notifyClients({ type: 'OFFLINE_WRITE_QUEUED', kind, pending });
+}
+
+async function submitForm(event, kind) {
+    const copy = event.request.clone();
+    try {
+        return await fetch(event.request);
+    } catch (error) {
+        const name = await pagesCacheName();
+        if (!name) {
+            // Utilisateur inconnu (aucune page personnelle en cache) : rien à mettre en file
+            return (await caches.match(CONFIG.offlineUrl, { cacheName: PRECACHE, ignoreVary: true })) || Response.error();
+        }
+        await queueForm(copy, kind, currentPartition);
+        return Response.redirect(`${CONFIG.offlineUrl}?queued=1`, 303);
+    }
+}
+
+async function pushBatch(partition, operations) {
+    const csrfToken = latestCsrfToken || operations[operations.length - 1].csrfToken;
+    const response = await fetch(CONFIG.syncPushUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        // Session expirée : redirection vers la connexion, la file est conservée
+        redirect: 'manual',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken || '' },
+        body: JSON.stringify({
+            partition,
+            operations: operations.map(({ key, type, data }) => ({ key, type, data })),
+        }),
+    });
+    if (!response.ok) {
+        throw new Error(`Synchronisation refusée (${response.status})`);
+    }
+    return (await response.json()).results;
+}
+
+async function flushQueueNow() {
+    const operations = await queueTransaction('readonly', (store) => store.getAll());
+    // Seulement les saisies de l'utilisateur connecté : les autres attendent sa reconnexion
+    const partition = (await pagesCacheName()) && currentPartition;
+    const mine = (operations || [])
+        .filter((operation) => operation.partition === partition)
+        .sort((a, b) => a.queuedAt - b.queuedAt);
+    if (!mine.length) {
+        return;
+    }
+
+    let applied = 0;
+    let rejected = 0;
+    for (let start = 0; start < mine.length; start += CONFIG.syncBatchSize) {
+        const results = await pushBatch(partition, mine.slice(start, start + CONFIG.syncBatchSize));
+        // Appliquée, déjà appliquée ou invalide : résultat définitif, retirée de la file
+        await queueTransaction('readwrite', (store) => results.forEach((result) => store.delete(result.key)));
+        applied += results.filter((result) => result.status !== 'rejected').length;
+        rejected += results.filter((result) => result.status === 'rejected').length;
+    }
+    await markWrite();
+    await notifyClients({ type: 'OFFLINE_WRITES_SYNCED', applied, rejected });
+}
+
+function flushQueue() {
+    // Un seul envoi à la fois (navigations, Background Sync et messages simultanés)
+    if (!flushing) {
+        flushing = flushQueueNow().finally(() => {
+            flushing = null;
+        });
+    }
+    return flushing;
+}
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(flushQueue());
+    }
+});
+
+// Envoyé par les pages (base.js) au chargement et au retour du réseau
+self.addEventListener('message', (event) => {
+    if (event.data && event.data.type === 'FLUSH_OFFLINE_WRITES') {
+        latestCsrfToken = event.data.csrfToken || latestCsrfToken;
+        event.waitUntil(flushQueue().catch((error) => console.log('[SW] Synchronisation reportée:', error.message)));
+    }
+});
+
+// ==================== ROUTAGE ====================
+
 self.addEventListener('fetch', (event) => {
-    // Ignorer les requêtes non-GET
-    if (event.request.method !== 'GET') {
+    const { request } = event;
+    const url = new URL(request.url);
+
+    // Autres origines (CDN, API externes) : navigateur uniquement
+    if (url.origin !== self.location.origin) {
         return;
     }
 
-    // Ignorer les requêtes admin et API externes
-    if (event.request.url.includes('/admin/') || 
-        event.request.url.includes('googleapis.com')) {
+    if (request.method === 'POST' && request.mode === 'navigate' && CONFIG.offlineForms[url.pathname]) {
+        event.waitUntil(markWrite());
+        event.respondWith(submitForm(event, CONFIG.offlineForms[url.pathname]));
         return;
     }
 
-    event.respondWith(
-        // Essayer le réseau d'abord
-        fetch(event.request)
-            .then((response) => {
-                // Mettre en cache TOUTES les réponses valides (pas seulement basic)
-                if (response && response.status === 200) {
-                    const responseClone = response.clone();
-                    caches.open(CACHE_NAME).then((cache) => {
-                        cache.put(event.request, responseClone);
-                    }).catch(err => console.log('[SW] Cache error:', err));
-                }
-                return response;
-            })
-            .catch(() => {
-                console.log('[SW] Network failed, trying cache for:', event.request.url);
-                // Si le réseau échoue, utiliser le cache
-                return caches.match(event.request)
-                    .then((cachedResponse) => {
-                        if (cachedResponse) {
-                            console.log('[SW] Serving from cache:', event.request.url);
-                            return cachedResponse;
-                        }
-                        console.log('[SW] Not in cache, showing offline page');
-                        // Si pas en cache, afficher la page offline pour les navigations
-                        if (event.request.mode === 'navigate') {
-                            return caches.match(OFFLINE_URL);
-                        }
-                    });
-            })
-    );
+    if (request.method !== 'GET') {
+        if (request.method !== 'HEAD') {
+            // Écriture : les pages en cache peuvent être périmées
+            event.waitUntil(markWrite());
+        }
+        return;
+    }
+
+    if (url.pathname.startsWith('/admin/')) {
+        return;
+    }
+
+    if (request.mode === 'navigate') {
+        if (url.pathname.startsWith(CONFIG.logoutUrl)) {
+            event.waitUntil(clearPages(''));
+            return;
+        }
+        event.respondWith(handleNavigation(event, url));
+        return;
+    }
+
+    if (url.pathname.startsWith(CONFIG.staticUrl) || url.pathname.startsWith(AVATARS_PATH)) {
+        event.respondWith(handleStatic(event, url));
+    }
 });
 
 // Gestion des notifications push (pour le futur)
@@ -108,7 +465,7 @@ self.addEventListener('push', (event) => {
             primaryKey: 1
         }
     };
-    
+
     event.waitUntil(
         self.registration.showNotification('MonNkap', options)
     );
@@ -121,15 +478,3 @@ self.addEventListener('notificationclick', (event) => {
         clients.openWindow('/dashboard/home/')
     );
 });
-
-// Synchronisation en arrière-plan (pour le futur)
-self.addEventListener('sync', (event) => {
-    if (event.tag === 'sync-expenses') {
-        event.waitUntil(syncExpenses());
-    }
-});
-
-async function syncExpenses() {
-    // TODO: Implémenter la synchronisation des dépenses offline
-    console.log('[SW] Synchronisation des dépenses...');
-}